@@ -0,0 +1,38 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from colaboradores.services import importar_colaboradores
+from core.importacao import IMPORTACAO_CHUNK_SIZE, ArquivoInvalido
+
+
+class Command(BaseCommand):
+    help = "Importa colaboradores de um arquivo CSV (colunas nome, email e, opcional, funcao)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('arquivo', help="Caminho do arquivo CSV.")
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=IMPORTACAO_CHUNK_SIZE,
+            help=f"Linhas por bloco de validação e inserção (padrão: {IMPORTACAO_CHUNK_SIZE}).",
+        )
+
+    def handle(self, *args, **options):
+        if options['chunk_size'] < 1:
+            raise CommandError("--chunk-size deve ser maior que zero.")
+
+        inicio = time.perf_counter()
+        try:
+            with open(options['arquivo'], 'rb') as arquivo:
+                resultado = importar_colaboradores(arquivo, chunk_size=options['chunk_size'])
+        except (OSError, ArquivoInvalido) as e:
+            raise CommandError(str(e))
+        duracao = time.perf_counter() - inicio
+
+        for linha, mensagem in resultado.erros:
+            self.stdout.write(f"Linha {linha}: {mensagem}")
+        self.stdout.write(self.style.SUCCESS(
+            f"{resultado.importados} colaborador(es) importado(s), "
+            f"{len(resultado.erros)} linha(s) com erro ({duracao:.1f} s)."
+        ))
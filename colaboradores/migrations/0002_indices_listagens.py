@@ -0,0 +1,17 @@
+# Generated by Django 5.2.6 on 2026-10-18 09:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('colaboradores', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='colaborador',
+            index=models.Index(fields=['nome'], name='colaborador_nome_idx'),
+        ),
+    ]
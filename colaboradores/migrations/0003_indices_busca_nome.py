@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-18 09:24
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('colaboradores', '0002_indices_listagens'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='colaborador',
+            index=models.Index(django.db.models.functions.text.Lower('nome'), name='colaborador_nome_lower_idx'),
+        ),
+    ]
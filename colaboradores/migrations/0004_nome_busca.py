@@ -0,0 +1,38 @@
+# Generated by Django 5.2.6 on 2026-10-18 11:24
+
+from django.db import migrations, models
+
+from core.search import normalizar_busca
+
+
+def preencher_nome_busca(apps, schema_editor):
+    """Preenche a coluna de busca dos registros já existentes."""
+    Colaborador = apps.get_model('colaboradores', 'Colaborador')
+    objetos = list(Colaborador.objects.only('pk', 'nome'))
+    for obj in objetos:
+        obj.nome_busca = normalizar_busca(obj.nome)
+    Colaborador.objects.bulk_update(objetos, ['nome_busca'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('colaboradores', '0003_indices_busca_nome'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='colaborador',
+            name='colaborador_nome_lower_idx',
+        ),
+        migrations.AddField(
+            model_name='colaborador',
+            name='nome_busca',
+            field=models.CharField(db_collation='NOCASE', default='', editable=False, max_length=255),
+        ),
+        migrations.RunPython(preencher_nome_busca, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='colaborador',
+            index=models.Index(fields=['nome_busca'], name='colaborador_nome_busca_idx'),
+        ),
+    ]
@@ -1,10 +1,30 @@
 from django.db import models
+from core.search import NomeBuscaQuerySet, normalizar_busca
 
 class Colaborador(models.Model):
     nome = models.CharField(max_length=255)
     email = models.EmailField(unique=True, help_text="Email único do colaborador")
     funcao = models.CharField(max_length=255, blank=True, null=True)
     # Adicione outros campos se precisar (ex: matrícula, cargo, etc.)
+    # Nome sem acentos e em casefold, para a busca por prefixo (preenchido no save)
+    # NOCASE: o LIKE do SQLite só usa o índice em colunas com essa collation
+    nome_busca = models.CharField(max_length=255, editable=False, default='', db_collation='NOCASE')
+
+    objects = NomeBuscaQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Ordenação e paginação das listagens por nome
+            models.Index(fields=['nome'], name='colaborador_nome_idx'),
+            # Busca por prefixo do autocomplete (core.search.prefix_search)
+            models.Index(fields=['nome_busca'], name='colaborador_nome_busca_idx'),
+        ]
+
+    def save(self, *args, update_fields=None, **kwargs):
+        self.nome_busca = normalizar_busca(self.nome)
+        if update_fields is not None and 'nome' in update_fields:
+            update_fields = {*update_fields, 'nome_busca'}
+        super().save(*args, update_fields=update_fields, **kwargs)
 
     def __str__(self):
         return self.nome
@@ -0,0 +1,84 @@
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import IntegrityError, transaction
+
+from core.importacao import IMPORTACAO_CHUNK_SIZE, ResultadoImportacao, em_blocos, ler_csv
+from .models import Colaborador
+
+COLUNAS_IMPORTACAO = ['nome', 'email']
+
+
+def _validar_linha(linha):
+    """Erros de uma linha do CSV de colaboradores (sem consultar o banco)."""
+    erros = []
+    if not linha['nome']:
+        erros.append("nome é obrigatório")
+    elif len(linha['nome']) > Colaborador._meta.get_field('nome').max_length:
+        erros.append("nome muito longo")
+    try:
+        validate_email(linha['email'])
+    except ValidationError:
+        erros.append(f'email inválido: "{linha["email"]}"')
+    if len(linha.get('funcao', '')) > Colaborador._meta.get_field('funcao').max_length:
+        erros.append("função muito longa")
+    return erros
+
+
+def importar_colaboradores(arquivo, chunk_size=IMPORTACAO_CHUNK_SIZE):
+    """
+    Importa colaboradores de um CSV (colunas nome, email e, opcional, funcao).
+
+    O arquivo é lido em streaming e processado em blocos de `chunk_size`
+    linhas: a unicidade do email é conferida com uma consulta IN por bloco
+    e as linhas válidas entram com bulk_create. Linhas com erro (inclusive
+    email repetido no arquivo ou já cadastrado) são puladas e relatadas;
+    se um cadastro simultâneo gravar o mesmo email entre a consulta e a
+    inserção, o bloco é conferido de novo e a linha vira erro.
+    Levanta core.importacao.ArquivoInvalido se o cabeçalho não servir.
+    """
+    resultado = ResultadoImportacao()
+    vistos = set()
+
+    for bloco in em_blocos(ler_csv(arquivo, COLUNAS_IMPORTACAO), chunk_size):
+        validas = []
+        for numero, linha in bloco:
+            erros = _validar_linha(linha)
+            if not erros and linha['email'] in vistos:
+                erros.append(f'email repetido no arquivo: "{linha["email"]}"')
+            if erros:
+                resultado.erro(numero, '; '.join(erros))
+                continue
+            vistos.add(linha['email'])
+            validas.append((numero, linha))
+
+        conflito = None
+        while True:
+            existentes = set(Colaborador.objects.filter(
+                email__in=[linha['email'] for _, linha in validas],
+            ).values_list('email', flat=True))
+            if conflito and not existentes:
+                raise conflito
+
+            novos = []
+            for numero, linha in validas:
+                if linha['email'] in existentes:
+                    resultado.erro(numero, f'email já cadastrado: "{linha["email"]}"')
+                    continue
+                novos.append((numero, linha))
+
+            try:
+                with transaction.atomic():
+                    Colaborador.objects.bulk_create([
+                        Colaborador(nome=linha['nome'], email=linha['email'], funcao=linha.get('funcao') or None)
+                        for _, linha in novos
+                    ])
+            except IntegrityError as erro:
+                # Um cadastro simultâneo gravou algum destes emails entre a consulta
+                # e a inserção: confere de novo e insere só o restante do bloco
+                conflito, validas = erro, novos
+                continue
+            break
+        resultado.importados += len(novos)
+
+    resultado.erros.sort()
+    return resultado
@@ -6,6 +6,8 @@ app_name = 'colaboradores'
 urlpatterns = [
     path('', views.app_users, name='app_users'),
     path('create/', views.app_users_create, name='app_users_create'),
+    path('import/', views.app_users_import, name='app_users_import'),
     path('edit/<int:pk>/', views.app_users_edit, name='app_users_edit'),
     path('delete/<int:pk>/', views.app_users_delete, name='app_users_delete'),
+    path('search/', views.app_users_search, name='app_users_search'),
 ]
@@ -3,26 +3,38 @@ from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from .models import Colaborador
 from .forms import ColaboradorForm
+from .services import COLUNAS_IMPORTACAO, importar_colaboradores
+from core.forms import ImportacaoCSVForm
+from core.importacao import ArquivoInvalido
+from core.pagination import paginate_keyset
+from core.routers import leitura_em_replica
+from core.search import autocomplete_response
 
 @login_required
+@leitura_em_replica
 def app_users(request):
     """
     READ (List): Mostra todos os colaboradores.
     """
-    colaboradores = Colaborador.objects.all().order_by('nome')
+    page = paginate_keyset(
+        request, Colaborador.objects.all(), 'nome',
+        lambda qs: qs.values('pk', 'nome', 'email', 'funcao'),
+    )
     
     object_data = []
-    for col in colaboradores:
+    for col in page:
         object_data.append({
-            'pk': col.pk,
-            'fields': [col.nome, col.email, col.funcao]
+            'pk': col['pk'],
+            'fields': [col['nome'], col['email'], col['funcao']]
         })
 
     context = {
         'page_title': 'Colaboradores',
         'headers': ['Nome', 'Email', 'Função'],
         'object_data': object_data,
+        'page': page,
         'add_url_name': 'colaboradores:app_users_create',
+        'import_url_name': 'colaboradores:app_users_import',
         'edit_url_name': 'colaboradores:app_users_edit',   
         'delete_url_name': 'colaboradores:app_users_delete',
     }
@@ -47,6 +59,41 @@ def app_users_create(request):
     }
     return render(request, 'app_ui_form_base.html', context)
 
+@login_required
+def app_users_import(request):
+    """
+    CREATE (lote): Importa colaboradores de um arquivo CSV e mostra o
+    relatório de erros por linha.
+    """
+    resultado = None
+    if request.method == 'POST':
+        form = ImportacaoCSVForm(request.POST, request.FILES)
+        if form.is_valid():
+            try:
+                resultado = importar_colaboradores(form.cleaned_data['arquivo'])
+            except ArquivoInvalido as e:
+                form.add_error('arquivo', str(e))
+                messages.error(request, 'Falha na importação. Verifique os erros abaixo.')
+            else:
+                if resultado.importados:
+                    messages.success(request, f'{resultado.importados} colaborador(es) importado(s) com sucesso!')
+                if resultado.erros:
+                    messages.warning(request, f'{len(resultado.erros)} linha(s) não importada(s). Veja o relatório abaixo.')
+        else:
+            messages.error(request, 'Falha na importação. Verifique os erros abaixo.')
+    else:
+        form = ImportacaoCSVForm()
+
+    context = {
+        'form': form,
+        'resultado': resultado,
+        'page_title': 'Importar Colaboradores',
+        'colunas': COLUNAS_IMPORTACAO,
+        'colunas_opcionais': ['funcao'],
+        'list_url_name': 'colaboradores:app_users',
+    }
+    return render(request, 'app_ui_import.html', context)
+
 @login_required
 def app_users_edit(request, pk):
     """
@@ -84,3 +131,10 @@ def app_users_delete(request, pk):
         'item': colaborador,
     }
     return render(request, 'app_ui_delete_confirm_base.html', context)
+
+@login_required
+def app_users_search(request):
+    """
+    JSON: Autocomplete de colaboradores por prefixo do nome (?q=...).
+    """
+    return autocomplete_response(request, Colaborador.objects.all(), 'nome_busca', lambda obj: obj.nome)
@@ -0,0 +1,281 @@
+import statistics
+import threading
+import time
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import DEFAULT_DB_ALIAS, OperationalError, connection, connections
+from django.test import Client
+from django.urls import reverse
+from django.utils import timezone
+
+from colaboradores.models import Colaborador
+from emprestimos.models import Emprestimo
+from emprestimos.services import LoteInvalido, devolver_emprestimos_em_lote, registrar_emprestimos_em_lote
+from equipamentos.models import Equipamento
+
+from .performance import MedidorConsultas, percentil
+from .routers import banco_leitura
+from .utils import calculate_deadline
+
+# Execuções de cada benchmark; o resultado usa a mediana
+REPETICOES = 5
+# Regressão de tempo: mediana atual acima da do baseline por mais que esta fração...
+LIMITE_REGRESSAO = 0.25
+# ...e por mais que estes milissegundos (evita falso alarme em medidas de 1-2 ms)
+TOLERANCIA_MS = 2.0
+# Chamadas de calculate_deadline por execução do benchmark
+CHAMADAS_PRAZO = 10000
+
+# Perfil de comparação no benchmark de concorrência: configuração padrão do
+# Django, com o journal de volta ao padrão do SQLite (o modo WAL fica gravado
+# no arquivo do banco)
+PERFIL_SQLITE_PADRAO = {
+    'OPTIONS': {'init_command': 'PRAGMA journal_mode=DELETE'},
+    'CONN_MAX_AGE': 0,
+    'CONN_HEALTH_CHECKS': False,
+}
+
+# (nome do benchmark, nome da URL) das telas medidas com GET
+LISTAGENS = [
+    ('dashboard', 'dashboard:app_dashboard'),
+    ('colaboradores', 'colaboradores:app_users'),
+    ('equipamentos', 'equipamentos:app_items'),
+    ('emprestimos', 'emprestimos:app_requests'),
+    ('emprestimos_atrasados', 'emprestimos:app_requests_overdue'),
+    ('historico', 'historico:app_history'),
+    ('relatorios', 'relatorios:app_reports'),
+    ('relatorio_equipamentos', 'relatorios:app_reports_equipamentos'),
+    ('relatorio_colaboradores', 'relatorios:app_reports_colaboradores'),
+]
+
+
+class FalhaBenchmark(Exception):
+    """O benchmark não pôde rodar (tela com status inesperado, banco sem dados)."""
+
+
+def usar_banco(caminho):
+    """
+    Aponta a conexão padrão (e as que as threads abrirem) para o arquivo
+    SQLite `caminho` e aplica as migrações. Os benchmarks nunca medem nem
+    alteram o banco configurado da aplicação. A réplica de leitura, se
+    configurada, passa a ler o mesmo arquivo: as telas com
+    @leitura_em_replica também medem o banco do benchmark.
+    """
+    aliases = [DEFAULT_DB_ALIAS]
+    if banco_leitura():
+        aliases.append(banco_leitura())
+    for alias in aliases:
+        connections[alias].close()
+        connections[alias].settings_dict['NAME'] = str(caminho)
+    call_command('migrate', verbosity=0, interactive=False)
+
+
+@contextmanager
+def perfil_banco(perfil):
+    """
+    Aplica `perfil` (chaves de DATABASES, como settings.SQLITE_PERFIL_PRODUCAO)
+    à conexão padrão durante o bloco. As conexões são reabertas com ele,
+    inclusive as das threads.
+    """
+    original = {chave: connection.settings_dict.get(chave) for chave in perfil}
+    connection.close()
+    connection.settings_dict.update(perfil)
+    try:
+        yield
+    finally:
+        connection.close()
+        connection.settings_dict.update(original)
+
+
+def medir(funcao, repeticoes=REPETICOES):
+    """
+    Executa `funcao` `repeticoes` vezes e devolve mediana e máximo do tempo
+    (ms) e o número de consultas da última execução (a primeira pode incluir
+    consultas de aquecimento, como a da sessão).
+    """
+    tempos = []
+    for _ in range(repeticoes):
+        medidor = MedidorConsultas()
+        with ExitStack() as pilha:
+            for conexao in connections.all():
+                pilha.enter_context(conexao.execute_wrapper(medidor))
+            inicio = time.perf_counter()
+            funcao()
+            tempos.append((time.perf_counter() - inicio) * 1000)
+    return {
+        'mediana_ms': round(statistics.median(tempos), 2),
+        'max_ms': round(max(tempos), 2),
+        'consultas': medidor.consultas,
+    }
+
+
+def _esperar(response, status):
+    if response.status_code != status:
+        raise FalhaBenchmark(
+            f"{response.request['PATH_INFO']} respondeu {response.status_code} (esperado {status})."
+        )
+    if response.streaming:
+        # Consome o CSV inteiro: o custo da exportação está na geração das linhas
+        b''.join(response.streaming_content)
+    return response
+
+
+def executar_benchmarks(repeticoes=REPETICOES):
+    """
+    Mede, com o Client de testes e um usuário staff, as listagens, a
+    exportação CSV, o cadastro e a devolução de um empréstimo e o
+    calculate_deadline, sobre os dados já existentes no banco.
+
+    Cada empréstimo cadastrado no benchmark é devolvido em seguida, então o
+    estoque volta ao que era (os registros ficam no histórico).
+    Devolve {nome: {mediana_ms, max_ms, consultas}}.
+    """
+    usuario, _ = get_user_model().objects.get_or_create(
+        username='benchmark', defaults={'is_staff': True}
+    )
+    cliente = Client()
+    cliente.force_login(usuario)
+
+    resultados = {}
+    for nome, url_name in LISTAGENS:
+        url = reverse(url_name)
+        resultados[nome] = medir(lambda url=url: _esperar(cliente.get(url), 200), repeticoes)
+
+    url_csv = reverse('relatorios:download_movimentacoes_csv')
+    resultados['exportacao_csv'] = medir(lambda: _esperar(cliente.get(url_csv), 200), repeticoes)
+
+    # O equipamento com mais estoque, para o cadastro nunca faltar unidades
+    equipamento = Equipamento.objects.order_by('-quantidade', 'pk').first()
+    colaborador = Colaborador.objects.order_by('pk').first()
+    if equipamento is None or colaborador is None:
+        raise FalhaBenchmark("O banco precisa ter ao menos um colaborador e um equipamento.")
+
+    dados = {'nome': colaborador.pk, 'equipamento': equipamento.pk, 'quantidade': 1}
+    url_cadastro = reverse('emprestimos:app_requests_create')
+    resultados['cadastro_emprestimo'] = medir(
+        lambda: _esperar(cliente.post(url_cadastro, dados), 302), repeticoes
+    )
+
+    criados = list(
+        Emprestimo.objects.filter(nome=colaborador, equipamento=equipamento, status='EMPRESTADO')
+        .order_by('-pk').values_list('pk', flat=True)[:repeticoes]
+    )
+    resultados['devolucao_emprestimo'] = medir(
+        lambda: _esperar(
+            cliente.post(reverse('emprestimos:app_requests_return', args=[criados.pop()])), 302
+        ),
+        len(criados),
+    )
+
+    inicio = timezone.now()
+    datas = [inicio - timedelta(hours=hora) for hora in range(CHAMADAS_PRAZO)]
+    resultados['calculate_deadline'] = medir(
+        lambda: [calculate_deadline(data) for data in datas], repeticoes
+    )
+    return resultados
+
+
+def comparar_com_baseline(resultados, baseline, limite=LIMITE_REGRESSAO, tolerancia_ms=TOLERANCIA_MS):
+    """
+    Lista (mensagens) das regressões de `resultados` em relação ao
+    `baseline` (mesmo formato): mediana mais lenta que o baseline por mais
+    de `limite` (fração) e de `tolerancia_ms`, ou mais consultas.
+    Benchmarks ausentes em um dos lados são ignorados.
+    """
+    regressoes = []
+    for nome, atual in resultados.items():
+        base = baseline.get(nome)
+        if base is None:
+            continue
+        maximo = base['mediana_ms'] * (1 + limite)
+        if atual['mediana_ms'] > maximo and atual['mediana_ms'] - base['mediana_ms'] > tolerancia_ms:
+            regressoes.append(
+                f"{nome}: {atual['mediana_ms']:.2f} ms (baseline {base['mediana_ms']:.2f} ms, "
+                f"limite {maximo:.2f} ms)"
+            )
+        if atual['consultas'] > base['consultas']:
+            regressoes.append(
+                f"{nome}: {atual['consultas']} consultas (baseline {base['consultas']})"
+            )
+    return regressoes
+
+
+def medir_concorrencia(escritores=2, leitores=4, duracao=5.0, tamanho_rajada=50):
+    """
+    Leitores repetem as consultas das listagens (empréstimos ativos e
+    histórico) enquanto escritores cadastram e devolvem empréstimos em
+    rajadas de `tamanho_rajada`, por `duracao` segundos, cada thread com sua
+    conexão. Retorna a latência das leituras (p50/p95/p99/máx, em ms), as
+    leituras e transações de escrita concluídas e os erros de banco de cada
+    lado (ex.: "database is locked").
+    """
+    colaborador_ids = list(Colaborador.objects.order_by('pk').values_list('pk', flat=True)[:tamanho_rajada])
+    equipamento = Equipamento.objects.order_by('-quantidade', 'pk').first()
+    if not colaborador_ids or equipamento is None:
+        raise FalhaBenchmark("O banco precisa ter ao menos um colaborador e um equipamento.")
+    rajada = [(pk, equipamento.pk, 1) for pk in colaborador_ids]
+
+    latencias = []
+    contagem = Counter()
+    trava = threading.Lock()
+    largada = threading.Barrier(escritores + leitores)
+
+    def escrever():
+        largada.wait()
+        fim = time.perf_counter() + duracao
+        try:
+            while time.perf_counter() < fim:
+                try:
+                    criados = registrar_emprestimos_em_lote(rajada)
+                    devolver_emprestimos_em_lote([emprestimo.pk for emprestimo in criados])
+                except (OperationalError, LoteInvalido):
+                    with trava:
+                        contagem['erros_escrita'] += 1
+                else:
+                    with trava:
+                        contagem['escritas'] += 2
+        finally:
+            connection.close()
+
+    def ler():
+        largada.wait()
+        fim = time.perf_counter() + duracao
+        try:
+            while time.perf_counter() < fim:
+                inicio = time.perf_counter()
+                try:
+                    list(Emprestimo.objects.select_related('nome', 'equipamento')
+                         .filter(status='EMPRESTADO').order_by('-data_emprestimo')[:50])
+                    list(Emprestimo.objects.select_related('nome', 'equipamento')
+                         .filter(status='DEVOLVIDO').order_by('-data_devolucao_real')[:50])
+                except OperationalError:
+                    with trava:
+                        contagem['erros_leitura'] += 1
+                else:
+                    with trava:
+                        latencias.append((time.perf_counter() - inicio) * 1000)
+        finally:
+            connection.close()
+
+    threads = [threading.Thread(target=escrever) for _ in range(escritores)]
+    threads += [threading.Thread(target=ler) for _ in range(leitores)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    latencias.sort()
+    return {
+        'leituras': len(latencias),
+        'leitura_p50_ms': percentil(latencias, 50),
+        'leitura_p95_ms': percentil(latencias, 95),
+        'leitura_p99_ms': percentil(latencias, 99),
+        'leitura_max_ms': round(latencias[-1], 2) if latencias else 0.0,
+        'escritas': contagem['escritas'],
+        'erros_leitura': contagem['erros_leitura'],
+        'erros_escrita': contagem['erros_escrita'],
+    }
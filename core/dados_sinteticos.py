@@ -0,0 +1,333 @@
+import heapq
+import math
+import random
+from contextlib import contextmanager
+from bisect import bisect
+from datetime import date, datetime, time, timedelta
+from itertools import accumulate
+
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from colaboradores.models import Colaborador
+from core.utils import calculate_deadline
+from dashboard.models import EmprestimosPorDia, IndicadoresDashboard
+from emprestimos.models import Emprestimo
+from emprestimos.services import detectar_atrasados
+from equipamentos.models import Equipamento, EstoqueVersao, MovimentoEstoque, SaldoEstoque
+from relatorios.services import consolidar_relatorios
+
+NOMES = [
+    'Ana', 'Bruno', 'Carla', 'Daniel', 'Eduarda', 'Felipe', 'Gabriela', 'Henrique', 'Isabela', 'João',
+    'Karina', 'Lucas', 'Mariana', 'Nicolas', 'Olívia', 'Paulo', 'Rafaela', 'Sérgio', 'Tatiane', 'Vinícius',
+]
+SOBRENOMES = [
+    'Almeida', 'Barbosa', 'Cardoso', 'Costa', 'Ferreira', 'Gomes', 'Lima', 'Martins', 'Oliveira', 'Pereira',
+    'Ribeiro', 'Rocha', 'Santos', 'Silva', 'Souza',
+]
+FUNCOES = ['Operador', 'Técnico', 'Soldador', 'Eletricista', 'Montador', 'Almoxarife', 'Supervisor']
+TIPOS_EQUIPAMENTO = [
+    'Capacete', 'Luva', 'Óculos de Proteção', 'Protetor Auricular', 'Bota', 'Máscara PFF2', 'Cinto de Segurança',
+    'Avental', 'Protetor Facial', 'Respirador',
+]
+MARCAS = ['3M', 'MSA', 'Marluvas', 'Danny', 'Kalipso', 'Volk', 'Delta Plus', 'Honeywell']
+QUANTIDADES = [1, 1, 1, 1, 2, 2, 3, 5]
+
+# Movimento relativo por dia da semana (segunda = 0): turnos de segunda a sexta, sábado reduzido
+PESO_DIA_SEMANA = [1.0, 1.0, 1.0, 1.0, 0.9, 0.3, 0.05]
+# Retiradas por hora local: picos no início de cada turno (6h, 14h e 22h)
+PESO_HORA = {
+    5: 1, 6: 6, 7: 4, 8: 2, 9: 1.5, 10: 1, 11: 1, 12: 0.5, 13: 2, 14: 6, 15: 2,
+    16: 1, 17: 1, 18: 0.5, 21: 1, 22: 3, 23: 0.5,
+}
+# Sazonalidade anual: movimento até 20% acima/abaixo da média, com pico em outubro
+AMPLITUDE_SAZONAL = 0.2
+DIA_DO_ANO_PICO = 288
+# Duração média de um empréstimo devolvido no prazo (um turno)
+HORAS_TURNO = 8
+# Atraso médio, além do prazo, de quem devolve atrasado
+DIAS_ATRASO_MEDIO = 3
+# Cache de páginas do SQLite durante a carga (KiB, valor negativo no PRAGMA)
+CACHE_CARGA_KB = -262144
+
+_SEGUNDOS_DIA = 86_400
+_EPOCA = date(1970, 1, 1).toordinal()
+
+
+class _FormatoData:
+    """
+    Converte instantes (segundos UTC desde 1970) para o texto que o Django
+    grava no SQLite para DateTimeField com USE_TZ (str() do datetime
+    ingênuo em UTC), sem criar um datetime por valor: prefixo do dia em
+    cache e uma tabela com os 86.400 horários do dia.
+    """
+
+    def __init__(self):
+        self._dias = {}
+        self._horarios = [
+            f'{hora:02d}:{minuto:02d}:{segundo:02d}'
+            for hora in range(24) for minuto in range(60) for segundo in range(60)
+        ]
+
+    def __call__(self, instante):
+        dia, segundos = divmod(instante, _SEGUNDOS_DIA)
+        prefixo = self._dias.get(dia)
+        if prefixo is None:
+            prefixo = self._dias[dia] = date.fromordinal(_EPOCA + dia).isoformat() + ' '
+        return prefixo + self._horarios[segundos]
+
+
+def _meia_noite(dia):
+    """Instante (segundos UTC) da meia-noite local de `dia`."""
+    return int(timezone.make_aware(datetime.combine(dia, time.min)).timestamp())
+
+
+def _emprestimos_por_dia(rng, emprestimos, dias, hoje, hora_atual):
+    """
+    Distribui `emprestimos` entre os últimos `dias` dias (até hoje) conforme
+    o dia da semana e a estação do ano. Retorna [(dia, total, horas)], em que
+    `horas` são as horas locais possíveis (hoje só até a hora atual).
+    """
+    calendario = []
+    for i in range(dias - 1, -1, -1):
+        dia = hoje - timedelta(days=i)
+        horas = [hora for hora in PESO_HORA if dia < hoje or hora < hora_atual]
+        estacao = 1 + AMPLITUDE_SAZONAL * math.cos(2 * math.pi * (dia.timetuple().tm_yday - DIA_DO_ANO_PICO) / 365)
+        peso = PESO_DIA_SEMANA[dia.weekday()] * estacao * sum(PESO_HORA[hora] for hora in horas)
+        calendario.append((dia, peso, horas))
+
+    total_pesos = sum(peso for _, peso, _ in calendario) or 1
+    esperados = [emprestimos * peso / total_pesos for _, peso, _ in calendario]
+    totais = [int(esperado) for esperado in esperados]
+    # O que sobrou do arredondamento vai para os dias com maior parte fracionária
+    sobra = sorted(range(len(esperados)), key=lambda i: totais[i] - esperados[i])
+    for i in sobra[:emprestimos - sum(totais)]:
+        totais[i] += 1
+    return [(dia, total, horas) for (dia, _, horas), total in zip(calendario, totais)]
+
+
+@contextmanager
+def _modo_carga():
+    """
+    Carga em massa no SQLite: amplia o cache de páginas da conexão (os
+    índices de Emprestimo cabem em memória) e desliga a checagem de chaves
+    estrangeiras, que é refeita de uma vez no fim (como o loaddata).
+    """
+    if connection.vendor != 'sqlite':
+        yield
+        return
+    with connection.cursor() as cursor:
+        cursor.execute('PRAGMA cache_size')
+        cache_original = cursor.fetchone()[0]
+        cursor.execute(f'PRAGMA cache_size = {CACHE_CARGA_KB}')
+    try:
+        with connection.constraint_checks_disabled():
+            yield
+        connection.check_constraints(table_names=[Emprestimo._meta.db_table])
+    finally:
+        with connection.cursor() as cursor:
+            cursor.execute(f'PRAGMA cache_size = {cache_original}')
+
+
+def _inserir_emprestimos(linhas, chunk_size):
+    """
+    INSERT em lote (executemany) de tuplas já no formato do banco, um bloco
+    de `chunk_size` por transação. Para carga em massa: o bulk_create
+    prepara campo a campo cada instância e limita a carga a poucos milhares
+    de linhas por segundo.
+    """
+    campos = ['nome', 'equipamento', 'quantidade', 'data_emprestimo', 'data_prazo',
+              'data_devolucao_real', 'estoque_disponivel', 'status']
+    opcoes = Emprestimo._meta
+    colunas = ', '.join(connection.ops.quote_name(opcoes.get_field(campo).column) for campo in campos)
+    sql = (
+        f'INSERT INTO {connection.ops.quote_name(opcoes.db_table)} ({colunas}) '
+        f'VALUES ({", ".join(["%s"] * len(campos))})'
+    )
+    for inicio in range(0, len(linhas), chunk_size):
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.executemany(sql, linhas[inicio:inicio + chunk_size])
+
+
+def _em_blocos(objetos, modelo, chunk_size):
+    for inicio in range(0, len(objetos), chunk_size):
+        with transaction.atomic():
+            modelo.objects.bulk_create(objetos[inicio:inicio + chunk_size])
+
+
+def gerar_dados(
+    colaboradores=1000,
+    equipamentos=200,
+    emprestimos=50000,
+    semente=42,
+    dias=365,
+    fracao_atrasados=0.05,
+    fracao_extraviados=0.002,
+    chunk_size=20000,
+    agora=None,
+):
+    """
+    Gera uma massa de dados determinística (mesma `semente` e `agora` =
+    mesmos dados) para benchmarks e testes de carga: colaboradores,
+    equipamentos e um histórico de `emprestimos` nos últimos `dias` dias.
+
+    Distribuições: poucos equipamentos concentram a maior parte dos
+    empréstimos (Zipf); o movimento varia com o dia da semana, a hora do
+    turno e a estação do ano; a maioria devolve no mesmo turno, uma fração
+    `fracao_atrasados` devolve depois do prazo e `fracao_extraviados` nunca
+    devolve. Ficam em aberto os que ainda não voltaram até `agora`.
+
+    Os empréstimos são simulados em ordem cronológica: cada devolução volta
+    ao estoque do equipamento, então estoque_disponivel de cada empréstimo e
+    a quantidade final de cada equipamento batem com os empréstimos ativos.
+    No fim, atualiza atrasados, indicadores do dashboard, consolidações
+    diárias de todo o período gerado e um ponto de controle do livro de
+    estoque. Retorna as contagens geradas.
+    """
+    rng = random.Random(semente)
+    agora = agora or timezone.now()
+    instante_agora = int(agora.timestamp())
+    local_agora = timezone.localtime(agora)
+    inicio_colaboradores = Colaborador.objects.count()
+    inicio_equipamentos = Equipamento.objects.count()
+
+    _em_blocos([
+        Colaborador(
+            nome=f'{rng.choice(NOMES)} {rng.choice(SOBRENOMES)} {rng.choice(SOBRENOMES)}',
+            email=f'colaborador{inicio_colaboradores + i:06d}@empresa.com',
+            funcao=rng.choice(FUNCOES),
+        )
+        for i in range(colaboradores)
+    ], Colaborador, chunk_size)
+    _em_blocos([
+        Equipamento(
+            nome=f'{rng.choice(TIPOS_EQUIPAMENTO)} {inicio_equipamentos + i:05d}',
+            marca=rng.choice(MARCAS),
+            quantidade=1,
+        )
+        for i in range(equipamentos)
+    ], Equipamento, chunk_size)
+
+    colaborador_ids = list(Colaborador.objects.order_by('pk').values_list('pk', flat=True)[inicio_colaboradores:])
+    equipamento_ids = list(Equipamento.objects.order_by('pk').values_list('pk', flat=True)[inicio_equipamentos:])
+    pesos = list(accumulate(1 / posicao for posicao in range(1, len(equipamento_ids) + 1)))
+    # Estoque inicial proporcional à procura pelo equipamento
+    estoque = {pk: 50 + int(2000 / posicao) for posicao, pk in enumerate(equipamento_ids, start=1)}
+    # Unidades compradas de cada equipamento (estoque inicial + reposições), lançadas como AJUSTE
+    adquirido = dict(estoque)
+
+    formatar = _FormatoData()
+    total_colaboradores = len(colaborador_ids)
+    total_pesos = pesos[-1]
+    turno = HORAS_TURNO * 3600
+    atraso_medio = DIAS_ATRASO_MEDIO * _SEGUNDOS_DIA
+    devolucoes_pendentes = []  # heap de (instante da devolução, equipamento, quantidade)
+    sortear, exponencial = rng.random, rng.expovariate
+    heappush, heappop = heapq.heappush, heapq.heappop
+    meias_noites = {}
+    abertos = 0
+    por_dia = []
+    linhas = []
+
+    with _modo_carga():
+        for dia, total, horas in _emprestimos_por_dia(rng, emprestimos, dias, local_agora.date(), local_agora.hour):
+            if not total:
+                continue
+            por_dia.append((dia, total))
+            # O prazo mantém o horário local: mesmo deslocamento a partir da meia-noite do dia do prazo
+            dia_prazo = calculate_deadline(dia)
+            for d in (dia, dia_prazo):
+                if d not in meias_noites:
+                    meias_noites[d] = _meia_noite(d)
+            base = meias_noites[dia]
+            deslocamento_prazo = meias_noites[dia_prazo] - base
+            pesos_hora = list(accumulate(PESO_HORA[hora] for hora in horas))
+
+            instantes = sorted(
+                base + hora * 3600 + int(rng.random() * 3600)
+                for hora in rng.choices(horas, cum_weights=pesos_hora, k=total)
+            )
+            for instante in instantes:
+                while devolucoes_pendentes and devolucoes_pendentes[0][0] <= instante:
+                    _, equipamento_id, quantidade = heappop(devolucoes_pendentes)
+                    estoque[equipamento_id] += quantidade
+
+                equipamento_id = equipamento_ids[bisect(pesos, sortear() * total_pesos)]
+                quantidade = QUANTIDADES[int(sortear() * len(QUANTIDADES))]
+                if estoque[equipamento_id] < quantidade:
+                    estoque[equipamento_id] += 50  # reposição
+                    adquirido[equipamento_id] += 50
+                estoque[equipamento_id] -= quantidade
+
+                prazo = instante + deslocamento_prazo
+                sorteio = sortear()
+                if sorteio < fracao_extraviados:
+                    devolucao = None
+                elif sorteio < fracao_extraviados + fracao_atrasados:
+                    devolucao = prazo + int(exponencial(1) * atraso_medio) + 1
+                else:
+                    devolucao = instante + min(int(exponencial(1) * turno) + 1, prazo - instante)
+                if devolucao is not None and devolucao > instante_agora:
+                    devolucao = None
+
+                if devolucao is None:
+                    abertos += 1
+                else:
+                    heappush(devolucoes_pendentes, (devolucao, equipamento_id, quantidade))
+
+                linhas.append((
+                    colaborador_ids[int(sortear() * total_colaboradores)],
+                    equipamento_id,
+                    quantidade,
+                    formatar(instante),
+                    formatar(prazo),
+                    None if devolucao is None else formatar(devolucao),
+                    estoque[equipamento_id],
+                    'EMPRESTADO' if devolucao is None else 'DEVOLVIDO',
+                ))
+                if len(linhas) >= chunk_size:
+                    _inserir_emprestimos(linhas, chunk_size)
+                    linhas = []
+        _inserir_emprestimos(linhas, chunk_size)
+
+    for _, equipamento_id, quantidade in devolucoes_pendentes:
+        estoque[equipamento_id] += quantidade
+
+    with transaction.atomic():
+        Equipamento.objects.bulk_update(
+            [Equipamento(pk=pk, quantidade=quantidade) for pk, quantidade in estoque.items()],
+            ['quantidade'],
+            batch_size=500,
+        )
+        MovimentoEstoque.objects.bulk_create(
+            [
+                MovimentoEstoque(equipamento_id=pk, tipo=MovimentoEstoque.AJUSTE, quantidade=quantidade)
+                for pk, quantidade in adquirido.items()
+            ],
+            batch_size=500,
+        )
+        # O ponto de controle cobre os AJUSTEs acima e os empréstimos gerados (fora do livro)
+        ultimo_movimento = MovimentoEstoque.objects.aggregate(ultimo=Max('pk'))['ultimo'] or 0
+        SaldoEstoque.objects.bulk_create([
+            SaldoEstoque(equipamento_id=pk, quantidade=quantidade, movimento_id=ultimo_movimento)
+            for pk, quantidade in estoque.items()
+        ])
+        EstoqueVersao.incrementar()
+
+        # Contadores do dashboard a partir da própria simulação (sem recontar Emprestimo)
+        IndicadoresDashboard.ajustar(emprestimos_ativos=abertos)
+        for dia, total in por_dia:
+            EmprestimosPorDia.ajustar(dia, total)
+
+    detectar_atrasados(agora=agora, completo=True)
+    # Desde o primeiro dia gerado: a marca d'água vai para ontem, e nenhum
+    # dia antes dela pode ficar sem consolidação
+    consolidar_relatorios(desde=por_dia[0][0] if por_dia else None, hoje=local_agora.date())
+
+    return {
+        'colaboradores': colaboradores,
+        'equipamentos': equipamentos,
+        'emprestimos': emprestimos,
+        'abertos': abertos,
+    }
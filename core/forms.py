@@ -49,4 +49,13 @@ class RegistrationForm(forms.Form):
         if password and cf_password and password != cf_password:
             raise forms.ValidationError("As senhas não coincidem. Tente novamente.")
         
-        return cleaned_data
\ No newline at end of file
+        return cleaned_data
+
+class ImportacaoCSVForm(forms.Form):
+    """
+    Upload do arquivo das telas de importação em lote.
+    """
+    arquivo = forms.FileField(
+        label="Arquivo CSV",
+        widget=forms.ClearableFileInput(attrs={'class': 'form-input', 'accept': '.csv,text/csv'}),
+    )
@@ -0,0 +1,72 @@
+import csv
+import io
+from itertools import islice
+
+# Linhas processadas por bloco (uma consulta de unicidade + um bulk_create por bloco)
+IMPORTACAO_CHUNK_SIZE = 1000
+
+
+class ArquivoInvalido(Exception):
+    """
+    O arquivo não pode ser lido como CSV de importação (codificação ou
+    cabeçalho).
+    """
+
+
+class ResultadoImportacao:
+    """
+    Resumo de uma importação: quantas linhas entraram, quantos registros
+    foram criados ou atualizados e os erros por linha (número da linha no
+    arquivo, mensagem).
+    """
+
+    def __init__(self):
+        self.importados = 0
+        self.criados = 0
+        self.atualizados = 0
+        self.erros = []
+
+    def erro(self, linha, mensagem):
+        self.erros.append((linha, mensagem))
+
+
+def ler_csv(arquivo, colunas):
+    """
+    Lê o CSV em streaming e gera (número da linha, {coluna: valor}).
+
+    `arquivo` é um arquivo binário (upload ou open(..., 'rb')); aceita UTF-8
+    com ou sem BOM e separador ',' ou ';' (Excel em português). O cabeçalho
+    é comparado sem diferenciar maiúsculas; `colunas` são as obrigatórias.
+    """
+    texto = io.TextIOWrapper(arquivo, encoding='utf-8-sig', newline='')
+    try:
+        cabecalho = texto.readline()
+    except UnicodeDecodeError:
+        raise ArquivoInvalido("O arquivo deve estar em UTF-8.")
+
+    delimitador = ';' if cabecalho.count(';') > cabecalho.count(',') else ','
+    nomes = [nome.strip().lower() for nome in next(csv.reader([cabecalho], delimiter=delimitador), [])]
+    faltando = [coluna for coluna in colunas if coluna not in nomes]
+    if faltando:
+        raise ArquivoInvalido(f"Coluna(s) obrigatória(s) ausente(s) no cabeçalho: {', '.join(faltando)}")
+
+    leitor = csv.DictReader(texto, fieldnames=nomes, delimiter=delimitador)
+    try:
+        for numero, linha in enumerate(leitor, start=2):
+            if any(valor and valor.strip() for valor in linha.values() if isinstance(valor, str)):
+                yield numero, {
+                    coluna: (valor or '').strip() for coluna, valor in linha.items() if coluna in nomes
+                }
+    except UnicodeDecodeError:
+        raise ArquivoInvalido("O arquivo deve estar em UTF-8.")
+    finally:
+        texto.detach()
+
+
+def em_blocos(iteravel, tamanho=IMPORTACAO_CHUNK_SIZE):
+    """
+    Agrupa `iteravel` em listas de até `tamanho` itens, sem carregar tudo.
+    """
+    iterador = iter(iteravel)
+    while bloco := list(islice(iterador, tamanho)):
+        yield bloco
@@ -0,0 +1,36 @@
+import sqlite3
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from core.routers import banco_leitura
+
+
+class Command(BaseCommand):
+    help = (
+        "Copia o banco principal para o arquivo da réplica de leitura "
+        "(SQLITE_REPLICA), com a API de backup do SQLite. Para testar a "
+        "réplica localmente, com dois arquivos; em produção a réplica é "
+        "mantida por replicação contínua."
+    )
+
+    def handle(self, *args, **options):
+        alias = banco_leitura()
+        if alias is None:
+            raise CommandError("Nenhuma réplica configurada (defina SQLITE_REPLICA).")
+        principal, replica = connections[DEFAULT_DB_ALIAS], connections[alias]
+        if principal.vendor != 'sqlite' or replica.vendor != 'sqlite':
+            raise CommandError("atualizar_replica só copia bancos SQLite.")
+
+        replica.close()
+        principal.ensure_connection()
+        destino = sqlite3.connect(replica.settings_dict['NAME'])
+        try:
+            # Cópia consistente mesmo com escritas em andamento no principal
+            principal.connection.backup(destino)
+        finally:
+            destino.close()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Réplica {replica.settings_dict['NAME']} atualizada a partir de {principal.settings_dict['NAME']}."
+        ))
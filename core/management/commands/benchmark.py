@@ -0,0 +1,96 @@
+import json
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.utils import timezone
+
+from core.benchmark import LIMITE_REGRESSAO, REPETICOES, comparar_com_baseline, executar_benchmarks, usar_banco
+from core.dados_sinteticos import gerar_dados
+from emprestimos.models import Emprestimo
+
+
+class Command(BaseCommand):
+    help = (
+        "Mede listagens, exportação CSV, cadastro/devolução e calculate_deadline "
+        "sobre uma massa de dados determinística, em um banco SQLite próprio, "
+        "e compara com um baseline salvo."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--banco',
+            default=str(Path(settings.BASE_DIR) / 'benchmark.sqlite3'),
+            help="Arquivo SQLite do benchmark; é populado só se estiver vazio (padrão: benchmark.sqlite3).",
+        )
+        parser.add_argument('--recriar', action='store_true', help="Apaga o banco do benchmark e gera os dados de novo.")
+        parser.add_argument('--colaboradores', type=int, default=10000)
+        parser.add_argument('--equipamentos', type=int, default=2000)
+        parser.add_argument('--emprestimos', type=int, default=500000)
+        parser.add_argument('--semente', type=int, default=42)
+        parser.add_argument('--repeticoes', type=int, default=REPETICOES)
+        parser.add_argument('--saida', help="Grava os resultados neste arquivo JSON.")
+        parser.add_argument('--baseline', help="JSON de uma execução anterior para comparar.")
+        parser.add_argument(
+            '--limite',
+            type=float,
+            default=LIMITE_REGRESSAO,
+            help=f"Fração de piora tolerada na mediana (padrão: {LIMITE_REGRESSAO}).",
+        )
+
+    def handle(self, *args, **options):
+        baseline = None
+        if options['baseline']:
+            try:
+                baseline = json.loads(Path(options['baseline']).read_text(encoding='utf-8'))['benchmarks']
+            except (OSError, ValueError, KeyError) as e:
+                raise CommandError(f"Baseline inválido: {e}")
+
+        banco = Path(options['banco'])
+        if options['recriar']:
+            banco.unlink(missing_ok=True)
+
+        usar_banco(banco)
+
+        escala = {
+            'colaboradores': options['colaboradores'],
+            'equipamentos': options['equipamentos'],
+            'emprestimos': options['emprestimos'],
+            'semente': options['semente'],
+        }
+        if not Emprestimo.objects.exists():
+            self.stdout.write(f"Gerando dados em {banco}...")
+            gerar_dados(
+                colaboradores=escala['colaboradores'],
+                equipamentos=escala['equipamentos'],
+                emprestimos=escala['emprestimos'],
+                semente=escala['semente'],
+            )
+
+        # Client de testes: libera o host 'testserver'
+        setup_test_environment()
+        try:
+            resultados = executar_benchmarks(repeticoes=options['repeticoes'])
+        finally:
+            teardown_test_environment()
+
+        for nome, medida in resultados.items():
+            self.stdout.write(
+                f"{nome:<26} {medida['mediana_ms']:>10.2f} ms  (máx {medida['max_ms']:.2f} ms)  "
+                f"{medida['consultas']} consultas"
+            )
+
+        if options['saida']:
+            Path(options['saida']).write_text(json.dumps({
+                'executado_em': timezone.now().isoformat(),
+                'escala': escala,
+                'benchmarks': resultados,
+            }, indent=2, ensure_ascii=False), encoding='utf-8')
+            self.stdout.write(f"Resultados gravados em {options['saida']}.")
+
+        if baseline is not None:
+            regressoes = comparar_com_baseline(resultados, baseline, limite=options['limite'])
+            if regressoes:
+                raise CommandError("Regressões em relação ao baseline:\n" + "\n".join(regressoes))
+            self.stdout.write(self.style.SUCCESS("Sem regressões em relação ao baseline."))
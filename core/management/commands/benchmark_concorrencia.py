@@ -0,0 +1,47 @@
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.benchmark import PERFIL_SQLITE_PADRAO, medir_concorrencia, perfil_banco, usar_banco
+from core.dados_sinteticos import gerar_dados
+from emprestimos.models import Emprestimo
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara a latência de leitura durante rajadas de escrita com a "
+        "configuração padrão do SQLite e com settings.SQLITE_PERFIL_PRODUCAO."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--banco',
+            default=str(Path(settings.BASE_DIR) / 'benchmark.sqlite3'),
+            help="Arquivo SQLite do benchmark; é populado só se estiver vazio (padrão: benchmark.sqlite3).",
+        )
+        parser.add_argument('--emprestimos', type=int, default=50000, help="Empréstimos gerados se o banco estiver vazio.")
+        parser.add_argument('--escritores', type=int, default=2)
+        parser.add_argument('--leitores', type=int, default=4)
+        parser.add_argument('--duracao', type=float, default=5.0, help="Segundos de carga por perfil (padrão: 5).")
+
+    def handle(self, *args, **options):
+        usar_banco(options['banco'])
+        if not Emprestimo.objects.exists():
+            self.stdout.write(f"Gerando dados em {options['banco']}...")
+            gerar_dados(emprestimos=options['emprestimos'])
+
+        for nome, perfil in [('padrão', PERFIL_SQLITE_PADRAO), ('produção', settings.SQLITE_PERFIL_PRODUCAO)]:
+            with perfil_banco(perfil):
+                resultado = medir_concorrencia(
+                    escritores=options['escritores'],
+                    leitores=options['leitores'],
+                    duracao=options['duracao'],
+                )
+            self.stdout.write(
+                f"{nome:<9} leituras {resultado['leituras']:>6}  "
+                f"p50 {resultado['leitura_p50_ms']:>7.2f} ms  p95 {resultado['leitura_p95_ms']:>7.2f} ms  "
+                f"p99 {resultado['leitura_p99_ms']:>7.2f} ms  máx {resultado['leitura_max_ms']:>8.2f} ms  "
+                f"escritas {resultado['escritas']:>5}  "
+                f"erros leitura/escrita {resultado['erros_leitura']}/{resultado['erros_escrita']}"
+            )
@@ -0,0 +1,64 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.dados_sinteticos import gerar_dados
+
+
+class Command(BaseCommand):
+    help = (
+        "Gera colaboradores, equipamentos e um histórico de empréstimos com "
+        "distribuições realistas (sazonalidade, devoluções, atrasos), para "
+        "reproduzir volumes de produção localmente."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--colaboradores', type=int, default=1000)
+        parser.add_argument('--equipamentos', type=int, default=200)
+        parser.add_argument('--emprestimos', type=int, default=50000)
+        parser.add_argument('--dias', type=int, default=365, help="Período do histórico, até hoje (padrão: 365).")
+        parser.add_argument('--semente', type=int, default=42, help="Semente do gerador; a mesma semente gera os mesmos dados.")
+        parser.add_argument(
+            '--fracao-atrasados',
+            type=float,
+            default=0.05,
+            help="Fração dos empréstimos devolvidos depois do prazo (padrão: 0.05).",
+        )
+        parser.add_argument(
+            '--fracao-extraviados',
+            type=float,
+            default=0.002,
+            help="Fração dos empréstimos nunca devolvidos (padrão: 0.002).",
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=20000,
+            help="Linhas gravadas por transação (padrão: 20000).",
+        )
+
+    def handle(self, *args, **options):
+        if min(options['colaboradores'], options['equipamentos'], options['dias']) < 1 or options['emprestimos'] < 0:
+            raise CommandError("Informe ao menos um colaborador, um equipamento e um dia.")
+        if options['fracao_atrasados'] + options['fracao_extraviados'] > 1:
+            raise CommandError("A soma de --fracao-atrasados e --fracao-extraviados não pode passar de 1.")
+        if options['chunk_size'] < 1:
+            raise CommandError("--chunk-size deve ser maior que zero.")
+
+        inicio = time.perf_counter()
+        gerado = gerar_dados(
+            colaboradores=options['colaboradores'],
+            equipamentos=options['equipamentos'],
+            emprestimos=options['emprestimos'],
+            semente=options['semente'],
+            dias=options['dias'],
+            fracao_atrasados=options['fracao_atrasados'],
+            fracao_extraviados=options['fracao_extraviados'],
+            chunk_size=options['chunk_size'],
+        )
+        duracao = time.perf_counter() - inicio
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{gerado['colaboradores']} colaboradores, {gerado['equipamentos']} equipamentos e "
+            f"{gerado['emprestimos']} empréstimos ({gerado['abertos']} em aberto) gerados em {duracao:.1f} s."
+        ))
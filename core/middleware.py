@@ -0,0 +1,106 @@
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+from .performance import MedidorConsultas, historico_rotas
+from .routers import COOKIE_PRIMARIO, banco_leitura, janela_primario
+
+# Métodos HTTP que não alteram dados
+METODOS_SEGUROS = ('GET', 'HEAD', 'OPTIONS', 'TRACE')
+
+
+class InstrumentacaoMiddleware:
+    """
+    Mede cada requisição: duração total, número de consultas e tempo de
+    banco (execute_wrapper em todas as conexões). Devolve as medidas no
+    cabeçalho Server-Timing e as guarda no histórico por rota, lido pelo
+    endpoint de métricas. Liga/desliga com settings.PERFORMANCE_INSTRUMENTACAO.
+
+    Respostas em streaming (ex.: CSV) consultam o banco enquanto o corpo é
+    gerado: a medição continua até o corpo terminar e a rota é registrada
+    só então. Como os cabeçalhos saem antes, elas não recebem Server-Timing.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not getattr(settings, 'PERFORMANCE_INSTRUMENTACAO', False):
+            return self.get_response(request)
+
+        medidor = MedidorConsultas()
+        inicio = time.perf_counter()
+        with _medindo(medidor):
+            response = self.get_response(request)
+
+        match = getattr(request, 'resolver_match', None)
+        rota = match.view_name if match else '<sem rota>'
+
+        if response.streaming:
+            response.streaming_content = _medir_corpo(response.streaming_content, medidor, inicio, rota)
+            return response
+
+        duracao_ms, db_ms = _registrar(medidor, inicio, rota)
+        response['Server-Timing'] = (
+            f'total;dur={duracao_ms:.1f}, '
+            f'db;dur={db_ms:.1f};desc="{medidor.consultas} consultas"'
+        )
+        return response
+
+
+def _medindo(medidor):
+    pilha = ExitStack()
+    for conexao in connections.all():
+        pilha.enter_context(conexao.execute_wrapper(medidor))
+    return pilha
+
+
+def _registrar(medidor, inicio, rota):
+    duracao_ms = (time.perf_counter() - inicio) * 1000
+    db_ms = medidor.tempo_db * 1000
+    historico_rotas.registrar(rota, duracao_ms, db_ms, medidor.consultas)
+    return duracao_ms, db_ms
+
+
+def _medir_corpo(conteudo, medidor, inicio, rota):
+    # Cada parte do corpo é gerada com o medidor ativo; registra ao terminar
+    # ou quando o servidor fecha a resposta (ex.: cliente desconectou)
+    iterador = iter(conteudo)
+    try:
+        while True:
+            with _medindo(medidor):
+                try:
+                    parte = next(iterador)
+                except StopIteration:
+                    return
+            yield parte
+    finally:
+        _registrar(medidor, inicio, rota)
+
+
+class PrimarioAposEscritaMiddleware:
+    """
+    Depois de uma requisição que altera dados (POST, PUT, PATCH, DELETE),
+    grava um cookie que mantém as leituras do usuário no banco principal
+    por REPLICA_JANELA_PRIMARIO segundos, o atraso tolerado da réplica.
+    Assim quem acabou de cadastrar ou devolver vê a própria alteração.
+    Sem réplica configurada, não faz nada.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if request.method not in METODOS_SEGUROS and banco_leitura():
+            janela = janela_primario()
+            response.set_cookie(
+                COOKIE_PRIMARIO,
+                f'{time.time() + janela:.3f}',
+                max_age=janela,
+                httponly=True,
+                samesite='Lax',
+            )
+        return response
@@ -0,0 +1,149 @@
+import base64
+import binascii
+import heapq
+import json
+from itertools import islice
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+
+DEFAULT_PAGE_SIZE = 50
+
+
+def get_page_size():
+    """
+    Tamanho de página das listagens (settings.LIST_PAGE_SIZE, padrão 50).
+    """
+    return getattr(settings, 'LIST_PAGE_SIZE', DEFAULT_PAGE_SIZE)
+
+
+def encode_cursor(value, pk):
+    """
+    Codifica a posição (valor da ordenação, pk) de uma linha para usar na URL.
+    """
+    if hasattr(value, 'isoformat'):
+        value = value.isoformat()
+    raw = json.dumps([value, pk]).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii')
+
+
+def decode_cursor(cursor, model_field):
+    """
+    Decodifica um cursor gerado por encode_cursor.
+    Retorna None se o cursor for inválido.
+    """
+    try:
+        value, pk = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        value = model_field.to_python(value)
+        if value is None:
+            # Linhas com o campo nulo não entram na paginação (paginate_keyset)
+            return None
+        return value, int(pk)
+    except (binascii.Error, ValueError, TypeError, ValidationError):
+        return None
+
+
+class KeysetPage:
+    """
+    Uma página de resultados paginada por cursor (keyset).
+    """
+
+    def __init__(self, object_list, has_next, has_previous, next_cursor, previous_cursor, page_size):
+        self.object_list = object_list
+        self.has_next = has_next
+        self.has_previous = has_previous
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+        self.page_size = page_size
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+
+def paginate_keyset(request, queryset, ordering, row_builder, page_size=None):
+    """
+    Pagina `queryset` por cursor em vez de OFFSET.
+
+    `ordering` é o campo de ordenação da listagem (ex.: 'nome' ou
+    '-data_emprestimo'); o pk é usado como critério de desempate, então a
+    ordem é estável mesmo com valores repetidos. O custo de cada página é o
+    mesmo em qualquer posição da tabela.
+
+    Os parâmetros GET 'after' e 'before' recebem o cursor da última/primeira
+    linha da página atual. `row_builder` transforma o queryset já fatiado em
+    dicionários que contenham 'pk' e o campo de ordenação.
+
+    `queryset` também pode ser uma lista de querysets com o mesmo campo de
+    ordenação e pks distintos entre si (ex.: empréstimos e arquivo): o
+    cursor é aplicado em cada um e as fatias, já ordenadas pelo banco, são
+    intercaladas em uma única página.
+
+    Se o campo de ordenação aceita nulo, as linhas com ele nulo ficam de
+    fora: NULL não tem posição no cursor nem nas comparações.
+    """
+    page_size = page_size or get_page_size()
+    descending = ordering.startswith('-')
+    field_name = ordering.lstrip('-')
+    querysets = list(queryset) if isinstance(queryset, (list, tuple)) else [queryset]
+    model_field = querysets[0].model._meta.get_field(field_name)
+    querysets = [
+        qs.filter(**{f'{field_name}__isnull': False}) if qs.model._meta.get_field(field_name).null else qs
+        for qs in querysets
+    ]
+
+    after = request.GET.get('after')
+    before = request.GET.get('before')
+    cursor = None
+    backwards = False
+    if after:
+        cursor = decode_cursor(after, model_field)
+    elif before:
+        cursor = decode_cursor(before, model_field)
+        backwards = cursor is not None
+
+    # Ao voltar uma página a comparação e a ordem são invertidas;
+    # o resultado é revertido no final.
+    forward_desc = descending != backwards
+    lookup = 'lt' if forward_desc else 'gt'
+    prefix = '-' if forward_desc else ''
+
+    if cursor is not None:
+        value, pk = cursor
+        keyset = (
+            Q(**{f'{field_name}__{lookup}': value})
+            | Q(**{field_name: value, f'pk__{lookup}': pk})
+        )
+        querysets = [qs.filter(keyset) for qs in querysets]
+
+    slices = [
+        row_builder(qs.order_by(f'{prefix}{field_name}', f'{prefix}pk')[:page_size + 1])
+        for qs in querysets
+    ]
+    if len(slices) == 1:
+        rows = list(slices[0])
+    else:
+        rows = list(islice(
+            heapq.merge(*slices, key=lambda row: (row[field_name], row['pk']), reverse=forward_desc),
+            page_size + 1,
+        ))
+    has_more = len(rows) > page_size
+    rows = rows[:page_size]
+
+    if backwards:
+        rows.reverse()
+        has_next, has_previous = True, has_more
+    else:
+        has_next, has_previous = has_more, cursor is not None
+
+    next_cursor = previous_cursor = None
+    if rows:
+        if has_next:
+            next_cursor = encode_cursor(rows[-1][field_name], rows[-1]['pk'])
+        if has_previous:
+            previous_cursor = encode_cursor(rows[0][field_name], rows[0]['pk'])
+
+    return KeysetPage(rows, has_next, has_previous, next_cursor, previous_cursor, page_size)
@@ -0,0 +1,84 @@
+import threading
+import time
+from collections import defaultdict, deque
+
+from django.conf import settings
+
+# Amostras mantidas por rota quando settings.PERFORMANCE_AMOSTRAS não é definido
+AMOSTRAS_PADRAO = 1000
+
+
+class MedidorConsultas:
+    """
+    Execute wrapper (connection.execute_wrapper) que conta as consultas e
+    soma o tempo gasto no banco durante uma requisição.
+    """
+
+    def __init__(self):
+        self.consultas = 0
+        self.tempo_db = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.tempo_db += time.perf_counter() - inicio
+            self.consultas += 1
+
+
+class HistoricoRotas:
+    """
+    Janela móvel, em memória do processo, das últimas medições de cada rota
+    (nome da URL): duração total, tempo de banco e número de consultas.
+    Cada worker tem a sua; o endpoint de métricas mostra a do processo que
+    atender a requisição.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._amostras = defaultdict(self._nova_janela)
+
+    @staticmethod
+    def _nova_janela():
+        return deque(maxlen=getattr(settings, 'PERFORMANCE_AMOSTRAS', AMOSTRAS_PADRAO))
+
+    def registrar(self, rota, duracao_ms, db_ms, consultas):
+        with self._lock:
+            self._amostras[rota].append((duracao_ms, db_ms, consultas))
+
+    def limpar(self):
+        with self._lock:
+            self._amostras.clear()
+
+    def resumo(self):
+        """
+        {rota: {amostras, p50, p95, p99 (ms), db_medio_ms, consultas_media}},
+        das rotas mais lentas (p95) para as mais rápidas.
+        """
+        with self._lock:
+            copias = {rota: list(janela) for rota, janela in self._amostras.items()}
+
+        resumo = {}
+        for rota, amostras in copias.items():
+            duracoes = sorted(duracao for duracao, _, _ in amostras)
+            resumo[rota] = {
+                'amostras': len(amostras),
+                'p50': percentil(duracoes, 50),
+                'p95': percentil(duracoes, 95),
+                'p99': percentil(duracoes, 99),
+                'db_medio_ms': round(sum(db for _, db, _ in amostras) / len(amostras), 2),
+                'consultas_media': round(sum(c for _, _, c in amostras) / len(amostras), 2),
+            }
+        return dict(sorted(resumo.items(), key=lambda item: item[1]['p95'], reverse=True))
+
+
+def percentil(valores_ordenados, p):
+    """Percentil `p` (método do posto mais próximo) de uma lista já ordenada."""
+    if not valores_ordenados:
+        return 0.0
+    indice = max(0, -(-p * len(valores_ordenados) // 100) - 1)
+    return round(valores_ordenados[indice], 2)
+
+
+historico_rotas = HistoricoRotas()
@@ -0,0 +1,29 @@
+from django.db import connections
+
+
+def explain_query_plan(query, params=(), using='default'):
+    """
+    Executa EXPLAIN QUERY PLAN (SQLite) e retorna as linhas de detalhe do
+    plano, ex.: 'SEARCH tabela USING INDEX ...'.
+
+    `query` pode ser um queryset ou o SQL de uma consulta capturada
+    (ex.: CaptureQueriesContext).
+    """
+    if hasattr(query, 'query'):
+        using = query.db
+        query, params = query.query.sql_with_params()
+
+    with connections[using].cursor() as cursor:
+        cursor.execute(f'EXPLAIN QUERY PLAN {query}', params)
+        return [row[-1] for row in cursor.fetchall()]
+
+
+def full_table_scans(query, params=(), using='default'):
+    """
+    Retorna os passos do plano que leem uma tabela inteira
+    ('SCAN tabela' sem índice). Lista vazia = nenhuma varredura completa.
+    """
+    return [
+        step for step in explain_query_plan(query, params, using)
+        if step.startswith('SCAN ') and ' USING ' not in step
+    ]
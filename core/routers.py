@@ -0,0 +1,108 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+# Cookie com o instante (epoch) até o qual o usuário lê só do banco principal
+COOKIE_PRIMARIO = 'primario_ate'
+# Segundos no principal após uma escrita, quando settings.REPLICA_JANELA_PRIMARIO não é definido
+JANELA_PRIMARIO_PADRAO = 5
+
+_ler_da_replica = ContextVar('ler_da_replica', default=False)
+
+
+def banco_leitura():
+    """
+    Alias da réplica de leitura (settings.BANCO_LEITURA), ou None se ela não
+    estiver configurada em DATABASES.
+    """
+    alias = getattr(settings, 'BANCO_LEITURA', None)
+    return alias if alias and alias in connections.settings else None
+
+
+def janela_primario():
+    return getattr(settings, 'REPLICA_JANELA_PRIMARIO', JANELA_PRIMARIO_PADRAO)
+
+
+class ReplicaLeituraRouter:
+    """
+    Manda para a réplica as leituras feitas dentro de ler_da_replica()
+    (relatórios, histórico, listagens). Escritas, leituras dentro de uma
+    transação do principal e todo o resto ficam no banco principal.
+    """
+
+    def db_for_read(self, model, **hints):
+        alias = banco_leitura()
+        if alias and _ler_da_replica.get() and not connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return alias
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        # Mesmo objetos lidos da réplica são gravados no principal
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Réplica e principal têm os mesmos dados
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # A réplica recebe o schema pela replicação, não pelo migrate
+        if db == banco_leitura():
+            return False
+        return None
+
+
+@contextmanager
+def ler_da_replica():
+    """
+    Leituras do bloco vão para a réplica, se houver uma configurada.
+    """
+    token = _ler_da_replica.set(True)
+    try:
+        yield
+    finally:
+        _ler_da_replica.reset(token)
+
+
+def _iterar_na_replica(conteudo):
+    # Respostas em streaming consultam o banco depois que a view retorna
+    iterador = iter(conteudo)
+    while True:
+        with ler_da_replica():
+            try:
+                parte = next(iterador)
+            except StopIteration:
+                return
+        yield parte
+
+
+def primario_fixado(request):
+    """
+    True se o usuário escreveu há menos de REPLICA_JANELA_PRIMARIO segundos
+    (a réplica pode ainda não ter as alterações dele).
+    """
+    try:
+        return float(request.COOKIES.get(COOKIE_PRIMARIO, 0)) > time.time()
+    except ValueError:
+        return False
+
+
+def leitura_em_replica(view):
+    """
+    Decorator de views só de leitura: a view, e a geração de respostas em
+    streaming (ex.: CSV), leem da réplica. Logo depois de uma escrita do
+    próprio usuário, continua no principal (cookie de PrimarioAposEscritaMiddleware).
+    """
+    @wraps(view)
+    def _view(request, *args, **kwargs):
+        if primario_fixado(request):
+            return view(request, *args, **kwargs)
+        with ler_da_replica():
+            response = view(request, *args, **kwargs)
+        if response.streaming:
+            response.streaming_content = _iterar_na_replica(response.streaming_content)
+        return response
+    return _view
@@ -0,0 +1,58 @@
+import unicodedata
+
+from django.db import models
+from django.http import JsonResponse
+
+AUTOCOMPLETE_LIMIT = 20
+
+
+def normalizar_busca(texto):
+    """
+    Forma do nome usada na busca por prefixo: sem acentos e em casefold,
+    para que "Ângela" case com 'ang', 'âng' ou 'ÂNG'. Gravada na coluna
+    nome_busca dos modelos e aplicada também ao termo buscado.
+    """
+    decomposto = unicodedata.normalize('NFKD', texto or '')
+    return ''.join(c for c in decomposto if not unicodedata.combining(c)).casefold()
+
+
+class NomeBuscaQuerySet(models.QuerySet):
+    """
+    QuerySet dos modelos com coluna nome_busca: o bulk_create não passa
+    pelo save(), então preenche a coluna aqui.
+    """
+
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = list(objs)
+        for obj in objs:
+            obj.nome_busca = normalizar_busca(obj.nome)
+        return super().bulk_create(objs, *args, **kwargs)
+
+
+def prefix_search(queryset, field, term, limit=AUTOCOMPLETE_LIMIT):
+    """
+    Busca por prefixo, sem diferenciar maiúsculas nem acentos, em `field`:
+    uma coluna já normalizada (normalizar_busca), com índice B-tree comum,
+    que o LIKE 'termo%' percorre só no trecho que casa com o prefixo.
+    """
+    term = normalizar_busca(term.strip())
+    if not term:
+        return queryset.none()
+
+    return queryset.filter(**{f'{field}__startswith': term}).order_by(field, 'pk')[:limit]
+
+
+def autocomplete_response(request, queryset, field, label):
+    """
+    Resposta JSON do autocomplete: {"results": [{"id": pk, "text": rótulo}]}.
+    `label` recebe cada objeto e devolve o texto exibido.
+    """
+    try:
+        limit = min(int(request.GET.get('limit', AUTOCOMPLETE_LIMIT)), AUTOCOMPLETE_LIMIT)
+    except ValueError:
+        limit = AUTOCOMPLETE_LIMIT
+
+    objetos = prefix_search(queryset, field, request.GET.get('q', ''), max(limit, 1))
+    return JsonResponse({
+        'results': [{'id': obj.pk, 'text': label(obj)} for obj in objetos],
+    })
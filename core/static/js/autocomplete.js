@@ -0,0 +1,45 @@
+// Autocomplete para selects com data-autocomplete-url (AutocompleteSelect).
+// Insere um campo de busca antes do select e troca as opções pelos
+// resultados do endpoint conforme o usuário digita.
+document.addEventListener('DOMContentLoaded', () => {
+    document.querySelectorAll('select[data-autocomplete-url]').forEach((select) => {
+        const search = document.createElement('input');
+        search.type = 'search';
+        search.className = 'form-input';
+        search.placeholder = 'Digite para buscar...';
+        select.parentNode.insertBefore(search, select);
+
+        let timer = null;
+        search.addEventListener('input', () => {
+            clearTimeout(timer);
+            timer = setTimeout(() => {
+                const term = search.value.trim();
+                if (!term) {
+                    return;
+                }
+                const url = select.dataset.autocompleteUrl + '?q=' + encodeURIComponent(term);
+                fetch(url, { credentials: 'same-origin' })
+                    .then((response) => response.json())
+                    .then((data) => {
+                        if (select.multiple) {
+                            // Mantém os já selecionados e acrescenta os novos resultados
+                            Array.from(select.options)
+                                .filter((option) => !option.selected)
+                                .forEach((option) => option.remove());
+                            const presentes = new Set(Array.from(select.options).map((option) => option.value));
+                            data.results
+                                .filter((item) => !presentes.has(String(item.id)))
+                                .forEach((item) => select.add(new Option(item.text, item.id)));
+                            return;
+                        }
+                        select.innerHTML = '';
+                        data.results.forEach((item, index) => {
+                            select.add(new Option(item.text, item.id, index === 0, index === 0));
+                        });
+                        // Avisa os outros scripts (ex.: display de estoque) da nova seleção
+                        select.dispatchEvent(new Event('change'));
+                    });
+            }, 250);
+        });
+    });
+});
@@ -1,19 +1,68 @@
 from datetime import datetime, timedelta
+from io import BytesIO, StringIO
+import tempfile
+import threading
 import pytest
-from django.test import TestCase, Client
+from django.test import TestCase, TransactionTestCase, Client, RequestFactory, override_settings
+from django.conf import settings
 from django.utils import timezone
 from django.contrib.auth.models import User
 from django.urls import reverse
-from django.db import models
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection, connections, models, transaction
+from django.test.utils import CaptureQueriesContext
+from django.core.management import call_command
+from django.core.management.base import CommandError
 
-from core.utils import calculate_deadline
+from core.utils import calculate_deadline, calculate_deadlines
+from core.query_plan import full_table_scans
+from core.search import prefix_search
+from core.performance import HistoricoRotas, historico_rotas, percentil
+from core.routers import COOKIE_PRIMARIO, ReplicaLeituraRouter, ler_da_replica
+from core.pagination import encode_cursor, paginate_keyset
+from core.benchmark import (
+    LISTAGENS,
+    PERFIL_SQLITE_PADRAO,
+    comparar_com_baseline,
+    executar_benchmarks,
+    medir_concorrencia,
+    perfil_banco,
+)
+from core.dados_sinteticos import _FormatoData, gerar_dados
 from core.forms import RegistrationForm, LoginForm
-from equipamentos.models import Equipamento
+from equipamentos.models import Equipamento, EstoqueVersao, MovimentoEstoque, SaldoEstoque
+from equipamentos.services import (
+    cadastrar_equipamento,
+    criar_checkpoints,
+    estoque_em,
+    importar_equipamentos,
+    reconciliar_estoque,
+)
 from equipamentos.forms import EquipamentoForm
 from colaboradores.models import Colaborador
 from colaboradores.forms import ColaboradorForm
-from emprestimos.models import Emprestimo
+from colaboradores.services import importar_colaboradores
+from emprestimos.models import Emprestimo, EmprestimoArquivado, EmprestimoAtrasado
+from dashboard.models import EmprestimosPorDia, IndicadoresDashboard
+from dashboard.services import recalcular_indicadores
+from relatorios.models import MovimentoColaboradorDiario, MovimentoEquipamentoDiario
+from relatorios.services import consolidar_dias, consolidar_relatorios
 from emprestimos.forms import EmprestimoForm
+from emprestimos.services import (
+    EstoqueIndisponivel,
+    LoteInvalido,
+    DEVOLVIDO,
+    JA_DEVOLVIDO,
+    NAO_ENCONTRADO,
+    devolver_emprestimo,
+    devolver_emprestimos_em_lote,
+    editar_emprestimo,
+    excluir_emprestimo,
+    registrar_emprestimo,
+    registrar_emprestimos_em_lote,
+    detectar_atrasados,
+    arquivar_devolvidos,
+)
 
 
 # =====================================================
@@ -501,3 +550,2016 @@ class HistoricoTestCase(TestCase):
         self.assertIn('object_data', response.context)
         self.assertEqual(len(response.context['object_data']), 1)
         self.assertIn('Carlos', str(response.context['object_data']))
+
+
+# =====================================================
+# DESEMPENHO: CONSULTAS DAS LISTAGENS
+# =====================================================
+@pytest.mark.django_db
+class ListagensConsultasTestCase(TestCase):
+    """Garante que as listagens de empréstimos não fazem uma consulta por linha."""
+
+    def setUp(self):
+        self.client = Client()
+        self.user = User.objects.create_user(username='test@test.com', password='pass')
+        self.client.login(username='test@test.com', password='pass')
+
+    def criar_emprestimos(self, total, status):
+        """Cria `total` empréstimos, cada um com colaborador e equipamento próprios."""
+        inicio = Colaborador.objects.count()
+        for i in range(inicio, inicio + total):
+            colaborador = Colaborador.objects.create(nome=f"Colaborador {i}", email=f"col{i}@test.com")
+            equipamento = Equipamento.objects.create(nome=f"Equipamento {i}", marca="3M", quantidade=10)
+            Emprestimo.objects.create(
+                nome=colaborador,
+                equipamento=equipamento,
+                quantidade=1,
+                data_prazo=calculate_deadline(timezone.now()),
+                estoque_disponivel=9,
+                status=status,
+                data_devolucao_real=timezone.now() if status == 'DEVOLVIDO' else None,
+            )
+
+    def assert_consultas_constantes(self, url, status, consultas=3):
+        """
+        Verifica o número fixo de consultas com 1 e com 20 linhas
+        (sessão + usuário + listagem). Respostas em streaming são
+        consumidas dentro da contagem.
+        """
+        for total in (1, 19):
+            self.criar_emprestimos(total, status)
+            with self.assertNumQueries(consultas):
+                response = self.client.get(url)
+                if response.streaming:
+                    response.conteudo = b''.join(response.streaming_content)
+            self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_unit_lista_emprestimos_ativos_consultas_fixas(self):
+        response = self.assert_consultas_constantes(reverse('emprestimos:app_requests'), 'EMPRESTADO')
+        self.assertEqual(len(response.context['object_data']), 20)
+        self.assertIn('Colaborador 0', str(response.context['object_data']))
+
+    def test_unit_historico_consultas_fixas(self):
+        # Uma consulta a mais: o arquivo de empréstimos é lido junto
+        response = self.assert_consultas_constantes(reverse('historico:app_history'), 'DEVOLVIDO', 4)
+        self.assertEqual(len(response.context['object_data']), 20)
+        self.assertIn('Equipamento 19', str(response.context['object_data']))
+
+    def test_unit_csv_movimentacoes_consultas_fixas(self):
+        response = self.assert_consultas_constantes(
+            reverse('relatorios:download_movimentacoes_csv'), 'DEVOLVIDO', 4
+        )
+        conteudo = response.conteudo.decode('utf-8')
+        self.assertEqual(len(conteudo.strip().splitlines()), 21)
+        self.assertIn('Colaborador 19,Equipamento 19,1', conteudo)
+
+    def test_unit_csv_movimentacoes_envia_cabecalho_antes_da_consulta(self):
+        """
+        O CSV é enviado em streaming: o cabeçalho sai antes de qualquer
+        consulta aos empréstimos e as linhas são lidas em lotes.
+        """
+        self.criar_emprestimos(5, 'EMPRESTADO')
+        response = self.client.get(reverse('relatorios:download_movimentacoes_csv'))
+        self.assertTrue(response.streaming)
+
+        partes = iter(response.streaming_content)
+        with self.assertNumQueries(0):
+            cabecalho = next(partes).decode('utf-8')
+        self.assertTrue(cabecalho.startswith('\ufeffID,Colaborador,Equipamento'))
+        self.assertEqual(len(list(partes)), 5)
+
+
+
+# =====================================================
+# DESEMPENHO: PAGINAÇÃO POR CURSOR
+# =====================================================
+@pytest.mark.django_db
+@override_settings(LIST_PAGE_SIZE=2)
+class PaginacaoTestCase(TestCase):
+    """Testes da paginação por cursor (keyset) das listagens."""
+
+    def setUp(self):
+        self.client = Client()
+        self.user = User.objects.create_user(username='test@test.com', password='pass')
+        self.client.login(username='test@test.com', password='pass')
+
+    def percorrer(self, url):
+        """Avança por todas as páginas e retorna (páginas, última resposta)."""
+        paginas = []
+        response = self.client.get(url)
+        while True:
+            paginas.append([obj['pk'] for obj in response.context['object_data']])
+            cursor = response.context['page'].next_cursor
+            if not cursor:
+                return paginas, response
+            response = self.client.get(url, {'after': cursor})
+
+    # TESTE UNITÁRIO 1
+    def test_unit_desempate_por_pk_com_nomes_repetidos(self):
+        """
+        Com nomes repetidos, a ordem (nome, pk) não pode perder nem repetir linhas.
+        """
+        pks = [
+            Colaborador.objects.create(nome=nome, email=f"col{i}@test.com").pk
+            for i, nome in enumerate(["Ana", "Ana", "Ana", "Bruno", "Ana"])
+        ]
+        paginas, _ = self.percorrer(reverse('colaboradores:app_users'))
+
+        self.assertEqual([len(p) for p in paginas], [2, 2, 1])
+        vistos = [pk for pagina in paginas for pk in pagina]
+        self.assertEqual(vistos, [pks[0], pks[1], pks[2], pks[4], pks[3]])
+
+    # TESTE UNITÁRIO 2
+    def test_unit_cursor_invalido_volta_para_primeira_pagina(self):
+        for i in range(3):
+            Equipamento.objects.create(nome=f"Equipamento {i}", marca="3M", quantidade=5)
+
+        response = self.client.get(reverse('equipamentos:app_items'), {'after': 'invalido'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('Equipamento 0', str(response.context['object_data']))
+        self.assertFalse(response.context['page'].has_previous)
+
+    def test_unit_campo_de_ordenacao_anulavel(self):
+        colaborador = Colaborador.objects.create(nome="Carlos", email="carlos@test.com")
+        equipamento = Equipamento.objects.create(nome="Luva", marca="Safety", quantidade=10)
+        for devolvido in (True, False, True, False):
+            Emprestimo.objects.create(
+                nome=colaborador, equipamento=equipamento, quantidade=1,
+                data_prazo=timezone.now(),
+                status='DEVOLVIDO' if devolvido else 'EMPRESTADO',
+                data_devolucao_real=timezone.now() if devolvido else None,
+            )
+        devolvidos = list(Emprestimo.objects.filter(status='DEVOLVIDO').order_by('-data_devolucao_real', '-pk'))
+        linhas = lambda qs: qs.values('pk', 'data_devolucao_real')
+
+        def pagina(**params):
+            request = RequestFactory().get('/', params)
+            return paginate_keyset(request, Emprestimo.objects.all(), '-data_devolucao_real', linhas, page_size=1)
+
+        # Sem devolução (NULL) não entra; o cursor avança normalmente
+        primeira = pagina()
+        segunda = pagina(after=primeira.next_cursor)
+        self.assertEqual([linha['pk'] for linha in primeira], [devolvidos[0].pk])
+        self.assertEqual([linha['pk'] for linha in segunda], [devolvidos[1].pk])
+        self.assertFalse(segunda.has_next)
+        # Cursor com valor nulo é inválido: volta para a primeira página
+        self.assertEqual([linha['pk'] for linha in pagina(after=encode_cursor(None, 1))], [devolvidos[0].pk])
+
+    # TESTE DE INTEGRAÇÃO
+    def test_integration_avancar_e_voltar_emprestimos_com_datas_iguais(self):
+        """
+        Avança até a última página de empréstimos ativos (todos com a mesma
+        data) e volta pelo link "Anterior".
+        """
+        colaborador = Colaborador.objects.create(nome="Carlos", email="carlos@test.com")
+        equipamento = Equipamento.objects.create(nome="Luva", marca="Safety", quantidade=10)
+        for _ in range(5):
+            Emprestimo.objects.create(
+                nome=colaborador,
+                equipamento=equipamento,
+                quantidade=1,
+                data_prazo=calculate_deadline(timezone.now()),
+                status='EMPRESTADO',
+            )
+        Emprestimo.objects.update(data_emprestimo=timezone.now())
+        url = reverse('emprestimos:app_requests')
+
+        paginas, response = self.percorrer(url)
+        ordem = list(Emprestimo.objects.order_by('-pk').values_list('pk', flat=True))
+        self.assertEqual([pk for pagina in paginas for pk in pagina], ordem)
+        self.assertContains(response, 'Anterior')
+
+        response = self.client.get(url, {'before': response.context['page'].previous_cursor})
+        self.assertEqual([obj['pk'] for obj in response.context['object_data']], paginas[-2])
+        self.assertTrue(response.context['page'].has_next)
+
+
+
+# =====================================================
+# APP: RELATÓRIOS
+# =====================================================
+@pytest.mark.django_db
+class RelatoriosTestCase(TestCase):
+    """Testes dos filtros da exportação de movimentações."""
+
+    def setUp(self):
+        self.client = Client()
+        self.user = User.objects.create_user(username='test@test.com', password='pass')
+        self.client.login(username='test@test.com', password='pass')
+
+        self.ana = Colaborador.objects.create(nome="Ana", email="ana@test.com")
+        self.bruno = Colaborador.objects.create(nome="Bruno", email="bruno@test.com")
+        self.capacete = Equipamento.objects.create(nome="Capacete", marca="3M", quantidade=10)
+        self.luva = Equipamento.objects.create(nome="Luva", marca="Safety", quantidade=10)
+
+    def criar(self, colaborador, equipamento, data_emprestimo, status='EMPRESTADO'):
+        emprestimo = Emprestimo.objects.create(
+            nome=colaborador,
+            equipamento=equipamento,
+            quantidade=1,
+            data_prazo=calculate_deadline(data_emprestimo),
+            status=status,
+            data_devolucao_real=data_emprestimo + timedelta(days=2) if status == 'DEVOLVIDO' else None,
+        )
+        Emprestimo.objects.filter(pk=emprestimo.pk).update(data_emprestimo=data_emprestimo)
+        return emprestimo
+
+    def exportar(self, **params):
+        response = self.client.get(reverse('relatorios:download_movimentacoes_csv'), params)
+        self.assertEqual(response.status_code, 200)
+        linhas = b''.join(response.streaming_content).decode('utf-8').strip().splitlines()
+        return [int(linha.split(',')[0]) for linha in linhas[1:]]
+
+    # TESTE UNITÁRIO 1
+    def test_unit_filtro_periodo_inclui_dia_final(self):
+        """
+        O período é inclusivo nos dois extremos, no fuso local.
+        """
+        tz = timezone.get_current_timezone()
+        fevereiro = self.criar(self.ana, self.capacete, datetime(2025, 2, 28, 23, 30, tzinfo=tz))
+        marco_inicio = self.criar(self.ana, self.capacete, datetime(2025, 3, 1, 0, 0, tzinfo=tz))
+        marco_fim = self.criar(self.ana, self.capacete, datetime(2025, 3, 31, 23, 59, tzinfo=tz))
+        self.criar(self.ana, self.capacete, datetime(2025, 4, 1, 0, 0, tzinfo=tz))
+
+        pks = self.exportar(data_inicio='2025-03-01', data_fim='2025-03-31')
+
+        self.assertEqual(pks, [marco_fim.pk, marco_inicio.pk])
+        self.assertNotIn(fevereiro.pk, pks)
+
+    # TESTE UNITÁRIO 2
+    def test_unit_filtro_invalido_volta_para_relatorios(self):
+        response = self.client.get(
+            reverse('relatorios:download_movimentacoes_csv'),
+            {'data_inicio': '2025-03-31', 'data_fim': '2025-03-01'},
+        )
+        self.assertRedirects(response, reverse('relatorios:app_reports'))
+
+    # TESTE DE INTEGRAÇÃO
+    def test_integration_filtros_combinados_por_devolucao_status_e_entidades(self):
+        tz = timezone.get_current_timezone()
+        alvo = self.criar(self.bruno, self.luva, datetime(2025, 5, 10, 9, 0, tzinfo=tz), status='DEVOLVIDO')
+        self.criar(self.ana, self.luva, datetime(2025, 5, 10, 9, 0, tzinfo=tz), status='DEVOLVIDO')
+        self.criar(self.bruno, self.capacete, datetime(2025, 5, 10, 9, 0, tzinfo=tz), status='DEVOLVIDO')
+        self.criar(self.bruno, self.luva, datetime(2025, 5, 10, 9, 0, tzinfo=tz))
+
+        pks = self.exportar(
+            campo_data='data_devolucao_real',
+            data_inicio='2025-05-12',
+            data_fim='2025-05-12',
+            status='DEVOLVIDO',
+            colaborador=self.bruno.pk,
+            equipamento=self.luva.pk,
+        )
+
+        self.assertEqual(pks, [alvo.pk])
+
+
+
+# =====================================================
+# DESEMPENHO: ÍNDICES (EXPLAIN QUERY PLAN)
+# =====================================================
+@pytest.mark.django_db
+class IndicesTestCase(TestCase):
+    """Nenhuma consulta principal das telas pode varrer a tabela inteira."""
+
+    def setUp(self):
+        self.client = Client()
+        self.user = User.objects.create_user(username='test@test.com', password='pass')
+        self.client.login(username='test@test.com', password='pass')
+
+        colaborador = Colaborador.objects.create(nome="Carlos", email="carlos@test.com")
+        equipamento = Equipamento.objects.create(nome="Luva", marca="Safety", quantidade=10)
+        for status in ('EMPRESTADO', 'EMPRESTADO', 'DEVOLVIDO'):
+            Emprestimo.objects.create(
+                nome=colaborador,
+                equipamento=equipamento,
+                quantidade=1,
+                data_prazo=calculate_deadline(timezone.now()),
+                status=status,
+                data_devolucao_real=timezone.now() if status == 'DEVOLVIDO' else None,
+            )
+
+    def assert_sem_varredura_completa(self, url, params=None):
+        """Captura as consultas da view e roda EXPLAIN QUERY PLAN em cada uma."""
+        with CaptureQueriesContext(connection) as consultas:
+            response = self.client.get(url, params or {})
+            if response.streaming:
+                b''.join(response.streaming_content)
+        self.assertEqual(response.status_code, 200)
+
+        for consulta in consultas.captured_queries:
+            self.assertEqual(full_table_scans(consulta['sql']), [], consulta['sql'])
+        return response
+
+    # TESTE UNITÁRIO 1
+    def test_unit_listagens_usam_indices(self):
+        for nome_url in ('emprestimos:app_requests', 'historico:app_history',
+                         'colaboradores:app_users', 'equipamentos:app_items',
+                         'equipamentos:app_items_low_stock', 'dashboard:app_dashboard'):
+            with self.subTest(nome_url):
+                self.assert_sem_varredura_completa(reverse(nome_url))
+
+    # TESTE UNITÁRIO 2
+    def test_unit_consulta_de_atrasados_usa_indice_parcial(self):
+        atrasados = Emprestimo.objects.filter(status='EMPRESTADO', data_prazo__lt=timezone.now())
+        self.assertEqual(full_table_scans(atrasados), [])
+
+    # TESTE DE INTEGRAÇÃO
+    def test_integration_paginas_seguintes_e_exportacao_usam_indices(self):
+        url = reverse('emprestimos:app_requests')
+        with override_settings(LIST_PAGE_SIZE=1):
+            response = self.assert_sem_varredura_completa(url)
+            self.assert_sem_varredura_completa(url, {'after': response.context['page'].next_cursor})
+
+        csv_url = reverse('relatorios:download_movimentacoes_csv')
+        self.assert_sem_varredura_completa(csv_url)
+        self.assert_sem_varredura_completa(csv_url, {'status': 'DEVOLVIDO'})
+        self.assert_sem_varredura_completa(csv_url, {'data_inicio': '2025-01-01', 'data_fim': '2025-01-31'})
+
+
+
+# =====================================================
+# APP: EMPRÉSTIMOS - ESTOQUE ATÔMICO
+# =====================================================
+@pytest.mark.django_db
+class EstoqueAtomicoTestCase(TestCase):
+    """Testes da baixa e reposição de estoque com UPDATE condicional."""
+
+    def setUp(self):
+        self.colaborador = Colaborador.objects.create(nome="João Silva", email="joao@test.com")
+        self.equipamento = Equipamento.objects.create(nome="Capacete", marca="3M", quantidade=10)
+
+    def novo_emprestimo(self, quantidade):
+        return Emprestimo(nome=self.colaborador, equipamento=self.equipamento, quantidade=quantidade)
+
+    # TESTE UNITÁRIO 1
+    def test_unit_registrar_baixa_estoque_e_grava_snapshot(self):
+        emprestimo = registrar_emprestimo(self.novo_emprestimo(4))
+
+        self.equipamento.refresh_from_db()
+        self.assertEqual(self.equipamento.quantidade, 6)
+        self.assertEqual(emprestimo.estoque_disponivel, 6)
+        self.assertIsNotNone(emprestimo.data_prazo)
+
+        with self.assertRaises(EstoqueIndisponivel):
+            registrar_emprestimo(self.novo_emprestimo(7))
+        self.equipamento.refresh_from_db()
+        self.assertEqual(self.equipamento.quantidade, 6)
+        self.assertEqual(Emprestimo.objects.count(), 1)
+
+    # TESTE UNITÁRIO 2
+    def test_unit_devolucao_repetida_repoe_estoque_uma_vez(self):
+        emprestimo = registrar_emprestimo(self.novo_emprestimo(3))
+
+        self.assertTrue(devolver_emprestimo(emprestimo.pk))
+        self.assertFalse(devolver_emprestimo(emprestimo.pk))
+        excluir_emprestimo(emprestimo.pk)
+
+        self.equipamento.refresh_from_db()
+        self.assertEqual(self.equipamento.quantidade, 10)
+        self.assertFalse(Emprestimo.objects.filter(pk=emprestimo.pk).exists())
+
+    def test_unit_exclusao_com_devolucao_simultanea_repoe_estoque_uma_vez(self):
+        emprestimo = registrar_emprestimo(self.novo_emprestimo(3))
+
+        def devolucao_concorrente(execute, sql, params, many, context):
+            # A devolução termina logo antes da primeira escrita da exclusão
+            escrita = sql.startswith(('UPDATE "emprestimos_emprestimo"', 'DELETE FROM "emprestimos_emprestimo"'))
+            if escrita and not getattr(self, 'injetado', False):
+                self.injetado = True
+                devolver_emprestimo(emprestimo.pk)
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(devolucao_concorrente):
+            excluir_emprestimo(emprestimo.pk)
+
+        self.equipamento.refresh_from_db()
+        self.assertEqual(self.equipamento.quantidade, 10)
+        self.assertFalse(Emprestimo.objects.filter(pk=emprestimo.pk).exists())
+
+
+@pytest.mark.django_db(transaction=True)
+class EstoqueConcorrenciaTestCase(TransactionTestCase):
+    """Empréstimos simultâneos no banco SQLite em arquivo."""
+
+    # TESTE DE INTEGRAÇÃO
+    def test_integration_emprestimos_simultaneos_nao_vendem_acima_do_estoque(self):
+        """
+        10 threads pedem 1 unidade ao mesmo tempo de um estoque de 5:
+        exatamente 5 passam e o estoque termina em 0.
+        """
+        colaborador = Colaborador.objects.create(nome="João Silva", email="joao@test.com")
+        equipamento = Equipamento.objects.create(nome="Capacete", marca="3M", quantidade=5)
+        largada = threading.Barrier(10)
+        resultados = []
+
+        def pedir():
+            try:
+                largada.wait()
+                registrar_emprestimo(Emprestimo(nome_id=colaborador.pk, equipamento_id=equipamento.pk, quantidade=1))
+                resultados.append('ok')
+            except EstoqueIndisponivel:
+                resultados.append('sem estoque')
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=pedir) for _ in range(10)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        equipamento.refresh_from_db()
+        self.assertEqual(resultados.count('ok'), 5)
+        self.assertEqual(resultados.count('sem estoque'), 5)
+        self.assertEqual(equipamento.quantidade, 0)
+        self.assertEqual(Emprestimo.objects.count(), 5)
+        self.assertEqual(
+            sorted(Emprestimo.objects.values_list('estoque_disponivel', flat=True)),
+            [0, 1, 2, 3, 4],
+        )
+
+
+
+# =====================================================
+# APP: EQUIPAMENTOS - ENDPOINT DE ESTOQUE
+# =====================================================
+@pytest.mark.django_db
+class EstoqueEndpointTestCase(TestCase):
+    """Testes do JSON de estoque com ETag / GET condicional."""
+
+    def setUp(self):
+        self.client = Client()
+        self.user = User.objects.create_user(username='test@test.com', password='pass')
+        self.client.login(username='test@test.com', password='pass')
+        self.colaborador = Colaborador.objects.create(nome="João Silva", email="joao@test.com")
+        self.equipamento = Equipamento.objects.create(nome="Capacete", marca="3M", quantidade=10)
+        self.url = reverse('equipamentos:app_items_stock')
+
+    # TESTE UNITÁRIO 1
+    def test_unit_retorna_estoque_com_etag(self):
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {str(self.equipamento.pk): 10})
+        self.assertTrue(response.has_header('ETag'))
+
+    # TESTE UNITÁRIO 2
+    def test_unit_responde_304_sem_alteracao(self):
+        etag = self.client.get(self.url)['ETag']
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+
+    # TESTE DE INTEGRAÇÃO
+    def test_integration_emprestimo_invalida_etag(self):
+        """
+        Criar um empréstimo muda a versão do estoque: o ETag antigo deixa de
+        valer e o JSON traz a nova quantidade. A página do formulário não
+        embute mais o estoque.
+        """
+        etag = self.client.get(self.url)['ETag']
+
+        self.client.post(reverse('emprestimos:app_requests_create'), {
+            'nome': self.colaborador.pk,
+            'equipamento': self.equipamento.pk,
+            'quantidade': 3,
+        })
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(response.json(), {str(self.equipamento.pk): 7})
+
+        pagina = self.client.get(reverse('emprestimos:app_requests_create'))
+        self.assertNotIn('equipamentos_json', pagina.context)
+        self.assertContains(pagina, self.url)
+
+
+
+# =====================================================
+# AUTOCOMPLETE (COLABORADOR / EQUIPAMENTO)
+# =====================================================
+@pytest.mark.django_db
+class AutocompleteTestCase(TestCase):
+    """Testes da busca por prefixo e do formulário sem lista completa de opções."""
+
+    def setUp(self):
+        self.client = Client()
+        self.user = User.objects.create_user(username='test@test.com', password='pass')
+        self.client.login(username='test@test.com', password='pass')
+        Colaborador.objects.bulk_create([
+            Colaborador(nome=f"Operador {i:02d}", email=f"op{i}@test.com") for i in range(30)
+        ])
+        self.ana = Colaborador.objects.create(nome="Ana Souza", email="ana@test.com")
+        self.equipamento = Equipamento.objects.create(nome="Capacete", marca="3M", quantidade=10)
+
+    # TESTE UNITÁRIO 1
+    def test_unit_busca_por_prefixo_sem_diferenciar_maiusculas_e_com_limite(self):
+        response = self.client.get(reverse('colaboradores:app_users_search'), {'q': 'oper', 'limit': 5})
+        resultados = response.json()['results']
+
+        self.assertEqual([r['text'] for r in resultados], [f"Operador {i:02d}" for i in range(5)])
+
+        response = self.client.get(reverse('equipamentos:app_items_search'), {'q': 'CAP'})
+        self.assertEqual(response.json()['results'], [{'id': self.equipamento.pk, 'text': 'Capacete (3M)'}])
+
+        busca = prefix_search(Colaborador.objects.all(), 'nome_busca', 'ana')
+        self.assertEqual(full_table_scans(busca), [])
+
+    def test_unit_busca_por_prefixo_com_inicial_acentuada(self):
+        angela = Colaborador.objects.create(nome="Ângela Dias", email="angela@test.com")
+        oculos = Equipamento.objects.create(nome="Óculos de Proteção", marca="3M", quantidade=5)
+
+        for termo in ('Âng', 'âng', 'ang', 'ÂNGELA D'):
+            self.assertEqual(list(prefix_search(Colaborador.objects.all(), 'nome_busca', termo)), [angela], termo)
+        self.assertEqual(list(prefix_search(Equipamento.objects.all(), 'nome_busca', 'oculos')), [oculos])
+        busca = prefix_search(Colaborador.objects.all(), 'nome_busca', 'âng')
+        self.assertEqual(full_table_scans(busca), [])
+
+        # Renomear pelo save(update_fields=...) também atualiza a coluna de busca
+        angela.nome = "Élida Dias"
+        angela.save(update_fields=['nome'])
+        self.assertEqual(list(prefix_search(Colaborador.objects.all(), 'nome_busca', 'eli')), [angela])
+
+        # Índices comuns: o banco continua íntegro para qualquer cliente SQLite
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA integrity_check')
+            self.assertEqual(cursor.fetchall(), [('ok',)])
+
+    # TESTE UNITÁRIO 2
+    def test_unit_formulario_valida_pk_sem_carregar_opcoes(self):
+        form = EmprestimoForm(data={
+            'nome': self.ana.pk,
+            'equipamento': self.equipamento.pk,
+            'quantidade': 1,
+        })
+        # Por campo: busca pelo pk (form) + checagem da FK (modelo),
+        # independente de quantos colaboradores existem
+        with self.assertNumQueries(4):
+            self.assertTrue(form.is_valid())
+
+    # TESTE DE INTEGRAÇÃO
+    def test_integration_paginas_renderizam_so_a_opcao_selecionada(self):
+        response = self.client.get(reverse('emprestimos:app_requests_create'))
+        self.assertNotContains(response, 'Operador 00')
+        self.assertContains(response, reverse('colaboradores:app_users_search'))
+        self.assertContains(response, 'js/autocomplete.js')
+
+        emprestimo = registrar_emprestimo(Emprestimo(nome=self.ana, equipamento=self.equipamento, quantidade=1))
+        response = self.client.get(reverse('emprestimos:app_requests_edit', args=[emprestimo.pk]))
+        self.assertContains(response, f'<option value="{self.ana.pk}" selected>Ana Souza</option>', html=True)
+        self.assertNotContains(response, 'Operador 00')
+
+
+
+# =====================================================
+# APP: EMPRÉSTIMOS - EMPRÉSTIMO EM LOTE
+# =====================================================
+@pytest.mark.django_db
+class EmprestimoLoteTestCase(TestCase):
+    """Testes do empréstimo do mesmo kit para vários colaboradores."""
+
+    def setUp(self):
+        self.client = Client()
+        self.user = User.objects.create_user(username='test@test.com', password='pass')
+        self.client.login(username='test@test.com', password='pass')
+        self.colaboradores = [
+            Colaborador.objects.create(nome=f"Colaborador {i}", email=f"col{i}@test.com") for i in range(3)
+        ]
+        self.capacete = Equipamento.objects.create(nome="Capacete", marca="3M", quantidade=10)
+        self.luva = Equipamento.objects.create(nome="Luva", marca="Safety", quantidade=4)
+        EstoqueVersao.incrementar()
+        IndicadoresDashboard.ajustar()
+        EmprestimosPorDia.ajustar(timezone.localdate(), 0)
+
+    def linhas(self, quantidade=1):
+        return [
+            (colaborador.pk, equipamento.pk, quantidade)
+            for colaborador in self.colaboradores
+            for equipamento in (self.capacete, self.luva)
+        ]
+
+    # TESTE UNITÁRIO 1
+    def test_unit_lote_baixa_estoque_uma_vez_por_equipamento(self):
+        """
+        O número de consultas depende dos equipamentos, não das linhas;
+        o snapshot de estoque segue a ordem do lote.
+        """
+        # colaboradores + savepoint + 2 UPDATEs de estoque + leitura + INSERT + livro
+        # + versão + 2 UPDATEs de indicadores do dashboard + release
+        with self.assertNumQueries(11):
+            emprestimos = registrar_emprestimos_em_lote(self.linhas())
+
+        self.assertEqual(len(emprestimos), 6)
+        self.capacete.refresh_from_db()
+        self.luva.refresh_from_db()
+        self.assertEqual((self.capacete.quantidade, self.luva.quantidade), (7, 1))
+        snapshots = list(
+            Emprestimo.objects.filter(equipamento=self.capacete).order_by('pk').values_list('estoque_disponivel', flat=True)
+        )
+        self.assertEqual(snapshots, [9, 8, 7])
+
+    # TESTE UNITÁRIO 2
+    def test_unit_lote_sem_estoque_nao_grava_nada(self):
+        with self.assertRaises(LoteInvalido) as contexto:
+            registrar_emprestimos_em_lote(self.linhas(quantidade=2))
+
+        self.assertIn('Quantidade indisponível de "Luva": pedido 6, estoque atual: 4', contexto.exception.erros[0])
+        self.capacete.refresh_from_db()
+        self.assertEqual(self.capacete.quantidade, 10)
+        self.assertEqual(Emprestimo.objects.count(), 0)
+
+    # TESTE DE INTEGRAÇÃO
+    def test_integration_formulario_de_lote(self):
+        url = reverse('emprestimos:app_requests_batch')
+        response = self.client.post(url, {
+            'colaboradores': [c.pk for c in self.colaboradores],
+            'equipamentos': [self.capacete.pk, self.luva.pk],
+            'quantidade': 1,
+        })
+
+        self.assertRedirects(response, reverse('emprestimos:app_requests'))
+        self.assertEqual(Emprestimo.objects.filter(status='EMPRESTADO').count(), 6)
+
+        response = self.client.post(url, {
+            'colaboradores': [c.pk for c in self.colaboradores],
+            'equipamentos': [self.luva.pk],
+            'quantidade': 1,
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('Quantidade indisponível de "Luva"', response.context['form'].non_field_errors()[0])
+        self.assertEqual(Emprestimo.objects.count(), 6)
+
+
+
+# =====================================================
+# APP: EMPRÉSTIMOS - DEVOLUÇÃO EM LOTE
+# =====================================================
+@pytest.mark.django_db
+class DevolucaoLoteTestCase(TestCase):
+    """Testes da devolução de vários empréstimos de uma vez."""
+
+    def setUp(self):
+        self.client = Client()
+        self.user = User.objects.create_user(username='test@test.com', password='pass')
+        self.client.login(username='test@test.com', password='pass')
+        self.colaborador = Colaborador.objects.create(nome="Carlos", email="carlos@test.com")
+        self.capacete = Equipamento.objects.create(nome="Capacete", marca="3M", quantidade=20)
+        self.luva = Equipamento.objects.create(nome="Luva", marca="Safety", quantidade=20)
+        EstoqueVersao.incrementar()
+        self.emprestimos = registrar_emprestimos_em_lote(
+            [(self.colaborador.pk, self.capacete.pk, 2)] * 5 + [(self.colaborador.pk, self.luva.pk, 3)] * 5
+        )
+
+    # TESTE UNITÁRIO 1
+    def test_unit_devolucao_em_lote_com_consultas_por_equipamento(self):
+        pks = [emp.pk for emp in self.emprestimos]
+
+        # leitura travada + UPDATE dos empréstimos + 1 UPDATE por equipamento + livro + versão
+        # + indicadores do dashboard + atrasados resolvidos + savepoint/release
+        with self.assertNumQueries(10):
+            resultados = devolver_emprestimos_em_lote(pks)
+
+        self.assertEqual(set(resultados.values()), {DEVOLVIDO})
+        self.capacete.refresh_from_db()
+        self.luva.refresh_from_db()
+        self.assertEqual((self.capacete.quantidade, self.luva.quantidade), (20, 20))
+        self.assertFalse(Emprestimo.objects.filter(status='EMPRESTADO').exists())
+
+    # TESTE UNITÁRIO 2
+    def test_unit_resultado_por_emprestimo(self):
+        devolver_emprestimo(self.emprestimos[0].pk)
+
+        resultados = devolver_emprestimos_em_lote([self.emprestimos[0].pk, self.emprestimos[1].pk, 999999])
+
+        self.assertEqual(resultados, {
+            self.emprestimos[0].pk: JA_DEVOLVIDO,
+            self.emprestimos[1].pk: DEVOLVIDO,
+            999999: NAO_ENCONTRADO,
+        })
+        self.capacete.refresh_from_db()
+        self.assertEqual(self.capacete.quantidade, 14)
+
+    def test_unit_devolucao_simultanea_nao_repoe_duas_vezes(self):
+        alvo = self.emprestimos[2].pk
+
+        def devolucao_concorrente(execute, sql, params, many, context):
+            # Outra devolução do mesmo empréstimo termina logo antes de o lote travar as linhas
+            if '"emprestimos_emprestimo"' in sql and not getattr(self, 'injetado', False):
+                self.injetado = True
+                devolver_emprestimo(alvo)
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(devolucao_concorrente):
+            resultados = devolver_emprestimos_em_lote([alvo, self.emprestimos[3].pk])
+
+        self.assertEqual(resultados, {alvo: JA_DEVOLVIDO, self.emprestimos[3].pk: DEVOLVIDO})
+        self.capacete.refresh_from_db()
+        self.assertEqual(self.capacete.quantidade, 14)
+        self.assertEqual(MovimentoEstoque.objects.filter(emprestimo_pk=alvo, tipo=MovimentoEstoque.DEVOLUCAO).count(), 1)
+
+        # A devolução que esperava a trava do lote não encontra mais o empréstimo ativo
+        self.assertFalse(devolver_emprestimo(self.emprestimos[3].pk))
+        self.assertEqual(devolver_emprestimos_em_lote([self.emprestimos[3].pk]), {self.emprestimos[3].pk: JA_DEVOLVIDO})
+        self.capacete.refresh_from_db()
+        self.assertEqual(self.capacete.quantidade, 14)
+
+    # TESTE DE INTEGRAÇÃO
+    def test_integration_devolver_selecionados_na_lista(self):
+        response = self.client.get(reverse('emprestimos:app_requests'))
+        self.assertContains(response, 'name="pks"', count=10)
+
+        response = self.client.post(
+            reverse('emprestimos:app_requests_return_batch'),
+            {'pks': [emp.pk for emp in self.emprestimos[5:]]},
+            follow=True,
+        )
+
+        self.assertContains(response, '5 empréstimo(s) devolvido(s) com sucesso!')
+        self.luva.refresh_from_db()
+        self.assertEqual(self.luva.quantidade, 20)
+        self.assertEqual(Emprestimo.objects.filter(status='EMPRESTADO').count(), 5)
+
+
+
+# =====================================================
+# PRAZO DE DEVOLUÇÃO (DIAS ÚTEIS)
+# =====================================================
+class PrazoDiasUteisTestCase(TestCase):
+    """Testes do motor de prazos em dias úteis com calendário de feriados."""
+
+    # TESTE UNITÁRIO 1
+    def test_unit_pula_fim_de_semana_e_feriados_nacionais(self):
+        # Sexta -> quarta (sábado e domingo não contam)
+        self.assertEqual(calculate_deadline(datetime(2025, 3, 7).date()), datetime(2025, 3, 12).date())
+        # Semana Santa: Sexta-feira Santa (18/04) e Tiradentes (21/04)
+        self.assertEqual(calculate_deadline(datetime(2025, 4, 16).date()), datetime(2025, 4, 23).date())
+        # Natal
+        self.assertEqual(calculate_deadline(datetime(2025, 12, 24).date()), datetime(2025, 12, 30).date())
+
+    # TESTE UNITÁRIO 2
+    @override_settings(FERIADOS_EXTRAS=['2025-03-10'])
+    def test_unit_feriado_da_planta_e_horario_preservado(self):
+        tz = timezone.get_current_timezone()
+        inicio = datetime(2025, 3, 7, 14, 30, tzinfo=tz)
+
+        prazo = calculate_deadline(inicio)
+
+        self.assertEqual(prazo, datetime(2025, 3, 13, 14, 30, tzinfo=tz))
+
+    # TESTE DE INTEGRAÇÃO
+    def test_integration_lote_igual_ao_calculo_individual(self):
+        inicio = timezone.now()
+        datas = [inicio - timedelta(hours=7 * i) for i in range(2000)]
+
+        self.assertEqual(calculate_deadlines(datas), [calculate_deadline(data) for data in datas])
+        self.assertEqual(calculate_deadlines(datas[:1], dias=1)[0], calculate_deadline(datas[0], dias=1))
+
+
+
+# =====================================================
+# APP: EMPRÉSTIMOS - DETECÇÃO DE ATRASADOS
+# =====================================================
+@pytest.mark.django_db
+class AtrasadosTestCase(TestCase):
+    """Testes da detecção incremental de empréstimos atrasados."""
+
+    def setUp(self):
+        self.client = Client()
+        self.user = User.objects.create_user(username='test@test.com', password='pass')
+        self.client.login(username='test@test.com', password='pass')
+        self.colaborador = Colaborador.objects.create(nome="Carlos", email="carlos@test.com")
+        self.capacete = Equipamento.objects.create(nome="Capacete", marca="3M", quantidade=50)
+        self.agora = timezone.now()
+
+    def criar(self, prazo):
+        return Emprestimo.objects.create(
+            nome=self.colaborador, equipamento=self.capacete, quantidade=1,
+            data_prazo=prazo,
+        )
+
+    # TESTE UNITÁRIO 1
+    def test_unit_varredura_incremental_pela_marca_dagua(self):
+        vencidos = [self.criar(self.agora - timedelta(days=d)) for d in (1, 2, 3)]
+        self.criar(self.agora + timedelta(days=1))
+
+        self.assertEqual(detectar_atrasados(agora=self.agora), (3, 0))
+        self.assertEqual(detectar_atrasados(agora=self.agora), (0, 0))
+
+        # Prazo vencido depois da marca d'água entra; prazo antigo só com completo=True
+        depois = self.agora + timedelta(days=2)
+        antigo = self.criar(self.agora - timedelta(days=10))
+        self.assertEqual(detectar_atrasados(agora=depois), (1, 0))
+        self.assertFalse(EmprestimoAtrasado.objects.filter(pk=antigo.pk).exists())
+        self.assertEqual(detectar_atrasados(agora=depois, completo=True), (1, 0))
+        self.assertEqual(EmprestimoAtrasado.objects.count(), len(vencidos) + 2)
+
+    # TESTE UNITÁRIO 2
+    def test_unit_devolvidos_saem_da_tabela_e_consulta_usa_indice(self):
+        emprestimo = self.criar(self.agora - timedelta(days=1))
+        detectar_atrasados(agora=self.agora)
+
+        self.assertEqual(IndicadoresDashboard.objects.get().emprestimos_atrasados, 1)
+
+        # A devolução já tira o empréstimo dos atrasados e do contador
+        devolver_emprestimo(emprestimo.pk)
+        self.assertFalse(EmprestimoAtrasado.objects.exists())
+        self.assertEqual(IndicadoresDashboard.objects.get().emprestimos_atrasados, 0)
+        self.assertEqual(detectar_atrasados(agora=self.agora), (0, 0))
+
+        outros = [self.criar(self.agora - timedelta(days=2)) for _ in range(2)]
+        detectar_atrasados(agora=self.agora, completo=True)
+        devolver_emprestimos_em_lote([outros[0].pk])
+        excluir_emprestimo(outros[1].pk)
+        self.assertFalse(EmprestimoAtrasado.objects.exists())
+        self.assertEqual(IndicadoresDashboard.objects.get().emprestimos_atrasados, 0)
+
+        vencidos = Emprestimo.objects.filter(
+            status='EMPRESTADO', data_prazo__gt=self.agora - timedelta(minutes=5),
+            data_prazo__lte=self.agora, atraso__isnull=True,
+        ).values_list('pk', 'data_prazo')
+        self.assertEqual(full_table_scans(vencidos), [])
+
+    # TESTE DE INTEGRAÇÃO
+    def test_integration_comando_e_listagem_de_atrasados(self):
+        atrasado = self.criar(self.agora - timedelta(days=1))
+        self.criar(self.agora + timedelta(days=1))
+        saida = StringIO()
+
+        call_command('detectar_atrasados', stdout=saida)
+        response = self.client.get(reverse('emprestimos:app_requests_overdue'))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([item['pk'] for item in response.context['object_data']], [atrasado.pk])
+        self.assertIn('1 novo(s) atrasado(s)', saida.getvalue())
+        self.assertContains(response, reverse('emprestimos:app_requests_return', args=[atrasado.pk]))
+
+
+
+# =====================================================
+# APP: DASHBOARD - INDICADORES
+# =====================================================
+@pytest.mark.django_db
+class DashboardIndicadoresTestCase(TestCase):
+    """Testes dos indicadores pré-calculados do dashboard."""
+
+    def setUp(self):
+        self.client = Client()
+        self.user = User.objects.create_user(username='test@test.com', password='pass')
+        self.client.login(username='test@test.com', password='pass')
+        self.colaborador = Colaborador.objects.create(nome="Carlos", email="carlos@test.com")
+        self.capacete = Equipamento.objects.create(nome="Capacete", marca="3M", quantidade=20)
+        self.luva = Equipamento.objects.create(nome="Luva", marca="Safety", quantidade=3)
+
+    def registrar(self, quantidade=1):
+        return registrar_emprestimo(Emprestimo(
+            nome=self.colaborador, equipamento=self.capacete, quantidade=quantidade,
+        ))
+
+    # TESTE UNITÁRIO 1
+    def test_unit_contadores_acompanham_cadastro_devolucao_e_exclusao(self):
+        emprestimos = [self.registrar() for _ in range(4)]
+        registrar_emprestimos_em_lote([(self.colaborador.pk, self.capacete.pk, 1)] * 3)
+
+        devolver_emprestimo(emprestimos[0].pk)
+        devolver_emprestimos_em_lote([emprestimos[1].pk, emprestimos[2].pk])
+        excluir_emprestimo(emprestimos[3].pk)
+        excluir_emprestimo(emprestimos[0].pk)
+
+        indicadores = IndicadoresDashboard.atual()
+        self.assertEqual(indicadores.emprestimos_ativos, 3)
+        self.assertEqual(EmprestimosPorDia.objects.get(dia=timezone.localdate()).total, 5)
+
+    # TESTE UNITÁRIO 2
+    def test_unit_recalculo_igual_ao_incremental(self):
+        for _ in range(3):
+            self.registrar()
+        devolver_emprestimo(Emprestimo.objects.first().pk)
+        incremental = IndicadoresDashboard.atual().emprestimos_ativos
+        por_dia = list(EmprestimosPorDia.objects.values_list('dia', 'total'))
+
+        recalcular_indicadores()
+
+        self.assertEqual(IndicadoresDashboard.atual().emprestimos_ativos, incremental)
+        self.assertEqual(list(EmprestimosPorDia.objects.values_list('dia', 'total')), por_dia)
+
+    # TESTE DE INTEGRAÇÃO
+    def test_integration_dashboard_le_apenas_os_indicadores(self):
+        for _ in range(5):
+            self.registrar()
+
+        # sessão + usuário + indicadores + contagem e lista do estoque mínimo + série diária
+        with self.assertNumQueries(6):
+            response = self.client.get(reverse('dashboard:app_dashboard'))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['indicadores'].emprestimos_ativos, 5)
+        self.assertEqual(len(response.context['emprestimos_por_dia']), 30)
+        self.assertEqual(response.context['emprestimos_por_dia'][-1]['total'], 5)
+        self.assertEqual([item['nome'] for item in response.context['abaixo_minimo']], ['Luva'])
+        self.assertEqual(response.context['abaixo_minimo_total'], 1)
+
+    def test_integration_estoque_minimo_conta_tudo_e_lista_so_o_limite(self):
+        Equipamento.objects.bulk_create([
+            Equipamento(nome=f"Item {i:02d}", marca="X", quantidade=i % 3) for i in range(25)
+        ])
+
+        with CaptureQueriesContext(connection) as consultas:
+            response = self.client.get(reverse('dashboard:app_dashboard'))
+        for consulta in consultas.captured_queries:
+            self.assertEqual(full_table_scans(consulta['sql']), [], consulta['sql'])
+
+        self.assertEqual(response.context['abaixo_minimo_total'], 26)
+        self.assertEqual(len(response.context['abaixo_minimo']), 20)
+        self.assertEqual([item['quantidade'] for item in response.context['abaixo_minimo']][:3], [0, 0, 0])
+        self.assertContains(response, 'Ver todos os 26 itens')
+
+        with override_settings(LIST_PAGE_SIZE=10):
+            response = self.client.get(reverse('equipamentos:app_items_low_stock'))
+            self.assertEqual(len(response.context['page']), 10)
+            seguinte = self.client.get(
+                reverse('equipamentos:app_items_low_stock'), {'after': response.context['page'].next_cursor},
+            )
+        quantidades = [linha['fields'][2] for linha in response.context['object_data'] + seguinte.context['object_data']]
+        self.assertEqual(quantidades, sorted(quantidades))
+        self.assertTrue(all(quantidade < settings.ESTOQUE_MINIMO for quantidade in quantidades))
+
+
+
+# =====================================================
+# APP: RELATÓRIOS - CONSOLIDAÇÕES DIÁRIAS
+# =====================================================
+@pytest.mark.django_db
+class ConsolidacaoDiariaTestCase(TestCase):
+    """Testes das consolidações diárias por equipamento e colaborador."""
+
+    def setUp(self):
+        self.client = Client()
+        self.user = User.objects.create_user(username='test@test.com', password='pass')
+        self.client.login(username='test@test.com', password='pass')
+        self.carlos = Colaborador.objects.create(nome="Carlos", email="carlos@test.com")
+        self.ana = Colaborador.objects.create(nome="Ana", email="ana@test.com")
+        self.capacete = Equipamento.objects.create(nome="Capacete", marca="3M", quantidade=50)
+        self.hoje = timezone.localdate()
+        self.ontem = self.hoje - timedelta(days=1)
+
+    def criar(self, colaborador, quantidade, inicio, devolucao=None):
+        emprestimo = Emprestimo.objects.create(
+            nome=colaborador, equipamento=self.capacete, quantidade=quantidade, data_prazo=inicio,
+        )
+        Emprestimo.objects.filter(pk=emprestimo.pk).update(
+            data_emprestimo=inicio,
+            data_devolucao_real=devolucao,
+            status='DEVOLVIDO' if devolucao else 'EMPRESTADO',
+        )
+        return emprestimo
+
+    def momento(self, dia, hora):
+        return timezone.make_aware(datetime.combine(dia, datetime.min.time()) + timedelta(hours=hora))
+
+    # TESTE UNITÁRIO 1
+    def test_unit_totais_por_dia_equipamento_e_colaborador(self):
+        self.criar(self.carlos, 2, self.momento(self.ontem, 8), devolucao=self.momento(self.ontem, 12))
+        self.criar(self.ana, 3, self.momento(self.ontem, 9), devolucao=self.momento(self.hoje, 9))
+        self.criar(self.ana, 1, self.momento(self.hoje, 10))
+
+        consolidar_dias(self.ontem, self.hoje)
+
+        ontem = MovimentoEquipamentoDiario.objects.get(dia=self.ontem, equipamento=self.capacete)
+        self.assertEqual((ontem.unidades_emprestadas, ontem.emprestimos, ontem.devolucoes), (5, 2, 1))
+        self.assertEqual(ontem.duracao_total, timedelta(hours=4))
+        hoje = MovimentoEquipamentoDiario.objects.get(dia=self.hoje, equipamento=self.capacete)
+        self.assertEqual((hoje.unidades_emprestadas, hoje.emprestimos, hoje.devolucoes), (1, 1, 1))
+        self.assertEqual(hoje.duracao_total, timedelta(hours=24))
+        ana = MovimentoColaboradorDiario.objects.get(dia=self.hoje, colaborador=self.ana)
+        self.assertEqual((ana.unidades_emprestadas, ana.devolucoes), (1, 1))
+
+    # TESTE UNITÁRIO 2
+    def test_unit_consolidacao_incremental_pela_marca_dagua(self):
+        anteontem = self.ontem - timedelta(days=1)
+        self.criar(self.carlos, 1, self.momento(anteontem, 8))
+
+        self.assertEqual(consolidar_relatorios(), (anteontem, self.hoje))
+        self.assertEqual(consolidar_relatorios(), (self.hoje, self.hoje))
+
+        # Dias fechados só são refeitos com `desde`
+        self.criar(self.carlos, 4, self.momento(anteontem, 9))
+        consolidar_relatorios()
+        self.assertEqual(MovimentoEquipamentoDiario.objects.get(dia=anteontem).unidades_emprestadas, 1)
+        consolidar_relatorios(desde=anteontem)
+        self.assertEqual(MovimentoEquipamentoDiario.objects.get(dia=anteontem).unidades_emprestadas, 5)
+
+    def test_unit_editar_e_excluir_refazem_dias_fechados(self):
+        anteontem = self.ontem - timedelta(days=1)
+        emprestimo = self.criar(self.carlos, 2, self.momento(anteontem, 8))
+        removido = self.criar(self.ana, 3, self.momento(anteontem, 9), devolucao=self.momento(self.ontem, 9))
+        consolidar_relatorios()
+
+        editar_emprestimo(emprestimo.pk, self.ana.pk, self.capacete.pk, 4)
+        self.assertEqual(MovimentoEquipamentoDiario.objects.get(dia=anteontem).unidades_emprestadas, 7)
+        self.assertEqual(MovimentoColaboradorDiario.objects.get(dia=anteontem, colaborador=self.ana).unidades_emprestadas, 7)
+        self.assertFalse(MovimentoColaboradorDiario.objects.filter(dia=anteontem, colaborador=self.carlos).exists())
+
+        excluir_emprestimo(removido.pk)
+        self.assertEqual(MovimentoEquipamentoDiario.objects.get(dia=anteontem).unidades_emprestadas, 4)
+        self.assertFalse(MovimentoEquipamentoDiario.objects.filter(dia=self.ontem).exists())
+
+    # TESTE DE INTEGRAÇÃO
+    def test_integration_relatorio_le_apenas_consolidacoes(self):
+        self.criar(self.carlos, 2, self.momento(self.ontem, 8), devolucao=self.momento(self.ontem, 14))
+        self.criar(self.ana, 5, self.momento(self.ontem, 9))
+        call_command('consolidar_relatorios', stdout=StringIO())
+        url = reverse('relatorios:app_reports_equipamentos')
+
+        # sessão + usuário + totais por equipamento + série diária
+        with self.assertNumQueries(4):
+            response = self.client.get(url, {'data_inicio': self.ontem.isoformat()})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['object_data'][0]['fields'], ['Capacete (3M)', 7, 2, 1, '6h 0min'])
+        self.assertEqual([dia['unidades'] for dia in response.context['por_dia']], [7])
+
+        # Mesmo nome, outra marca: linha própria no relatório
+        outro = Equipamento.objects.create(nome="Capacete", marca="MSA", quantidade=5)
+        emprestimo = self.criar(self.carlos, 1, self.momento(self.ontem, 10))
+        Emprestimo.objects.filter(pk=emprestimo.pk).update(equipamento=outro)
+        consolidar_relatorios(desde=self.ontem)
+        response = self.client.get(url, {'data_inicio': self.ontem.isoformat()})
+        self.assertEqual(
+            [item['fields'][:2] for item in response.context['object_data']],
+            [['Capacete (3M)', 7], ['Capacete (MSA)', 1]],
+        )
+
+        response = self.client.get(reverse('relatorios:app_reports_colaboradores'))
+        self.assertEqual([item['fields'][0] for item in response.context['object_data']], ['Ana', 'Carlos'])
+
+        response = self.client.get(url, {'data_inicio': self.hoje.isoformat(), 'data_fim': self.ontem.isoformat()})
+        self.assertRedirects(response, reverse('relatorios:app_reports'))
+
+
+
+# =====================================================
+# APP: EQUIPAMENTOS - LIVRO DE MOVIMENTAÇÕES
+# =====================================================
+@pytest.mark.django_db
+class LivroEstoqueTestCase(TestCase):
+    """Testes do livro de movimentações de estoque e dos pontos de controle."""
+
+    def setUp(self):
+        self.client = Client()
+        self.user = User.objects.create_user(username='test@test.com', password='pass')
+        self.client.login(username='test@test.com', password='pass')
+        self.colaborador = Colaborador.objects.create(nome="Carlos", email="carlos@test.com")
+        self.capacete = cadastrar_equipamento(Equipamento(nome="Capacete", marca="3M", quantidade=20))
+
+    def registrar(self, quantidade):
+        return registrar_emprestimo(Emprestimo(
+            nome=self.colaborador, equipamento=self.capacete, quantidade=quantidade,
+        ))
+
+    # TESTE UNITÁRIO 1
+    def test_unit_cada_operacao_grava_uma_movimentacao(self):
+        primeiro = self.registrar(3)
+        lote = registrar_emprestimos_em_lote([(self.colaborador.pk, self.capacete.pk, 2)] * 2)
+        devolver_emprestimo(primeiro.pk)
+        devolver_emprestimos_em_lote([lote[0].pk])
+        excluir_emprestimo(lote[1].pk)
+
+        movimentos = list(MovimentoEstoque.objects.order_by('pk').values_list('tipo', 'quantidade', 'emprestimo_pk'))
+        self.assertEqual(movimentos, [
+            (MovimentoEstoque.AJUSTE, 20, None),
+            (MovimentoEstoque.EMPRESTIMO, -3, primeiro.pk),
+            (MovimentoEstoque.EMPRESTIMO, -2, lote[0].pk),
+            (MovimentoEstoque.EMPRESTIMO, -2, lote[1].pk),
+            (MovimentoEstoque.DEVOLUCAO, 3, primeiro.pk),
+            (MovimentoEstoque.DEVOLUCAO, 2, lote[0].pk),
+            (MovimentoEstoque.EXCLUSAO, 2, lote[1].pk),
+        ])
+        self.capacete.refresh_from_db()
+        self.assertEqual(estoque_em(self.capacete.pk), self.capacete.quantidade)
+
+    # TESTE UNITÁRIO 2
+    def test_unit_estoque_historico_por_ponto_de_controle_e_cauda(self):
+        self.registrar(5)
+        self.assertEqual(criar_checkpoints(), 1)
+        self.assertEqual(criar_checkpoints(), 0)
+        depois_do_checkpoint = timezone.now()
+        self.registrar(4)
+
+        # Ponto de controle + cauda de uma movimentação
+        with self.assertNumQueries(2):
+            self.assertEqual(estoque_em(self.capacete.pk), 11)
+        self.assertEqual(estoque_em(self.capacete.pk, depois_do_checkpoint), 15)
+        self.assertEqual(estoque_em(self.capacete.pk, timezone.now() - timedelta(days=1)), 0)
+
+        criar_checkpoints()
+        self.assertEqual(
+            list(SaldoEstoque.objects.order_by('criado_em').values_list('quantidade', flat=True)), [15, 11],
+        )
+
+    # TESTE UNITÁRIO 3
+    def test_unit_emprestimo_entre_abrir_e_salvar_a_edicao_e_preservado(self):
+        url = reverse('equipamentos:app_items_edit', args=[self.capacete.pk])
+        exibida = self.client.get(url).context['form']['quantidade_exibida'].value()
+        self.assertEqual(exibida, 20)
+
+        # Empréstimo concluído enquanto a tela de edição estava aberta
+        self.registrar(5)
+
+        response = self.client.post(url, {
+            'nome': 'Capacete', 'marca': '3M', 'quantidade': 22, 'quantidade_exibida': exibida,
+        })
+
+        self.assertRedirects(response, reverse('equipamentos:app_items'))
+        self.capacete.refresh_from_db()
+        self.assertEqual(self.capacete.quantidade, 17)
+        ajuste = MovimentoEstoque.objects.latest('pk')
+        self.assertEqual((ajuste.tipo, ajuste.quantidade), (MovimentoEstoque.AJUSTE, 2))
+        self.assertEqual(list(reconciliar_estoque()), [])
+
+        # Redução maior que o estoque que sobrou: recusada, nada gravado
+        self.registrar(15)
+        response = self.client.post(url, {
+            'nome': 'Capacete Novo', 'marca': '3M', 'quantidade': 1, 'quantidade_exibida': 17,
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'atual: 2')
+        self.capacete.refresh_from_db()
+        self.assertEqual((self.capacete.nome, self.capacete.quantidade), ('Capacete', 2))
+
+    # TESTE DE INTEGRAÇÃO
+    def test_integration_edicao_de_equipamento_ajusta_pela_diferenca(self):
+        self.registrar(6)
+
+        response = self.client.post(
+            reverse('equipamentos:app_items_edit', args=[self.capacete.pk]),
+            {'nome': 'Capacete Classe B', 'marca': '3M', 'quantidade': 30, 'quantidade_exibida': 14},
+        )
+
+        self.assertRedirects(response, reverse('equipamentos:app_items'))
+        self.capacete.refresh_from_db()
+        self.assertEqual((self.capacete.nome, self.capacete.quantidade), ('Capacete Classe B', 30))
+        ajuste = MovimentoEstoque.objects.latest('pk')
+        self.assertEqual((ajuste.tipo, ajuste.quantidade), (MovimentoEstoque.AJUSTE, 16))
+        self.assertEqual(estoque_em(self.capacete.pk), 30)
+
+
+
+# =====================================================
+# APP: EQUIPAMENTOS - RECONCILIAÇÃO DE ESTOQUE
+# =====================================================
+@pytest.mark.django_db
+class ReconciliacaoEstoqueTestCase(TestCase):
+    """Testes da conferência de estoque contra o livro de movimentações."""
+
+    def setUp(self):
+        self.colaborador = Colaborador.objects.create(nome="Carlos", email="carlos@test.com")
+        self.equipamentos = [
+            cadastrar_equipamento(Equipamento(nome=f"Item {i}", marca="3M", quantidade=10)) for i in range(5)
+        ]
+        registrar_emprestimos_em_lote([(self.colaborador.pk, equipamento.pk, 2) for equipamento in self.equipamentos])
+        criar_checkpoints()
+        devolver_emprestimo(Emprestimo.objects.first().pk)
+
+    def desviar(self, equipamento, quantidade):
+        # Simula uma alteração que não passou pelo livro (ex.: bug ou SQL manual)
+        Equipamento.objects.filter(pk=equipamento.pk).update(quantidade=quantidade)
+
+    # TESTE UNITÁRIO 1
+    def test_unit_sem_divergencias_uma_consulta_por_bloco(self):
+        # 5 equipamentos em blocos de 2: 3 blocos + consulta final vazia
+        with self.assertNumQueries(4):
+            divergencias = list(reconciliar_estoque(chunk_size=2))
+
+        self.assertEqual(divergencias, [])
+
+    # TESTE UNITÁRIO 2
+    def test_unit_aponta_e_corrige_divergencias(self):
+        self.desviar(self.equipamentos[1], 3)
+        self.desviar(self.equipamentos[4], 50)
+
+        divergencias = list(reconciliar_estoque(chunk_size=2))
+        self.assertEqual(
+            [(pk, quantidade, esperado) for pk, _, quantidade, esperado in divergencias],
+            [(self.equipamentos[1].pk, 3, 8), (self.equipamentos[4].pk, 50, 8)],
+        )
+
+        list(reconciliar_estoque(corrigir=True))
+        self.assertEqual(list(reconciliar_estoque()), [])
+        self.equipamentos[4].refresh_from_db()
+        self.assertEqual(self.equipamentos[4].quantidade, 8)
+
+    def test_unit_aponta_quantidade_de_emprestimo_alterada_sem_estoque(self):
+        # Quantidade do empréstimo ativo alterada sem baixar o estoque (nem lançar no livro)
+        emprestimo = Emprestimo.objects.get(equipamento=self.equipamentos[3])
+        Emprestimo.objects.filter(pk=emprestimo.pk).update(quantidade=5)
+
+        divergencias = list(reconciliar_estoque())
+        self.assertEqual(
+            [(pk, quantidade, esperado) for pk, _, quantidade, esperado in divergencias],
+            [(self.equipamentos[3].pk, 8, 5)],
+        )
+
+        list(reconciliar_estoque(corrigir=True))
+        self.assertEqual(list(reconciliar_estoque()), [])
+        # A correção entra no livro: o saldo dele continua igual ao estoque
+        self.assertEqual(estoque_em(self.equipamentos[3].pk), 5)
+
+    def test_unit_esperado_negativo_e_apontado_sem_ser_gravado(self):
+        # Mais unidades emprestadas do que o livro registra: esperado 10 - 12 = -2
+        emprestimo = Emprestimo.objects.get(equipamento=self.equipamentos[2])
+        Emprestimo.objects.filter(pk=emprestimo.pk).update(quantidade=12)
+        self.desviar(self.equipamentos[4], 50)
+
+        divergencias = list(reconciliar_estoque(chunk_size=2, corrigir=True))
+
+        self.assertEqual(
+            [(pk, quantidade, esperado) for pk, _, quantidade, esperado in divergencias],
+            [(self.equipamentos[2].pk, 8, -2), (self.equipamentos[4].pk, 50, 8)],
+        )
+        # O bloco seguinte foi corrigido; o não corrigível ficou como estava
+        self.assertEqual(
+            dict(Equipamento.objects.filter(pk__in=[self.equipamentos[2].pk, self.equipamentos[4].pk])
+                 .values_list('pk', 'quantidade')),
+            {self.equipamentos[2].pk: 8, self.equipamentos[4].pk: 8},
+        )
+
+    # TESTE DE INTEGRAÇÃO
+    def test_integration_comando_de_reconciliacao(self):
+        self.desviar(self.equipamentos[2], 1)
+        saida = StringIO()
+
+        call_command('reconciliar_estoque', stdout=saida)
+        self.assertIn('Item 2: estoque 1, esperado 8 (+7)', saida.getvalue())
+
+        call_command('reconciliar_estoque', '--corrigir', stdout=saida)
+        saida = StringIO()
+        call_command('reconciliar_estoque', stdout=saida)
+        self.assertIn('Estoque consistente', saida.getvalue())
+
+        for comando, argumentos in [('reconciliar_estoque', []), ('importar_colaboradores', ['x.csv']),
+                                    ('importar_equipamentos', ['x.csv']), ('gerar_dados', [])]:
+            with self.subTest(comando), self.assertRaisesMessage(CommandError, '--chunk-size'):
+                call_command(comando, *argumentos, '--chunk-size', '0', stdout=saida)
+
+
+
+# =====================================================
+# APP: EMPRÉSTIMOS - EDIÇÃO COM ESTOQUE
+# =====================================================
+@pytest.mark.django_db
+class EdicaoEmprestimoTestCase(TestCase):
+    """Testes da edição de empréstimos com ajuste de estoque pela diferença."""
+
+    def setUp(self):
+        self.client = Client()
+        self.user = User.objects.create_user(username='test@test.com', password='pass')
+        self.client.login(username='test@test.com', password='pass')
+        self.colaborador = Colaborador.objects.create(nome="Carlos", email="carlos@test.com")
+        self.capacete = cadastrar_equipamento(Equipamento(nome="Capacete", marca="3M", quantidade=10))
+        self.luva = cadastrar_equipamento(Equipamento(nome="Luva", marca="Safety", quantidade=4))
+        self.emprestimo = registrar_emprestimo(Emprestimo(
+            nome=self.colaborador, equipamento=self.capacete, quantidade=3,
+        ))
+
+    def estoques(self):
+        return dict(Equipamento.objects.values_list('nome', 'quantidade'))
+
+    # TESTE UNITÁRIO 1
+    def test_unit_mesmo_equipamento_aplica_so_a_diferenca(self):
+        editar_emprestimo(self.emprestimo.pk, self.colaborador.pk, self.capacete.pk, 8)
+        self.assertEqual(self.estoques()['Capacete'], 2)
+
+        editar_emprestimo(self.emprestimo.pk, self.colaborador.pk, self.capacete.pk, 5)
+        self.assertEqual(self.estoques()['Capacete'], 5)
+
+        self.emprestimo.refresh_from_db()
+        self.assertEqual((self.emprestimo.quantidade, self.emprestimo.estoque_disponivel), (5, 5))
+        self.assertEqual(
+            list(MovimentoEstoque.objects.filter(emprestimo_pk=self.emprestimo.pk).values_list('quantidade', flat=True)),
+            [-3, -5, 3],
+        )
+        self.assertEqual(list(reconciliar_estoque()), [])
+
+    # TESTE UNITÁRIO 2
+    def test_unit_troca_de_equipamento_e_estoque_insuficiente(self):
+        with self.assertRaises(EstoqueIndisponivel):
+            editar_emprestimo(self.emprestimo.pk, self.colaborador.pk, self.luva.pk, 5)
+        self.assertEqual(self.estoques(), {'Capacete': 7, 'Luva': 4})
+
+        editar_emprestimo(self.emprestimo.pk, self.colaborador.pk, self.luva.pk, 4)
+
+        self.assertEqual(self.estoques(), {'Capacete': 10, 'Luva': 0})
+        self.emprestimo.refresh_from_db()
+        self.assertEqual(
+            (self.emprestimo.equipamento_id, self.emprestimo.quantidade, self.emprestimo.estoque_disponivel),
+            (self.luva.pk, 4, 0),
+        )
+        self.assertEqual(list(reconciliar_estoque()), [])
+
+    # TESTE UNITÁRIO 3
+    def test_unit_mensagem_de_estoque_rele_a_quantidade(self):
+        # Outro empréstimo baixa o estoque logo depois de o formulário carregar o equipamento
+        baixou = []
+
+        def baixar_estoque(execute, sql, params, many, context):
+            resultado = execute(sql, params, many, context)
+            if not baixou and sql.startswith('SELECT') and 'equipamentos_equipamento' in sql:
+                baixou.append(True)
+                Equipamento.objects.filter(pk=self.capacete.pk).update(quantidade=2)
+            return resultado
+
+        form = EmprestimoForm(
+            data={'nome': self.colaborador.pk, 'equipamento': self.capacete.pk, 'quantidade': 11},
+            instance=self.emprestimo,
+        )
+        with connection.execute_wrapper(baixar_estoque):
+            self.assertFalse(form.is_valid())
+
+        # 2 em estoque + 3 já emprestados por este empréstimo, não os 7 carregados antes
+        self.assertIn('Estoque atual: 5', str(form.errors))
+
+    # TESTE DE INTEGRAÇÃO
+    def test_integration_edicao_pela_tela(self):
+        url = reverse('emprestimos:app_requests_edit', args=[self.emprestimo.pk])
+        dados = {'nome': self.colaborador.pk, 'equipamento': self.capacete.pk, 'quantidade': 13}
+
+        # 13 não cabe: 7 em estoque + 3 já emprestados por este empréstimo
+        response = self.client.post(url, dados)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.estoques()['Capacete'], 7)
+
+        dados['quantidade'] = 10
+        response = self.client.post(url, dados)
+        self.assertRedirects(response, reverse('emprestimos:app_requests'))
+        self.assertEqual(self.estoques()['Capacete'], 0)
+
+        # Devolvido: equipamento e quantidade ficam travados
+        devolver_emprestimo(self.emprestimo.pk)
+        response = self.client.post(url, {'nome': self.colaborador.pk, 'equipamento': self.luva.pk, 'quantidade': 1})
+        self.assertRedirects(response, reverse('emprestimos:app_requests'))
+        self.emprestimo.refresh_from_db()
+        self.assertEqual((self.emprestimo.equipamento_id, self.emprestimo.quantidade), (self.capacete.pk, 10))
+        self.assertEqual(self.estoques(), {'Capacete': 10, 'Luva': 4})
+
+
+
+# =====================================================
+# APP: COLABORADORES - IMPORTAÇÃO CSV
+# =====================================================
+@pytest.mark.django_db
+class ImportacaoColaboradoresTestCase(TestCase):
+    """Testes da importação de colaboradores em lote por CSV."""
+
+    def setUp(self):
+        self.client = Client()
+        self.user = User.objects.create_user(username='test@test.com', password='pass')
+        self.client.login(username='test@test.com', password='pass')
+        Colaborador.objects.create(nome="Existente", email="existente@test.com")
+
+    def csv(self, linhas, cabecalho='nome;email;funcao'):
+        return BytesIO(('\ufeff' + '\n'.join([cabecalho] + linhas) + '\n').encode('utf-8'))
+
+    # TESTE UNITÁRIO 1
+    def test_unit_relatorio_de_erros_por_linha(self):
+        arquivo = self.csv([
+            'Ana;ana@test.com;Técnica',
+            ';semnome@test.com;',
+            'Bruno;email-invalido;',
+            'Ana Repetida;ana@test.com;',
+            'Outro;existente@test.com;',
+            '',
+            'Carla;carla@test.com',
+        ])
+
+        resultado = importar_colaboradores(arquivo)
+
+        self.assertEqual(resultado.importados, 2)
+        self.assertEqual([linha for linha, _ in resultado.erros], [3, 4, 5, 6])
+        self.assertIn('nome é obrigatório', resultado.erros[0][1])
+        self.assertIn('email inválido', resultado.erros[1][1])
+        self.assertIn('repetido no arquivo', resultado.erros[2][1])
+        self.assertIn('já cadastrado', resultado.erros[3][1])
+        self.assertEqual(Colaborador.objects.get(email='ana@test.com').funcao, 'Técnica')
+        self.assertIsNone(Colaborador.objects.get(email='carla@test.com').funcao)
+
+    # TESTE UNITÁRIO 2
+    def test_unit_uma_consulta_de_unicidade_e_um_insert_por_bloco(self):
+        arquivo = self.csv([f'Operador {i},op{i}@test.com' for i in range(250)], cabecalho='Nome,Email')
+
+        # 3 blocos x (IN de emails + savepoint + INSERT + release)
+        with self.assertNumQueries(12):
+            resultado = importar_colaboradores(arquivo, chunk_size=100)
+
+        self.assertEqual((resultado.importados, resultado.erros), (250, []))
+        self.assertEqual(Colaborador.objects.count(), 251)
+
+    def test_unit_email_cadastrado_entre_a_consulta_e_a_insercao(self):
+        arquivo = self.csv(['Ana;ana@test.com;', 'Bruno;bruno@test.com;', 'Carla;carla@test.com;'])
+
+        def cadastro_concorrente(execute, sql, params, many, context):
+            resultado = execute(sql, params, many, context)
+            # Outro cadastro grava o email da Ana logo depois da consulta de unicidade
+            if '"email" IN' in sql and not getattr(self, 'injetado', False):
+                self.injetado = True
+                Colaborador.objects.create(nome="Ana (tela)", email="ana@test.com")
+            return resultado
+
+        with connection.execute_wrapper(cadastro_concorrente):
+            resultado = importar_colaboradores(arquivo)
+
+        self.assertEqual(resultado.importados, 2)
+        self.assertEqual(resultado.erros, [(2, 'email já cadastrado: "ana@test.com"')])
+        self.assertEqual(Colaborador.objects.get(email='ana@test.com').nome, "Ana (tela)")
+        self.assertEqual(Colaborador.objects.filter(email__in=['bruno@test.com', 'carla@test.com']).count(), 2)
+
+    # TESTE DE INTEGRAÇÃO
+    def test_integration_upload_e_comando(self):
+        arquivo = SimpleUploadedFile('colaboradores.csv', self.csv(['Ana;ana@test.com;', 'X;x;']).getvalue())
+        response = self.client.post(reverse('colaboradores:app_users_import'), {'arquivo': arquivo})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['resultado'].importados, 1)
+        self.assertContains(response, 'email inválido')
+
+        sem_email = SimpleUploadedFile('colaboradores.csv', b'nome\nAna\n')
+        response = self.client.post(reverse('colaboradores:app_users_import'), {'arquivo': sem_email})
+        self.assertContains(response, 'ausente(s) no cabeçalho: email')
+
+        with tempfile.NamedTemporaryFile(suffix='.csv') as arquivo:
+            arquivo.write(self.csv(['Bruno;bruno@test.com;']).getvalue())
+            arquivo.flush()
+            saida = StringIO()
+            call_command('importar_colaboradores', arquivo.name, stdout=saida)
+        self.assertIn('1 colaborador(es) importado(s)', saida.getvalue())
+        self.assertTrue(Colaborador.objects.filter(email='bruno@test.com').exists())
+
+
+
+# =====================================================
+# APP: EQUIPAMENTOS - IMPORTAÇÃO CSV
+# =====================================================
+@pytest.mark.django_db
+class ImportacaoEquipamentosTestCase(TestCase):
+    """Testes da importação de entregas de equipamentos por CSV."""
+
+    def setUp(self):
+        self.client = Client()
+        self.user = User.objects.create_user(username='test@test.com', password='pass')
+        self.client.login(username='test@test.com', password='pass')
+        self.capacete = cadastrar_equipamento(Equipamento(nome="Capacete", marca="3M", quantidade=5))
+        self.luva = cadastrar_equipamento(Equipamento(nome="Luva", marca="Safety", quantidade=2))
+
+    def csv(self, linhas):
+        return BytesIO(('\n'.join(['nome,marca,quantidade'] + linhas) + '\n').encode('utf-8'))
+
+    def estoques(self):
+        return dict(Equipamento.objects.values_list('nome', 'quantidade'))
+
+    # TESTE UNITÁRIO 1
+    def test_unit_soma_aos_existentes_e_cria_os_novos(self):
+        arquivo = self.csv(['Capacete,3M,10', 'Luva,Safety,3', 'Capacete,3M,1', 'Bota,Marluvas,4', 'Capacete,MSA,2'])
+
+        resultado = importar_equipamentos(arquivo)
+
+        self.assertEqual((resultado.importados, resultado.criados, resultado.atualizados), (5, 2, 2))
+        self.assertEqual(
+            {(item.nome, item.marca): item.quantidade for item in Equipamento.objects.all()},
+            {('Capacete', '3M'): 16, ('Luva', 'Safety'): 5, ('Bota', 'Marluvas'): 4, ('Capacete', 'MSA'): 2},
+        )
+        self.assertEqual(list(reconciliar_estoque()), [])
+
+    # TESTE UNITÁRIO 2
+    def test_unit_arquivo_com_erro_nao_grava_nada(self):
+        linhas = [f'Item {i},Marca,1' for i in range(30)] + ['Capacete,3M,0', ',3M,2', 'Luva,Safety,x', 'Luva,Safety,²']
+
+        resultado = importar_equipamentos(self.csv(linhas), chunk_size=10)
+
+        self.assertEqual([linha for linha, _ in resultado.erros], [32, 33, 34, 35])
+        self.assertEqual((resultado.importados, resultado.criados), (0, 0))
+        self.assertEqual(self.estoques(), {'Capacete': 5, 'Luva': 2})
+        self.assertEqual(MovimentoEstoque.objects.count(), 2)
+
+    # TESTE DE INTEGRAÇÃO
+    def test_integration_upload_com_uma_atualizacao_por_bloco(self):
+        linhas = ['Capacete,3M,1', 'Luva,Safety,1'] * 50 + [f'Novo {i},Marca,1' for i in range(100)]
+        arquivo = SimpleUploadedFile('entrega.csv', self.csv(linhas).getvalue())
+
+        response = self.client.post(reverse('equipamentos:app_items_import'), {'arquivo': arquivo})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['resultado'].criados, 100)
+        self.assertEqual(self.estoques()['Capacete'], 55)
+
+        # Blocos de 100 linhas: busca por nome + UPDATE (CASE) ou INSERT + livro
+        with CaptureQueriesContext(connection) as consultas:
+            importar_equipamentos(self.csv(linhas), chunk_size=100)
+        updates = [q for q in consultas.captured_queries if q['sql'].startswith('UPDATE "equipamentos_equipamento"')]
+        self.assertEqual(len(updates), 2)
+        self.assertEqual(self.estoques()['Novo 0'], 2)
+
+
+
+# =====================================================
+# APP: CORE - INSTRUMENTAÇÃO DE DESEMPENHO
+# =====================================================
+@pytest.mark.django_db
+@override_settings(PERFORMANCE_INSTRUMENTACAO=True)
+class InstrumentacaoTestCase(TestCase):
+    """Testes do middleware de Server-Timing e das métricas por rota."""
+
+    def setUp(self):
+        self.client = Client()
+        self.user = User.objects.create_user(username='test@test.com', password='pass')
+        self.client.login(username='test@test.com', password='pass')
+        historico_rotas.limpar()
+
+    # TESTE UNITÁRIO 1
+    @override_settings(PERFORMANCE_AMOSTRAS=100)
+    def test_unit_percentis_na_janela_movel(self):
+        self.assertEqual(percentil(list(range(1, 101)), 50), 50)
+        self.assertEqual(percentil(list(range(1, 101)), 99), 99)
+        self.assertEqual(percentil([], 95), 0.0)
+
+        historico = HistoricoRotas()
+        for duracao in range(1, 201):
+            historico.registrar('rota', duracao, 1.0, 3)
+
+        resumo = historico.resumo()['rota']
+        # Só as 100 últimas medições (101..200) ficam na janela
+        self.assertEqual((resumo['amostras'], resumo['p50'], resumo['p95']), (100, 150, 195))
+        self.assertEqual(resumo['consultas_media'], 3)
+
+    # TESTE UNITÁRIO 2
+    def test_unit_server_timing_conta_as_consultas(self):
+        url = reverse('historico:app_history')
+
+        with CaptureQueriesContext(connection) as consultas:
+            response = self.client.get(url)
+
+        self.assertRegex(response['Server-Timing'], r'^total;dur=[\d.]+, db;dur=[\d.]+;desc="\d+ consultas"$')
+        self.assertIn(f'"{len(consultas.captured_queries)} consultas"', response['Server-Timing'])
+
+        with override_settings(PERFORMANCE_INSTRUMENTACAO=False):
+            response = self.client.get(url)
+        self.assertFalse(response.has_header('Server-Timing'))
+
+    def test_unit_streaming_medido_ate_o_fim_do_corpo(self):
+        # O CSV só consulta o banco enquanto o corpo é gerado
+        response = self.client.get(reverse('relatorios:download_movimentacoes_csv'))
+        self.assertNotIn('relatorios:download_movimentacoes_csv', historico_rotas.resumo())
+
+        with CaptureQueriesContext(connection) as consultas:
+            b''.join(response.streaming_content)
+        response.close()
+
+        rota = historico_rotas.resumo()['relatorios:download_movimentacoes_csv']
+        self.assertEqual(rota['amostras'], 1)
+        # sessão + usuário (antes do corpo) + empréstimos e arquivo (no corpo)
+        self.assertEqual(rota['consultas_media'], 2 + len(consultas.captured_queries))
+        self.assertEqual(len(consultas.captured_queries), 2)
+
+    # TESTE DE INTEGRAÇÃO
+    def test_integration_endpoint_de_metricas_so_para_staff(self):
+        for _ in range(3):
+            self.client.get(reverse('emprestimos:app_requests'))
+
+        response = self.client.get(reverse('app_performance'))
+        self.assertEqual(response.status_code, 403)
+
+        User.objects.filter(pk=self.user.pk).update(is_staff=True)
+        response = self.client.get(reverse('app_performance'))
+
+        self.assertEqual(response.status_code, 200)
+        rota = response.json()['rotas']['emprestimos:app_requests']
+        self.assertEqual(rota['amostras'], 3)
+        self.assertLessEqual(rota['p50'], rota['p95'])
+        self.assertLessEqual(rota['p95'], rota['p99'])
+
+
+
+# =====================================================
+# APP: CORE - BENCHMARKS
+# =====================================================
+@pytest.mark.django_db
+class BenchmarkTestCase(TestCase):
+    """Testes do gerador de dados sintéticos e da suíte de benchmarks (em escala mínima)."""
+
+    def setUp(self):
+        self.agora = timezone.make_aware(datetime(2025, 6, 2, 12, 0))
+
+    def gerar(self):
+        gerar_dados(colaboradores=20, equipamentos=5, emprestimos=300, dias=60, agora=self.agora)
+        return list(
+            Emprestimo.objects.order_by('pk')
+            .values_list('quantidade', 'status', 'data_emprestimo', 'estoque_disponivel')
+        )
+
+    # TESTE UNITÁRIO 1
+    def test_unit_gerador_deterministico_e_consistente(self):
+        primeira = self.gerar()
+
+        self.assertEqual(len(primeira), 300)
+        self.assertEqual(Colaborador.objects.count(), 20)
+        # Estoque final bate com o livro e os atrasados foram detectados
+        self.assertEqual(list(reconciliar_estoque()), [])
+        self.assertEqual(
+            EmprestimoAtrasado.objects.count(),
+            Emprestimo.objects.filter(status='EMPRESTADO', data_prazo__lt=self.agora).count(),
+        )
+
+        Emprestimo.objects.all().delete()
+        Colaborador.objects.all().delete()
+        Equipamento.objects.all().delete()
+        self.assertEqual(self.gerar(), primeira)
+
+    # TESTE UNITÁRIO 2
+    def test_unit_comparacao_com_baseline(self):
+        baseline = {
+            'historico': {'mediana_ms': 100.0, 'max_ms': 120.0, 'consultas': 3},
+            'csv': {'mediana_ms': 1.0, 'max_ms': 1.0, 'consultas': 3},
+        }
+
+        self.assertEqual(comparar_com_baseline({
+            'historico': {'mediana_ms': 120.0, 'max_ms': 200.0, 'consultas': 3},
+            'csv': {'mediana_ms': 2.5, 'max_ms': 3.0, 'consultas': 3},  # +150%, mas só 1,5 ms
+            'novo': {'mediana_ms': 999.0, 'max_ms': 999.0, 'consultas': 50},
+        }, baseline), [])
+
+        regressoes = comparar_com_baseline({
+            'historico': {'mediana_ms': 130.0, 'max_ms': 130.0, 'consultas': 53},
+        }, baseline, limite=0.25)
+        self.assertEqual(len(regressoes), 2)
+        self.assertIn('53 consultas (baseline 3)', regressoes[1])
+
+    # TESTE DE INTEGRAÇÃO
+    def test_integration_benchmarks_sobre_os_dados_gerados(self):
+        self.gerar()
+
+        resultados = executar_benchmarks(repeticoes=2)
+
+        for nome, _ in LISTAGENS:
+            self.assertGreater(resultados[nome]['consultas'], 0, nome)
+        # Sessão, usuário e uma leitura por tabela (empréstimos e arquivo)
+        self.assertEqual(resultados['exportacao_csv']['consultas'], 4)
+        self.assertEqual(resultados['calculate_deadline']['consultas'], 0)
+        self.assertLessEqual(resultados['cadastro_emprestimo']['mediana_ms'], resultados['cadastro_emprestimo']['max_ms'])
+        # Cada cadastro do benchmark foi devolvido: o estoque continua consistente
+        self.assertFalse(Emprestimo.objects.filter(status='EMPRESTADO', data_emprestimo__gt=self.agora).exists())
+        self.assertEqual(list(reconciliar_estoque()), [])
+
+
+
+# =====================================================
+# APP: CORE - GERADOR DE DADOS SINTÉTICOS
+# =====================================================
+@pytest.mark.django_db
+class GeradorDadosTestCase(TestCase):
+    """Testes das distribuições e do comando gerar_dados."""
+
+    def setUp(self):
+        self.agora = timezone.make_aware(datetime(2025, 6, 4, 16, 30))  # quarta-feira
+
+    # TESTE UNITÁRIO 1
+    def test_unit_datas_no_formato_do_django(self):
+        formatar = _FormatoData()
+        for texto in ['2025-06-04 00:00:00', '2025-06-04 23:59:59', '2024-02-29 12:07:03']:
+            instante = int(datetime.fromisoformat(texto + '+00:00').timestamp())
+            self.assertEqual(formatar(instante), texto)
+
+        gerar_dados(colaboradores=5, equipamentos=3, emprestimos=50, dias=10, agora=self.agora)
+        emprestimo = Emprestimo.objects.order_by('-data_emprestimo').first()
+        self.assertTrue(timezone.is_aware(emprestimo.data_emprestimo))
+        self.assertLessEqual(emprestimo.data_emprestimo, self.agora)
+        self.assertEqual(emprestimo.data_prazo, calculate_deadline(emprestimo.data_emprestimo))
+
+    # TESTE UNITÁRIO 2
+    def test_unit_distribuicoes(self):
+        gerado = gerar_dados(
+            colaboradores=50, equipamentos=10, emprestimos=3000, dias=45, agora=self.agora,
+            fracao_atrasados=0.1, fracao_extraviados=0.01,
+        )
+
+        self.assertEqual(Emprestimo.objects.count(), 3000)
+        abertos = Emprestimo.objects.filter(status='EMPRESTADO')
+        self.assertEqual(abertos.count(), gerado['abertos'])
+        # Em aberto: ou é recente (ainda no prazo) ou está atrasado
+        self.assertTrue(abertos.filter(data_prazo__lt=self.agora).exists())
+        self.assertTrue(abertos.filter(data_prazo__gte=self.agora).exists())
+        self.assertLess(gerado['abertos'], 3000 * 0.2)
+
+        devolvidos = Emprestimo.objects.filter(status='DEVOLVIDO')
+        self.assertFalse(devolvidos.filter(data_devolucao_real__gt=self.agora).exists())
+        self.assertTrue(devolvidos.filter(data_devolucao_real__gt=models.F('data_prazo')).exists())
+
+        # Domingo tem bem menos movimento que um dia útil
+        por_dia = dict(EmprestimosPorDia.objects.values_list('dia', 'total'))
+        self.assertLess(por_dia.get(datetime(2025, 6, 1).date(), 0) * 5, por_dia[datetime(2025, 6, 2).date()])
+        self.assertEqual(sum(por_dia.values()), 3000)
+
+        # Todo o período gerado fica consolidado para os relatórios, não só o último mês
+        consolidado = dict(
+            MovimentoEquipamentoDiario.objects.values('dia').annotate(total=models.Sum('emprestimos'))
+            .values_list('dia', 'total').order_by()
+        )
+        self.assertEqual(consolidado, por_dia)
+
+    # TESTE DE INTEGRAÇÃO
+    def test_integration_comando_mantem_estoque_e_indicadores(self):
+        saida = StringIO()
+        call_command(
+            'gerar_dados', colaboradores=30, equipamentos=8, emprestimos=2000, dias=30,
+            chunk_size=300, stdout=saida,
+        )
+
+        self.assertIn('2000 empréstimos', saida.getvalue())
+        self.assertEqual(list(reconciliar_estoque()), [])
+        indicadores = IndicadoresDashboard.atual()
+        self.assertEqual(indicadores.emprestimos_ativos, Emprestimo.objects.filter(status='EMPRESTADO').count())
+        self.assertEqual(indicadores.emprestimos_atrasados, EmprestimoAtrasado.objects.count())
+
+        # Os contadores gerados na carga batem com a recontagem completa
+        serie = sorted(EmprestimosPorDia.objects.values_list('dia', 'total'))
+        recalcular_indicadores()
+        self.assertEqual(sorted(EmprestimosPorDia.objects.values_list('dia', 'total')), serie)
+        self.assertTrue(MovimentoColaboradorDiario.objects.exists())
+
+        with self.assertRaises(CommandError):
+            call_command('gerar_dados', fracao_atrasados=0.8, fracao_extraviados=0.5, stdout=saida)
+
+
+
+# =====================================================
+# APP: CORE - PERFIL DE PRODUÇÃO DO SQLITE
+# =====================================================
+@pytest.mark.django_db(transaction=True)
+class SQLitePerfilProducaoTestCase(TransactionTestCase):
+    """Testes do perfil opt-in de produção do SQLite e do benchmark de concorrência."""
+
+    def tearDown(self):
+        # O modo WAL fica gravado no arquivo: devolve o banco de testes ao padrão
+        with perfil_banco(PERFIL_SQLITE_PADRAO):
+            connection.ensure_connection()
+
+    def pragma(self, nome):
+        with connection.cursor() as cursor:
+            cursor.execute(f'PRAGMA {nome}')
+            return cursor.fetchone()[0]
+
+    # TESTE UNITÁRIO 1
+    def test_unit_pragmas_e_conexao_persistente(self):
+        self.assertEqual(self.pragma('journal_mode'), 'delete')
+
+        with perfil_banco(settings.SQLITE_PERFIL_PRODUCAO):
+            self.assertEqual(self.pragma('journal_mode'), 'wal')
+            self.assertEqual(self.pragma('synchronous'), 1)  # NORMAL
+            self.assertEqual(self.pragma('temp_store'), 2)  # MEMORY
+            self.assertEqual(self.pragma('cache_size'), -65536)
+            self.assertEqual(self.pragma('busy_timeout'), 5000)
+            self.assertEqual(connection.transaction_mode, 'IMMEDIATE')
+            self.assertIsNotNone(connection.close_at)
+
+        self.assertEqual(connection.settings_dict['CONN_MAX_AGE'], 0)
+        self.assertEqual(connection.settings_dict['OPTIONS'], {})
+
+    # TESTE UNITÁRIO 2
+    def test_unit_rajadas_de_escrita_sem_erros_no_perfil_de_producao(self):
+        Colaborador.objects.bulk_create(
+            Colaborador(nome=f'Colaborador {i}', email=f'c{i}@test.com') for i in range(5)
+        )
+        equipamento = Equipamento.objects.create(nome="Capacete", marca="3M", quantidade=100)
+
+        with perfil_banco(settings.SQLITE_PERFIL_PRODUCAO):
+            resultado = medir_concorrencia(escritores=2, leitores=2, duracao=0.5, tamanho_rajada=5)
+
+        self.assertGreater(resultado['leituras'], 0)
+        self.assertGreater(resultado['escritas'], 0)
+        self.assertEqual((resultado['erros_leitura'], resultado['erros_escrita']), (0, 0))
+        self.assertLessEqual(resultado['leitura_p50_ms'], resultado['leitura_p99_ms'])
+        # Cada rajada devolve o que emprestou
+        equipamento.refresh_from_db()
+        self.assertEqual(equipamento.quantidade, 100)
+
+    # TESTE DE INTEGRAÇÃO
+    def test_integration_comando_compara_os_dois_perfis(self):
+        nome_original = connection.settings_dict['NAME']
+        saida = StringIO()
+        with tempfile.TemporaryDirectory() as pasta:
+            try:
+                call_command(
+                    'benchmark_concorrencia', banco=f'{pasta}/bench.sqlite3', emprestimos=200,
+                    escritores=1, leitores=1, duracao=0.3, stdout=saida,
+                )
+            finally:
+                connection.close()
+                connection.settings_dict['NAME'] = nome_original
+
+        linhas = saida.getvalue().splitlines()
+        self.assertTrue(linhas[0].startswith('Gerando dados'))
+        self.assertTrue(linhas[1].startswith('padrão'))
+        self.assertTrue(linhas[2].startswith('produção'))
+        self.assertIn('erros leitura/escrita 0/0', linhas[2])
+
+
+
+# =====================================================
+# APP: CORE - RÉPLICA DE LEITURA
+# =====================================================
+@pytest.mark.django_db(transaction=True)
+class ReplicaLeituraTestCase(TransactionTestCase):
+    """Roteamento de leituras para a réplica, com dois arquivos SQLite."""
+
+    databases = {'default', 'leitura'}
+
+    @classmethod
+    def setUpClass(cls):
+        # Segundo arquivo SQLite como réplica: alias registrado só para estes testes
+        cls.pasta = tempfile.TemporaryDirectory()
+        connections.settings['leitura'] = {**connection.settings_dict, 'NAME': f'{cls.pasta.name}/replica.sqlite3'}
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        connections['leitura'].close()
+        del connections['leitura']
+        del connections.settings['leitura']
+        cls.pasta.cleanup()
+
+    def setUp(self):
+        self.client = Client()
+        User.objects.create_user(username='test@test.com', password='pass')
+        self.client.login(username='test@test.com', password='pass')
+        self.equipamento = Equipamento.objects.create(nome="Capacete", marca="3M", quantidade=10)
+        antes = Colaborador.objects.create(nome="Ana Antes", email="antes@test.com")
+        emprestimo = registrar_emprestimo(Emprestimo(nome=antes, equipamento=self.equipamento, quantidade=1))
+        devolver_emprestimo(emprestimo.pk)
+
+        # Réplica = cópia do principal neste momento
+        call_command('atualizar_replica', stdout=StringIO())
+
+        depois = Colaborador.objects.create(nome="Davi Depois", email="depois@test.com")
+        self.novo = registrar_emprestimo(Emprestimo(nome=depois, equipamento=self.equipamento, quantidade=1))
+
+    def nomes_no_historico(self):
+        response = self.client.get(reverse('historico:app_history'))
+        return [linha['fields'][0] for linha in response.context['object_data']]
+
+    # TESTE UNITÁRIO 1
+    def test_unit_router(self):
+        router = ReplicaLeituraRouter()
+
+        self.assertEqual(Emprestimo.objects.all().db, 'default')
+        with ler_da_replica():
+            self.assertEqual(Emprestimo.objects.all().db, 'leitura')
+            self.assertEqual(Emprestimo.objects.count(), 1)  # a réplica ainda não tem o novo empréstimo
+            self.assertEqual(router.db_for_write(Emprestimo), 'default')
+            with transaction.atomic():
+                # Leitura dentro de transação do principal não vai para a réplica
+                self.assertEqual(Emprestimo.objects.all().db, 'default')
+            with override_settings(BANCO_LEITURA='inexistente'):
+                self.assertEqual(Emprestimo.objects.all().db, 'default')
+        self.assertEqual(Emprestimo.objects.count(), 2)
+        self.assertFalse(router.allow_migrate('leitura', 'emprestimos'))
+        self.assertIsNone(router.allow_migrate('default', 'emprestimos'))
+
+    # TESTE UNITÁRIO 2
+    def test_unit_historico_fica_no_principal_depois_de_escrever(self):
+        self.assertEqual(self.nomes_no_historico(), ["Ana Antes"])
+
+        response = self.client.post(reverse('emprestimos:app_requests_return', args=[self.novo.pk]))
+        self.assertIn(COOKIE_PRIMARIO, response.cookies)
+
+        # Dentro da janela: lê do principal e vê a própria devolução
+        self.assertEqual(self.nomes_no_historico(), ["Davi Depois", "Ana Antes"])
+
+        # Passada a janela: volta para a réplica (ainda sem a devolução)
+        del self.client.cookies[COOKIE_PRIMARIO]
+        self.assertEqual(self.nomes_no_historico(), ["Ana Antes"])
+
+    # TESTE DE INTEGRAÇÃO
+    def test_integration_exportacao_csv_em_streaming_le_da_replica(self):
+        with CaptureQueriesContext(connections['leitura']) as na_replica:
+            response = self.client.get(reverse('relatorios:download_movimentacoes_csv'))
+            linhas = b''.join(response.streaming_content).decode('utf-8').splitlines()
+
+        # Cabeçalho + o único empréstimo que a réplica conhece
+        self.assertEqual(len(linhas), 2)
+        self.assertIn('Ana Antes', linhas[1])
+        self.assertTrue(any('emprestimos_emprestimo' in q['sql'] for q in na_replica.captured_queries))
+
+
+
+# =====================================================
+# APP: ARQUIVO DE EMPRÉSTIMOS DEVOLVIDOS
+# =====================================================
+@pytest.mark.django_db
+class ArquivoEmprestimosTestCase(TestCase):
+    """Arquivamento dos devolvidos antigos e leitura conjunta com Emprestimo."""
+
+    # (colaborador, dias desde o empréstimo, dias desde a devolução ou None se ativo)
+    EMPRESTIMOS = [
+        ("Ana", 410, 400),
+        ("Bruno", 310, 300),
+        ("Carla", 210, 200),
+        ("Diego", 350, 10),
+        ("Elisa", 15, 5),
+        ("Fábio", 1, None),
+    ]
+
+    def setUp(self):
+        self.client = Client()
+        User.objects.create_user(username='test@test.com', password='pass')
+        self.client.login(username='test@test.com', password='pass')
+        self.agora = timezone.now()
+        equipamento = Equipamento.objects.create(nome="Luva", marca="3M", quantidade=50)
+        self.pks = {}
+        for nome, dias_emprestimo, dias_devolucao in self.EMPRESTIMOS:
+            colaborador = Colaborador.objects.create(nome=nome, email=f"{nome.lower()}@test.com")
+            emprestimo = Emprestimo.objects.create(
+                nome=colaborador, equipamento=equipamento, quantidade=2,
+                data_prazo=self.agora, estoque_disponivel=48,
+                status='DEVOLVIDO' if dias_devolucao else 'EMPRESTADO',
+            )
+            Emprestimo.objects.filter(pk=emprestimo.pk).update(
+                data_emprestimo=self.agora - timedelta(days=dias_emprestimo),
+                data_devolucao_real=dias_devolucao and self.agora - timedelta(days=dias_devolucao),
+            )
+            self.pks[nome] = emprestimo.pk
+
+    def nomes_no_historico(self):
+        """Percorre todas as páginas do histórico pelo cursor 'after'."""
+        nomes, params = [], {}
+        while True:
+            response = self.client.get(reverse('historico:app_history'), params)
+            nomes.append([linha['fields'][0] for linha in response.context['object_data']])
+            page = response.context['page']
+            if not page.has_next:
+                return nomes
+            params = {'after': page.next_cursor}
+
+    # TESTE UNITÁRIO 1
+    def test_unit_arquiva_so_devolvidos_antigos_em_lotes(self):
+        arquivado = Emprestimo.objects.get(pk=self.pks["Bruno"])
+
+        self.assertEqual(arquivar_devolvidos(idade_dias=180, agora=self.agora, chunk_size=2), 3)
+
+        self.assertEqual(
+            set(EmprestimoArquivado.objects.values_list('pk', flat=True)),
+            {self.pks["Ana"], self.pks["Bruno"], self.pks["Carla"]},
+        )
+        self.assertEqual(
+            set(Emprestimo.objects.values_list('nome__nome', flat=True)), {"Diego", "Elisa", "Fábio"}
+        )
+        copia = EmprestimoArquivado.objects.get(pk=self.pks["Bruno"])
+        for campo in ('nome_id', 'equipamento_id', 'quantidade', 'data_emprestimo',
+                      'data_prazo', 'data_devolucao_real', 'estoque_disponivel'):
+            self.assertEqual(getattr(copia, campo), getattr(arquivado, campo), campo)
+        # Nada mais a arquivar na segunda execução
+        self.assertEqual(arquivar_devolvidos(idade_dias=180, agora=self.agora), 0)
+
+    # TESTE UNITÁRIO 2
+    @override_settings(LIST_PAGE_SIZE=3)
+    def test_unit_historico_pagina_sobre_as_duas_tabelas(self):
+        esperado = [["Elisa", "Diego", "Carla"], ["Bruno", "Ana"]]
+        self.assertEqual(self.nomes_no_historico(), esperado)
+
+        arquivar_devolvidos(idade_dias=180, agora=self.agora)
+
+        # A primeira página junta Emprestimo (Elisa, Diego) e o arquivo (Carla)
+        self.assertEqual(self.nomes_no_historico(), esperado)
+        response = self.client.get(reverse('historico:app_history'))
+        self.assertEqual(response.context['object_data'][2]['fields'][-1], 'Devolvido')
+        # Voltando a partir do arquivo (cursor de Carla), chega às linhas de Emprestimo
+        response = self.client.get(reverse('historico:app_history'), {'before': response.context['page'].next_cursor})
+        self.assertEqual([linha['fields'][0] for linha in response.context['object_data']], ["Elisa", "Diego"])
+        self.assertFalse(response.context['page'].has_previous)
+
+    # TESTE DE INTEGRAÇÃO
+    def test_integration_comando_e_exportacao_csv(self):
+        with self.assertRaises(CommandError):
+            call_command('arquivar_emprestimos', '--chunk-size', '0', stdout=StringIO())
+        saida = StringIO()
+        call_command('arquivar_emprestimos', '--dias', '100', stdout=saida)
+        self.assertIn('3 empréstimo(s) arquivado(s)', saida.getvalue())
+
+        def exportar(**filtros):
+            response = self.client.get(reverse('relatorios:download_movimentacoes_csv'), filtros)
+            linhas = b''.join(response.streaming_content).decode('utf-8').splitlines()[1:]
+            return [linha.split(',')[1] for linha in linhas]
+
+        # Uma única sequência por data de empréstimo, intercalando as tabelas
+        self.assertEqual(exportar(), ["Fábio", "Elisa", "Carla", "Bruno", "Diego", "Ana"])
+        self.assertEqual(exportar(status='EMPRESTADO'), ["Fábio"])
+        self.assertEqual(exportar(status='DEVOLVIDO', colaborador=Colaborador.objects.get(nome="Bruno").pk), ["Bruno"])
+
+        # Os relatórios consolidados continuam contando os arquivados
+        dia = timezone.localdate(self.agora - timedelta(days=300))
+        consolidar_dias(dia, dia)
+        linha = MovimentoColaboradorDiario.objects.get(dia=dia)
+        self.assertEqual((linha.devolucoes, linha.colaborador.nome), (1, "Bruno"))
@@ -29,6 +29,9 @@ urlpatterns = [
     # Reports
     path('app/reports/', include('relatorios.urls')),
     
+    # Métricas de desempenho por rota (staff)
+    path('app/performance/', views.app_performance, name='app_performance'),
+
     # --- ÁREA DE CONFIGURAÇÕES ---
     path('app/configs', views.app_configs, name='app_configs'),
     
@@ -1,16 +1,133 @@
-from datetime import timedelta
-
-def calculate_deadline(start_date):
-    """
-    Calcula a data de prazo (3 dias após a data de início).
-    Se a data cair em um final de semana, move para a próxima segunda-feira.
-    """
-    deadline = start_date + timedelta(days=3)
-    
-    # Se cair no sábado (5) ou domingo (6), move para segunda-feira
-    if deadline.weekday() == 5: # Sábado
-        deadline += timedelta(days=2)
-    elif deadline.weekday() == 6: # Domingo
-        deadline += timedelta(days=1)
-        
-    return deadline
+from bisect import bisect_right
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.utils import timezone
+
+# Prazo padrão de devolução, em dias úteis.
+PRAZO_DIAS_UTEIS = 3
+
+# Intervalo de anos coberto pelo calendário pré-calculado.
+CALENDARIO_ANO_INICIAL = 2000
+CALENDARIO_ANO_FINAL = 2100
+
+# Feriados nacionais de data fixa (mês, dia).
+FERIADOS_FIXOS = [
+    (1, 1),    # Confraternização Universal
+    (4, 21),   # Tiradentes
+    (5, 1),    # Dia do Trabalho
+    (9, 7),    # Independência
+    (10, 12),  # Nossa Senhora Aparecida
+    (11, 2),   # Finados
+    (11, 15),  # Proclamação da República
+    (11, 20),  # Dia Nacional de Zumbi e da Consciência Negra
+    (12, 25),  # Natal
+]
+
+
+def domingo_de_pascoa(ano):
+    """
+    Data da Páscoa no calendário gregoriano (algoritmo de Meeus/Jones/Butcher).
+    """
+    a = ano % 19
+    b, c = divmod(ano, 100)
+    d, e = divmod(b, 4)
+    f = (b + 8) // 25
+    g = (b - f + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = divmod(c, 4)
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    mes, dia = divmod(h + l - 7 * m + 114, 31)
+    return date(ano, mes, dia + 1)
+
+
+def feriados(ano):
+    """
+    Feriados do ano: nacionais fixos, Sexta-feira Santa e os feriados da
+    planta em settings.FERIADOS_EXTRAS (datas ou strings 'AAAA-MM-DD').
+    """
+    dias = {date(ano, mes, dia) for mes, dia in FERIADOS_FIXOS}
+    dias.add(domingo_de_pascoa(ano) - timedelta(days=2))
+
+    for extra in getattr(settings, 'FERIADOS_EXTRAS', []):
+        if isinstance(extra, str):
+            extra = date.fromisoformat(extra)
+        if extra.year == ano:
+            dias.add(extra)
+    return dias
+
+
+@lru_cache(maxsize=1)
+def dias_uteis():
+    """
+    Lista ordenada com o ordinal (date.toordinal) de cada dia útil do
+    calendário. Calculada uma vez por processo.
+    """
+    feriados_ordinais = {
+        dia.toordinal()
+        for ano in range(CALENDARIO_ANO_INICIAL, CALENDARIO_ANO_FINAL + 1)
+        for dia in feriados(ano)
+    }
+    inicio = date(CALENDARIO_ANO_INICIAL, 1, 1).toordinal()
+    fim = date(CALENDARIO_ANO_FINAL, 12, 31).toordinal()
+    return [
+        ordinal for ordinal in range(inicio, fim + 1)
+        # date.fromordinal(1) é uma segunda-feira: (ordinal - 1) % 7 >= 5 é fim de semana
+        if (ordinal - 1) % 7 < 5 and ordinal not in feriados_ordinais
+    ]
+
+
+@receiver(setting_changed)
+def _limpar_calendario(*, setting, **kwargs):
+    if setting == 'FERIADOS_EXTRAS':
+        dias_uteis.cache_clear()
+
+
+def _ordinal_do_prazo(ordinal, dias):
+    """
+    Ordinal do `dias`-ésimo dia útil depois de `ordinal` (busca binária).
+    """
+    calendario = dias_uteis()
+    indice = bisect_right(calendario, ordinal) + dias - 1
+    if ordinal < calendario[0] or indice >= len(calendario):
+        raise ValueError(
+            f"Data fora do calendário de dias úteis ({CALENDARIO_ANO_INICIAL}-{CALENDARIO_ANO_FINAL})."
+        )
+    return calendario[indice]
+
+
+def _data_local(start_date):
+    if isinstance(start_date, datetime) and timezone.is_aware(start_date):
+        return timezone.localtime(start_date)
+    return start_date
+
+
+def calculate_deadline(start_date, dias=PRAZO_DIAS_UTEIS):
+    """
+    Calcula a data de prazo: `dias` dias úteis após a data de início,
+    pulando fins de semana e feriados. Mantém o horário de `start_date`
+    (datetimes com fuso são convertidos para o fuso local antes).
+    """
+    inicio = _data_local(start_date)
+    ordinal = inicio.toordinal()
+    return inicio + timedelta(days=_ordinal_do_prazo(ordinal, dias) - ordinal)
+
+
+def calculate_deadlines(start_dates, dias=PRAZO_DIAS_UTEIS):
+    """
+    Versão em lote de calculate_deadline, para muitos empréstimos de uma vez
+    (lotes, cargas de dados). Cada data distinta é resolvida uma vez só.
+    """
+    prazos_por_dia = {}
+    resultado = []
+    for start_date in start_dates:
+        inicio = _data_local(start_date)
+        ordinal = inicio.toordinal()
+        if ordinal not in prazos_por_dia:
+            prazos_por_dia[ordinal] = _ordinal_do_prazo(ordinal, dias) - ordinal
+        resultado.append(inicio + timedelta(days=prazos_por_dia[ordinal]))
+    return resultado
@@ -1,13 +1,16 @@
 # views.py
 
-from django.http import HttpResponse
+from django.conf import settings
+from django.http import HttpResponse, JsonResponse
 from django.shortcuts import render, redirect
 from django.contrib.auth import authenticate, login as auth_login
 from django.contrib.auth.models import User
 from django.contrib.auth.decorators import login_required
+from django.core.exceptions import PermissionDenied
 
 # Import forms
 from .forms import LoginForm, RegistrationForm
+from .performance import historico_rotas
 
 # frameworks
 # Django Messages Framework
@@ -89,4 +92,18 @@ def login_create(request):
 # Config view - kept in core as it's simple
 @login_required
 def app_configs(request):
-    return render(request, 'app_ui_configs.html')
\ No newline at end of file
+    return render(request, 'app_ui_configs.html')
+
+
+@login_required
+def app_performance(request):
+    """
+    JSON (staff): latência p50/p95/p99, tempo de banco e consultas por rota,
+    medidos pelo InstrumentacaoMiddleware neste processo.
+    """
+    if not request.user.is_staff:
+        raise PermissionDenied
+    return JsonResponse({
+        'instrumentacao': getattr(settings, 'PERFORMANCE_INSTRUMENTACAO', False),
+        'rotas': historico_rotas.resumo(),
+    })
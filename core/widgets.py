@@ -0,0 +1,48 @@
+from django import forms
+from django.core.exceptions import ValidationError
+from django.urls import reverse
+
+
+class AutocompleteSelect(forms.Select):
+    """
+    Select que renderiza só a opção selecionada; as demais vêm do endpoint
+    de autocomplete (data-autocomplete-url) conforme o usuário digita.
+
+    Evita montar um <option> por registro em tabelas grandes. A validação
+    continua a cargo do ModelChoiceField (uma consulta pelo pk enviado).
+    """
+
+    class Media:
+        js = ['js/autocomplete.js']
+
+    def __init__(self, url_name, attrs=None):
+        self.url_name = url_name
+        super().__init__(attrs)
+
+    def get_context(self, name, value, attrs):
+        attrs = {**(attrs or {}), 'data-autocomplete-url': reverse(self.url_name)}
+        return super().get_context(name, value, attrs)
+
+    def optgroups(self, name, value, attrs=None):
+        opcoes = [] if self.allow_multiple_selected else [('', '---------')]
+        queryset = getattr(self.choices, 'queryset', None)
+        selecionados = [v for v in value if v not in (None, '')]
+        if queryset is not None and selecionados:
+            try:
+                opcoes += [(obj.pk, str(obj)) for obj in queryset.filter(pk__in=selecionados)]
+            except (ValueError, TypeError, ValidationError):
+                pass
+
+        choices = self.choices
+        self.choices = opcoes
+        try:
+            return super().optgroups(name, value, attrs)
+        finally:
+            self.choices = choices
+
+
+class AutocompleteSelectMultiple(AutocompleteSelect, forms.SelectMultiple):
+    """
+    Versão de seleção múltipla do AutocompleteSelect: os resultados da busca
+    são acrescentados sem perder os itens já selecionados.
+    """
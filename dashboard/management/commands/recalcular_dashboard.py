@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from dashboard.services import recalcular_indicadores
+
+
+class Command(BaseCommand):
+    help = (
+        "Reconstrói os indicadores do dashboard a partir das tabelas de "
+        "empréstimos (use na carga inicial ou se os contadores divergirem)."
+    )
+
+    def handle(self, *args, **options):
+        recalcular_indicadores()
+        self.stdout.write(self.style.SUCCESS("Indicadores do dashboard recalculados."))
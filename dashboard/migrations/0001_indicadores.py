@@ -0,0 +1,31 @@
+# Generated by Django 5.2.6 on 2026-10-18 09:36
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EmprestimosPorDia',
+            fields=[
+                ('dia', models.DateField(primary_key=True, serialize=False)),
+                ('total', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='IndicadoresDashboard',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('emprestimos_ativos', models.IntegerField(default=0)),
+                ('emprestimos_atrasados', models.IntegerField(default=0)),
+                ('atualizado_em', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+    ]
@@ -0,0 +1,39 @@
+from django.db import migrations
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+
+def carregar_indicadores(apps, schema_editor):
+    Emprestimo = apps.get_model('emprestimos', 'Emprestimo')
+    EmprestimoAtrasado = apps.get_model('emprestimos', 'EmprestimoAtrasado')
+    IndicadoresDashboard = apps.get_model('dashboard', 'IndicadoresDashboard')
+    EmprestimosPorDia = apps.get_model('dashboard', 'EmprestimosPorDia')
+
+    IndicadoresDashboard.objects.update_or_create(pk=1, defaults={
+        'emprestimos_ativos': Emprestimo.objects.filter(status='EMPRESTADO').count(),
+        'emprestimos_atrasados': EmprestimoAtrasado.objects.count(),
+        'atualizado_em': timezone.now(),
+    })
+    por_dia = (
+        Emprestimo.objects
+        .annotate(dia=TruncDate('data_emprestimo', tzinfo=timezone.get_current_timezone()))
+        .values('dia')
+        .annotate(total=Count('pk'))
+        .order_by()
+    )
+    EmprestimosPorDia.objects.bulk_create(
+        EmprestimosPorDia(dia=linha['dia'], total=linha['total']) for linha in por_dia
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0001_indicadores'),
+        ('emprestimos', '0004_emprestimos_atrasados'),
+    ]
+
+    operations = [
+        migrations.RunPython(carregar_indicadores, migrations.RunPython.noop),
+    ]
@@ -1,3 +1,59 @@
 from django.db import models
+from django.db.models import F
+from django.utils import timezone
 
-# Create your models here.
+
+class IndicadoresDashboard(models.Model):
+    """
+    Indicadores do dashboard pré-calculados (linha única).
+
+    Os serviços de empréstimo ajustam os contadores a cada cadastro,
+    devolução e exclusão; o comando detectar_atrasados atualiza o total de
+    atrasados. O dashboard lê esta linha em vez de contar Emprestimo.
+    """
+    emprestimos_ativos = models.IntegerField(default=0)
+    emprestimos_atrasados = models.IntegerField(default=0)
+    atualizado_em = models.DateTimeField(default=timezone.now)
+
+    @classmethod
+    def ajustar(cls, **deltas):
+        """
+        Soma `deltas` aos contadores com um UPDATE atômico (F()), ex.:
+        ajustar(emprestimos_ativos=-1). Cria a linha na primeira vez.
+        """
+        agora = timezone.now()
+        valores = {campo: F(campo) + delta for campo, delta in deltas.items()}
+        if not cls.objects.filter(pk=1).update(atualizado_em=agora, **valores):
+            _, criado = cls.objects.get_or_create(pk=1, defaults={**deltas, 'atualizado_em': agora})
+            if not criado:
+                cls.objects.filter(pk=1).update(atualizado_em=agora, **valores)
+
+    @classmethod
+    def definir(cls, **valores):
+        """
+        Grava valores absolutos nos contadores (recontagens).
+        """
+        cls.objects.update_or_create(pk=1, defaults={**valores, 'atualizado_em': timezone.now()})
+
+    @classmethod
+    def atual(cls):
+        """
+        Retorna a linha de indicadores (zerada se ainda não existir).
+        """
+        return cls.objects.filter(pk=1).first() or cls(pk=1)
+
+
+class EmprestimosPorDia(models.Model):
+    """
+    Quantidade de empréstimos cadastrados por dia (data local), mantida
+    incrementalmente junto com IndicadoresDashboard.
+    """
+    dia = models.DateField(primary_key=True)
+    total = models.IntegerField(default=0)
+
+    @classmethod
+    def ajustar(cls, dia, delta):
+        if not cls.objects.filter(dia=dia).update(total=F('total') + delta):
+            _, criado = cls.objects.get_or_create(dia=dia, defaults={'total': delta})
+            if not criado:
+                cls.objects.filter(dia=dia).update(total=F('total') + delta)
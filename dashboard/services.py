@@ -0,0 +1,72 @@
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from emprestimos.models import Emprestimo, EmprestimoArquivado, EmprestimoAtrasado
+from equipamentos.models import Equipamento
+from .models import EmprestimosPorDia, IndicadoresDashboard
+
+# Janela do gráfico de empréstimos por dia
+DIAS_GRAFICO = 30
+# Itens abaixo do mínimo listados no dashboard; o restante fica na listagem completa
+LIMITE_ABAIXO_MINIMO = 20
+
+
+def recalcular_indicadores():
+    """
+    Reconstrói os indicadores a partir das tabelas de empréstimos (contagem
+    completa). Usado na carga inicial e para corrigir divergências; no dia
+    a dia os serviços de empréstimo mantêm os contadores incrementalmente.
+    """
+    por_dia = Counter()
+    # Empréstimos arquivados também contam no gráfico por dia
+    for modelo in (Emprestimo, EmprestimoArquivado):
+        for linha in (
+            modelo.objects
+            .annotate(dia=TruncDate('data_emprestimo', tzinfo=timezone.get_current_timezone()))
+            .values('dia')
+            .annotate(total=Count('pk'))
+            .order_by()
+        ):
+            por_dia[linha['dia']] += linha['total']
+    with transaction.atomic():
+        IndicadoresDashboard.definir(
+            emprestimos_ativos=Emprestimo.objects.filter(status='EMPRESTADO').count(),
+            emprestimos_atrasados=EmprestimoAtrasado.objects.count(),
+        )
+        EmprestimosPorDia.objects.all().delete()
+        EmprestimosPorDia.objects.bulk_create(
+            EmprestimosPorDia(dia=dia, total=total) for dia, total in por_dia.items()
+        )
+
+
+def serie_emprestimos_por_dia(dias=DIAS_GRAFICO, hoje=None):
+    """
+    Lista [(dia, total)] dos últimos `dias` dias, incluindo hoje; dias sem
+    empréstimos entram com total 0.
+    """
+    hoje = hoje or timezone.localdate()
+    inicio = hoje - timedelta(days=dias - 1)
+    totais = dict(
+        EmprestimosPorDia.objects.filter(dia__gte=inicio, dia__lte=hoje).values_list('dia', 'total')
+    )
+    return [
+        (inicio + timedelta(days=i), totais.get(inicio + timedelta(days=i), 0))
+        for i in range(dias)
+    ]
+
+
+def equipamentos_abaixo_do_minimo():
+    """
+    Equipamentos com estoque abaixo de settings.ESTOQUE_MINIMO, do menor
+    estoque para o maior. Percorre só o trecho do índice de quantidade;
+    o dashboard conta e lista no máximo LIMITE_ABAIXO_MINIMO linhas.
+    """
+    return Equipamento.objects.filter(
+        quantidade__lt=settings.ESTOQUE_MINIMO,
+    ).order_by('quantidade', 'pk').values('pk', 'nome', 'quantidade')
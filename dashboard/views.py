@@ -1,6 +1,29 @@
 from django.shortcuts import render
 from django.contrib.auth.decorators import login_required
+from core.routers import leitura_em_replica
+from .models import IndicadoresDashboard
+from .services import LIMITE_ABAIXO_MINIMO, equipamentos_abaixo_do_minimo, serie_emprestimos_por_dia
 
 @login_required
+@leitura_em_replica
 def app_dashboard(request):
-    return render(request, 'app_ui_dashboard.html')
+    """
+    Dashboard com os indicadores pré-calculados (IndicadoresDashboard e
+    EmprestimosPorDia); não conta a tabela de empréstimos.
+    """
+    indicadores = IndicadoresDashboard.atual()
+    abaixo_minimo = equipamentos_abaixo_do_minimo()
+    abaixo_minimo_total = abaixo_minimo.count()
+    serie = serie_emprestimos_por_dia()
+    maior_total = max((total for _, total in serie), default=0) or 1
+
+    context = {
+        'indicadores': indicadores,
+        'abaixo_minimo': list(abaixo_minimo[:LIMITE_ABAIXO_MINIMO]) if abaixo_minimo_total else [],
+        'abaixo_minimo_total': abaixo_minimo_total,
+        'emprestimos_por_dia': [
+            {'dia': dia, 'total': total, 'percentual': round(total * 100 / maior_total)}
+            for dia, total in serie
+        ],
+    }
+    return render(request, 'app_ui_dashboard.html', context)
@@ -1,13 +1,16 @@
 from django import forms
 from .models import Emprestimo
+from colaboradores.models import Colaborador
+from equipamentos.models import Equipamento
+from core.widgets import AutocompleteSelect, AutocompleteSelectMultiple
 
 class EmprestimoForm(forms.ModelForm):
     class Meta:
         model = Emprestimo
         fields = ['nome', 'equipamento', 'quantidade']
         widgets = {
-            'nome': forms.Select(attrs={'class': 'form-input'}),
-            'equipamento': forms.Select(attrs={'class': 'form-input', 'id': 'id_equipamento'}),
+            'nome': AutocompleteSelect('colaboradores:app_users_search', attrs={'class': 'form-input'}),
+            'equipamento': AutocompleteSelect('equipamentos:app_items_search', attrs={'class': 'form-input', 'id': 'id_equipamento'}),
             'quantidade': forms.NumberInput(attrs={'class': 'form-input', 'min': '1'}),
         }
         labels = {
@@ -16,6 +19,14 @@ class EmprestimoForm(forms.ModelForm):
             'quantidade': 'Quantidade Emprestada',
         }
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Empréstimo devolvido: as unidades já voltaram ao estoque, então
+        # equipamento e quantidade não podem mais mudar
+        if self.instance.pk and self.instance.status == 'DEVOLVIDO':
+            self.fields['equipamento'].disabled = True
+            self.fields['quantidade'].disabled = True
+
     def clean(self):
         cleaned_data = super().clean()
         equipamento = cleaned_data.get('equipamento')
@@ -24,11 +35,51 @@ class EmprestimoForm(forms.ModelForm):
         if quantidade is not None and quantidade < 1:
             raise forms.ValidationError("A quantidade mínima para empréstimo é 1.")
 
-        if equipamento and quantidade is not None:
-            if quantidade > equipamento.quantidade:
-                raise forms.ValidationError(f"Quantidade indisponível. Estoque atual: {equipamento.quantidade}")
-            
-            # Calcular estoque restante para salvar no modelo (snapshot)
-            self.instance.estoque_disponivel = equipamento.quantidade - quantidade
+        if equipamento and quantidade is not None and self.instance.status != 'DEVOLVIDO':
+            # Na edição, as unidades já emprestadas do mesmo equipamento voltam a contar
+            proprias = 0
+            if self.instance.pk and self.instance.equipamento_id == equipamento.pk:
+                proprias = self.instance.quantidade
+            if quantidade > equipamento.quantidade + proprias:
+                # Relê o estoque: a mensagem mostra o que está disponível agora,
+                # não o valor carregado no início da validação
+                atual = Equipamento.objects.values_list('quantidade', flat=True).get(pk=equipamento.pk)
+                if quantidade > atual + proprias:
+                    raise forms.ValidationError(f"Quantidade indisponível. Estoque atual: {atual + proprias}")
 
+        # O snapshot estoque_disponivel é gravado pelos serviços, junto com a baixa do estoque
         return cleaned_data
+
+
+class EmprestimoLoteForm(forms.Form):
+    """
+    Empréstimo em lote: o mesmo kit (equipamentos x quantidade) para vários
+    colaboradores. Cada combinação vira uma linha do lote.
+    """
+    colaboradores = forms.ModelMultipleChoiceField(
+        queryset=Colaborador.objects.all(),
+        label='Colaboradores',
+        widget=AutocompleteSelectMultiple('colaboradores:app_users_search', attrs={'class': 'form-input'}),
+    )
+    equipamentos = forms.ModelMultipleChoiceField(
+        queryset=Equipamento.objects.all(),
+        label='Equipamentos do Kit',
+        widget=AutocompleteSelectMultiple('equipamentos:app_items_search', attrs={'class': 'form-input'}),
+    )
+    quantidade = forms.IntegerField(
+        min_value=1,
+        initial=1,
+        label='Quantidade de cada equipamento por colaborador',
+        widget=forms.NumberInput(attrs={'class': 'form-input', 'min': '1'}),
+    )
+
+    def linhas(self):
+        """
+        Linhas (colaborador_id, equipamento_id, quantidade) do lote.
+        """
+        cd = self.cleaned_data
+        return [
+            (colaborador.pk, equipamento.pk, cd['quantidade'])
+            for colaborador in cd['colaboradores']
+            for equipamento in cd['equipamentos']
+        ]
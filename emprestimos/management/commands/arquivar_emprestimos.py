@@ -0,0 +1,39 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from emprestimos.services import arquivar_devolvidos
+
+
+class Command(BaseCommand):
+    help = (
+        "Move os empréstimos devolvidos há mais de ARQUIVO_IDADE_DIAS dias para "
+        "a tabela de arquivo, em lotes (uma transação por lote)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dias',
+            type=int,
+            help="Idade mínima da devolução, em dias (padrão: settings.ARQUIVO_IDADE_DIAS).",
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=2000,
+            help="Empréstimos movidos por transação.",
+        )
+
+    def handle(self, *args, **options):
+        if options['dias'] is not None and options['dias'] < 0:
+            raise CommandError("--dias não pode ser negativo.")
+        if options['chunk_size'] < 1:
+            raise CommandError("--chunk-size deve ser maior que zero.")
+
+        inicio = time.perf_counter()
+        arquivados = arquivar_devolvidos(idade_dias=options['dias'], chunk_size=options['chunk_size'])
+        duracao = (time.perf_counter() - inicio) * 1000
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{arquivados} empréstimo(s) arquivado(s) em {duracao:.0f} ms."
+        ))
@@ -0,0 +1,28 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from emprestimos.services import detectar_atrasados
+
+
+class Command(BaseCommand):
+    help = (
+        "Detecta empréstimos ativos com prazo vencido desde a última execução "
+        "e atualiza a tabela de atrasados. Pensado para rodar a cada poucos minutos."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--completo',
+            action='store_true',
+            help="Ignora a marca d'água e verifica todos os empréstimos ativos vencidos.",
+        )
+
+    def handle(self, *args, **options):
+        inicio = time.perf_counter()
+        novos, resolvidos = detectar_atrasados(completo=options['completo'])
+        duracao = (time.perf_counter() - inicio) * 1000
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{novos} novo(s) atrasado(s), {resolvidos} resolvido(s) em {duracao:.0f} ms."
+        ))
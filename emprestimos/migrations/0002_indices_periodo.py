@@ -0,0 +1,21 @@
+# Generated by Django 5.2.6 on 2026-10-18 09:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('emprestimos', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='emprestimo',
+            index=models.Index(fields=['data_emprestimo'], name='emprest_data_emprestimo_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='emprestimo',
+            index=models.Index(fields=['data_devolucao_real'], name='emprest_data_devolucao_idx'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.6 on 2026-10-18 09:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('emprestimos', '0002_indices_periodo'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='emprestimo',
+            index=models.Index(fields=['status', 'data_emprestimo'], name='emprest_status_data_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='emprestimo',
+            index=models.Index(fields=['status', 'data_devolucao_real'], name='emprest_status_devolucao_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='emprestimo',
+            index=models.Index(condition=models.Q(('status', 'EMPRESTADO')), fields=['data_prazo'], name='emprest_ativos_prazo_idx'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.6 on 2026-10-18 09:32
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('emprestimos', '0003_indices_listagens'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VarreduraAtrasos',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ultimo_prazo', models.DateTimeField(blank=True, null=True)),
+                ('executado_em', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='EmprestimoAtrasado',
+            fields=[
+                ('emprestimo', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='atraso', serialize=False, to='emprestimos.emprestimo', verbose_name='Empréstimo')),
+                ('data_prazo', models.DateTimeField(verbose_name='Data de Devolução Prevista')),
+                ('detectado_em', models.DateTimeField(auto_now_add=True, verbose_name='Detectado em')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['data_prazo'], name='atrasado_data_prazo_idx')],
+            },
+        ),
+    ]
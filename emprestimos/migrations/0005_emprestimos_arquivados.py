@@ -0,0 +1,32 @@
+# Generated by Django 5.2.6 on 2026-10-18 10:37
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('colaboradores', '0003_indices_busca_nome'),
+        ('emprestimos', '0004_emprestimos_atrasados'),
+        ('equipamentos', '0005_livro_estoque'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EmprestimoArquivado',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('quantidade', models.PositiveIntegerField(verbose_name='Quantidade')),
+                ('data_emprestimo', models.DateTimeField(verbose_name='Data do Empréstimo')),
+                ('data_prazo', models.DateTimeField(verbose_name='Data de Devolução Prevista')),
+                ('data_devolucao_real', models.DateTimeField(verbose_name='Data de Devolução Real')),
+                ('estoque_disponivel', models.PositiveIntegerField(verbose_name='Estoque disponível após o empréstimo')),
+                ('equipamento', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='+', to='equipamentos.equipamento', verbose_name='Equipamento')),
+                ('nome', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='+', to='colaboradores.colaborador', verbose_name='Colaborador')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['data_devolucao_real'], name='arquivo_data_devolucao_idx'), models.Index(fields=['data_emprestimo'], name='arquivo_data_emprestimo_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.6 on 2026-10-18 10:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('emprestimos', '0005_emprestimos_arquivados'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='emprestimo',
+            index=models.Index(condition=models.Q(('status', 'EMPRESTADO')), fields=['equipamento'], name='emprest_ativos_equip_idx'),
+        ),
+    ]
@@ -16,6 +16,105 @@ class Emprestimo(models.Model):
     data_devolucao_real = models.DateTimeField(null=True, blank=True, verbose_name="Data de Devolução Real")
     estoque_disponivel = models.PositiveIntegerField(default=0, help_text="Quantidade disponível no estoque após empréstimo")
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='EMPRESTADO', verbose_name="Status")
-    
+
+    class Meta:
+        indexes = [
+            # Filtros de período da exportação de movimentações
+            models.Index(fields=['data_emprestimo'], name='emprest_data_emprestimo_idx'),
+            models.Index(fields=['data_devolucao_real'], name='emprest_data_devolucao_idx'),
+            # Listagem de ativos (status + ordem por data do empréstimo)
+            models.Index(fields=['status', 'data_emprestimo'], name='emprest_status_data_idx'),
+            # Histórico de devolvidos (status + ordem por data de devolução)
+            models.Index(fields=['status', 'data_devolucao_real'], name='emprest_status_devolucao_idx'),
+            # Atrasados: só empréstimos ativos entram no índice de prazo
+            models.Index(
+                fields=['data_prazo'],
+                name='emprest_ativos_prazo_idx',
+                condition=models.Q(status='EMPRESTADO'),
+            ),
+            # Unidades emprestadas por equipamento (reconciliação de estoque)
+            models.Index(
+                fields=['equipamento'],
+                name='emprest_ativos_equip_idx',
+                condition=models.Q(status='EMPRESTADO'),
+            ),
+        ]
+
     def __str__(self):
         return f"{self.nome.nome} - {self.equipamento.nome} ({self.quantidade}) - {self.get_status_display()}"
+
+
+class EmprestimoAtrasado(models.Model):
+    """
+    Empréstimos ativos com prazo vencido, mantidos pelo comando
+    detectar_atrasados. Tabela compacta: a tela de atrasados e o dashboard
+    leem só estas linhas, sem varrer Emprestimo.
+    """
+    emprestimo = models.OneToOneField(
+        Emprestimo,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='atraso',
+        verbose_name="Empréstimo",
+    )
+    data_prazo = models.DateTimeField(verbose_name="Data de Devolução Prevista")
+    detectado_em = models.DateTimeField(auto_now_add=True, verbose_name="Detectado em")
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['data_prazo'], name='atrasado_data_prazo_idx'),
+        ]
+
+    def __str__(self):
+        return f"Atrasado: {self.emprestimo_id} (prazo {self.data_prazo})"
+
+
+class VarreduraAtrasos(models.Model):
+    """
+    Marca d'água da detecção de atrasados (linha única): até qual prazo os
+    empréstimos já foram verificados. Cada execução só lê os prazos vencidos
+    depois dela.
+    """
+    ultimo_prazo = models.DateTimeField(null=True, blank=True)
+    executado_em = models.DateTimeField(null=True, blank=True)
+
+
+class EmprestimoArquivadoQuerySet(models.QuerySet):
+
+    def como_emprestimos(self):
+        """
+        Anota o status ('DEVOLVIDO'), para que as linhas do arquivo tenham
+        as mesmas colunas das de Emprestimo nas listagens e filtros.
+        """
+        return self.annotate(status=models.Value('DEVOLVIDO', output_field=models.CharField()))
+
+
+class EmprestimoArquivado(models.Model):
+    """
+    Empréstimos devolvidos há mais de settings.ARQUIVO_IDADE_DIAS dias,
+    movidos de Emprestimo pelo comando arquivar_emprestimos. Guarda o pk
+    original e só as colunas do histórico (todo arquivado está devolvido),
+    deixando em Emprestimo os empréstimos ativos e as devoluções recentes.
+    """
+    STATUS_CHOICES = Emprestimo.STATUS_CHOICES
+
+    id = models.BigIntegerField(primary_key=True)
+    nome = models.ForeignKey(Colaborador, on_delete=models.PROTECT, related_name='+', verbose_name="Colaborador")
+    equipamento = models.ForeignKey(Equipamento, on_delete=models.PROTECT, related_name='+', verbose_name="Equipamento")
+    quantidade = models.PositiveIntegerField(verbose_name="Quantidade")
+    data_emprestimo = models.DateTimeField(verbose_name="Data do Empréstimo")
+    data_prazo = models.DateTimeField(verbose_name="Data de Devolução Prevista")
+    data_devolucao_real = models.DateTimeField(verbose_name="Data de Devolução Real")
+    estoque_disponivel = models.PositiveIntegerField(verbose_name="Estoque disponível após o empréstimo")
+
+    objects = EmprestimoArquivadoQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Histórico (ordem por devolução) e filtros de período da exportação
+            models.Index(fields=['data_devolucao_real'], name='arquivo_data_devolucao_idx'),
+            models.Index(fields=['data_emprestimo'], name='arquivo_data_emprestimo_idx'),
+        ]
+
+    def __str__(self):
+        return f"Arquivado: {self.pk} ({self.data_devolucao_real})"
@@ -0,0 +1,441 @@
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from colaboradores.models import Colaborador
+from dashboard.models import EmprestimosPorDia, IndicadoresDashboard
+from equipamentos.models import Equipamento, EstoqueVersao, MovimentoEstoque
+from relatorios.services import reconsolidar
+from .models import Emprestimo, EmprestimoArquivado, EmprestimoAtrasado, VarreduraAtrasos
+from .utils import calculate_deadline
+
+# Dias desde a devolução para um empréstimo ir para o arquivo, quando
+# settings.ARQUIVO_IDADE_DIAS não é definido
+ARQUIVO_IDADE_PADRAO = 180
+# Colunas copiadas de Emprestimo para EmprestimoArquivado
+CAMPOS_ARQUIVO = (
+    'id', 'nome_id', 'equipamento_id', 'quantidade', 'data_emprestimo',
+    'data_prazo', 'data_devolucao_real', 'estoque_disponivel',
+)
+
+
+class EstoqueIndisponivel(Exception):
+    """
+    O estoque do equipamento não comporta a quantidade pedida.
+    """
+
+    def __init__(self, equipamento_id, quantidade, estoque_atual):
+        self.equipamento_id = equipamento_id
+        self.quantidade = quantidade
+        self.estoque_atual = estoque_atual
+        super().__init__(f"Quantidade indisponível. Estoque atual: {estoque_atual}")
+
+
+class LoteInvalido(Exception):
+    """
+    Uma ou mais linhas de um lote não podem ser registradas; nada foi gravado.
+    `erros` traz uma mensagem por problema encontrado.
+    """
+
+    def __init__(self, erros):
+        self.erros = erros
+        super().__init__('; '.join(erros))
+
+
+def retirar_estoque(equipamento_id, quantidade):
+    """
+    Baixa `quantidade` do estoque com um UPDATE condicional
+    (quantidade >= pedida), sem ler e regravar o equipamento.
+    Retorna o estoque restante. Deve rodar dentro de uma transação.
+    """
+    atualizados = Equipamento.objects.filter(
+        pk=equipamento_id, quantidade__gte=quantidade,
+    ).update(quantidade=F('quantidade') - quantidade)
+
+    estoque = Equipamento.objects.values_list('quantidade', flat=True).get(pk=equipamento_id)
+    if not atualizados:
+        raise EstoqueIndisponivel(equipamento_id, quantidade, estoque)
+    EstoqueVersao.incrementar()
+    return estoque
+
+
+def repor_estoque(equipamento_id, quantidade, tipo, emprestimo_pk):
+    """
+    Devolve `quantidade` ao estoque com um UPDATE atômico (F()) e registra
+    a movimentação (`tipo`) no livro. Deve rodar dentro de uma transação.
+    """
+    Equipamento.objects.filter(pk=equipamento_id).update(quantidade=F('quantidade') + quantidade)
+    MovimentoEstoque.objects.create(
+        equipamento_id=equipamento_id, tipo=tipo, quantidade=quantidade, emprestimo_pk=emprestimo_pk,
+    )
+    EstoqueVersao.incrementar()
+
+
+def resolver_atrasos(emprestimo_ids):
+    """
+    Tira da tabela de atrasados os empréstimos `emprestimo_ids` (devolvidos
+    ou excluídos) e desconta-os do contador do dashboard. Deve rodar na
+    transação da devolução, para a lista de atrasados não mostrar o
+    empréstimo até a próxima execução de detectar_atrasados.
+    """
+    removidos, _ = EmprestimoAtrasado.objects.filter(emprestimo_id__in=emprestimo_ids).delete()
+    if removidos:
+        IndicadoresDashboard.ajustar(emprestimos_atrasados=-removidos)
+
+
+def registrar_emprestimo(emprestimo):
+    """
+    Salva um novo empréstimo, baixa o estoque e registra a retirada no livro
+    de movimentações, tudo na mesma transação.
+
+    Se dois empréstimos do mesmo equipamento chegarem ao mesmo tempo, só
+    passam os que couberem no estoque; os demais levantam EstoqueIndisponivel
+    e nada é gravado.
+    """
+    with transaction.atomic():
+        emprestimo.estoque_disponivel = retirar_estoque(emprestimo.equipamento_id, emprestimo.quantidade)
+        if emprestimo.data_prazo is None:
+            emprestimo.data_prazo = calculate_deadline(timezone.now())
+        emprestimo.save()
+        MovimentoEstoque.objects.create(
+            equipamento_id=emprestimo.equipamento_id,
+            tipo=MovimentoEstoque.EMPRESTIMO,
+            quantidade=-emprestimo.quantidade,
+            emprestimo_pk=emprestimo.pk,
+        )
+        IndicadoresDashboard.ajustar(emprestimos_ativos=1)
+        EmprestimosPorDia.ajustar(timezone.localdate(emprestimo.data_emprestimo), 1)
+    return emprestimo
+
+
+def registrar_emprestimos_em_lote(linhas):
+    """
+    Registra vários empréstimos em uma única transação.
+
+    `linhas` é uma lista de (colaborador_id, equipamento_id, quantidade).
+    O estoque de cada equipamento é baixado uma vez só, com o total do lote
+    (UPDATE condicional), e os empréstimos são inseridos com bulk_create.
+    Se algum equipamento não tiver estoque para o total, levanta LoteInvalido
+    e nada é gravado. Retorna os empréstimos criados, na ordem das linhas.
+    """
+    if not linhas:
+        return []
+
+    totais = defaultdict(int)
+    for _, equipamento_id, quantidade in linhas:
+        if quantidade < 1:
+            raise LoteInvalido(["A quantidade mínima para empréstimo é 1."])
+        totais[equipamento_id] += quantidade
+
+    colaborador_ids = {colaborador_id for colaborador_id, _, _ in linhas}
+    encontrados = set(Colaborador.objects.filter(pk__in=colaborador_ids).values_list('pk', flat=True))
+    if encontrados != colaborador_ids:
+        faltando = ', '.join(str(pk) for pk in sorted(colaborador_ids - encontrados))
+        raise LoteInvalido([f"Colaborador(es) não encontrado(s): {faltando}"])
+
+    agora = timezone.now()
+    prazo = calculate_deadline(agora)
+
+    with transaction.atomic():
+        sem_estoque = [
+            equipamento_id for equipamento_id, total in totais.items()
+            if not Equipamento.objects.filter(pk=equipamento_id, quantidade__gte=total).update(
+                quantidade=F('quantidade') - total,
+            )
+        ]
+        estoques = {
+            pk: (nome, quantidade)
+            for pk, nome, quantidade in Equipamento.objects.filter(pk__in=totais).values_list(
+                'pk', 'nome', 'quantidade',
+            )
+        }
+
+        if sem_estoque:
+            erros = []
+            for equipamento_id in sem_estoque:
+                if equipamento_id not in estoques:
+                    erros.append(f"Equipamento {equipamento_id} não encontrado.")
+                else:
+                    nome, estoque = estoques[equipamento_id]
+                    erros.append(
+                        f'Quantidade indisponível de "{nome}": pedido {totais[equipamento_id]}, estoque atual: {estoque}'
+                    )
+            raise LoteInvalido(erros)
+
+        # Estoque restante (snapshot) de cada linha, na ordem do lote
+        restante = {pk: quantidade + totais[pk] for pk, (_, quantidade) in estoques.items()}
+        emprestimos = []
+        for colaborador_id, equipamento_id, quantidade in linhas:
+            restante[equipamento_id] -= quantidade
+            emprestimos.append(Emprestimo(
+                nome_id=colaborador_id,
+                equipamento_id=equipamento_id,
+                quantidade=quantidade,
+                data_prazo=prazo,
+                estoque_disponivel=restante[equipamento_id],
+            ))
+
+        emprestimos = Emprestimo.objects.bulk_create(emprestimos)
+        MovimentoEstoque.objects.bulk_create([
+            MovimentoEstoque(
+                equipamento_id=emprestimo.equipamento_id,
+                tipo=MovimentoEstoque.EMPRESTIMO,
+                quantidade=-emprestimo.quantidade,
+                emprestimo_pk=emprestimo.pk,
+            )
+            for emprestimo in emprestimos
+        ])
+        EstoqueVersao.incrementar()
+        IndicadoresDashboard.ajustar(emprestimos_ativos=len(emprestimos))
+        EmprestimosPorDia.ajustar(timezone.localdate(agora), len(emprestimos))
+    return emprestimos
+
+
+def devolver_emprestimo(emprestimo_id):
+    """
+    Marca o empréstimo como devolvido, repõe o estoque e o tira da lista de
+    atrasados.
+
+    A troca de status é condicional (só se ainda estiver EMPRESTADO), então
+    uma devolução repetida ou simultânea não repõe o estoque duas vezes.
+    Retorna False se o empréstimo já estava devolvido.
+    """
+    with transaction.atomic():
+        devolvidos = Emprestimo.objects.filter(pk=emprestimo_id, status='EMPRESTADO').update(
+            status='DEVOLVIDO',
+            data_devolucao_real=timezone.now(),
+        )
+        if not devolvidos:
+            return False
+
+        equipamento_id, quantidade = Emprestimo.objects.values_list(
+            'equipamento_id', 'quantidade',
+        ).get(pk=emprestimo_id)
+        repor_estoque(equipamento_id, quantidade, MovimentoEstoque.DEVOLUCAO, emprestimo_id)
+        IndicadoresDashboard.ajustar(emprestimos_ativos=-1)
+        resolver_atrasos([emprestimo_id])
+    return True
+
+
+# Resultados por empréstimo de devolver_emprestimos_em_lote
+DEVOLVIDO = 'DEVOLVIDO'
+JA_DEVOLVIDO = 'JA_DEVOLVIDO'
+NAO_ENCONTRADO = 'NAO_ENCONTRADO'
+
+
+def devolver_emprestimos_em_lote(emprestimo_ids):
+    """
+    Devolve vários empréstimos em uma transação.
+
+    Trava os empréstimos pedidos (select_for_update), separa os ainda
+    ativos e marca exatamente esse conjunto como DEVOLVIDO com um único
+    UPDATE: uma devolução simultânea do mesmo empréstimo espera a trava e
+    depois não o encontra mais ativo, então o estoque não volta duas vezes.
+    O estoque volta com um UPDATE (F()) por equipamento, somando as
+    quantidades; o livro de movimentações recebe uma linha por empréstimo
+    (bulk_create). Retorna {pk: resultado}, com resultado DEVOLVIDO,
+    JA_DEVOLVIDO ou NAO_ENCONTRADO.
+    """
+    emprestimo_ids = set(emprestimo_ids)
+    resultados = dict.fromkeys(emprestimo_ids, NAO_ENCONTRADO)
+    if not emprestimo_ids:
+        return resultados
+
+    with transaction.atomic():
+        movimentos = []
+        devolucao_por_equipamento = defaultdict(int)
+        for pk, equipamento_id, quantidade, status in (
+            Emprestimo.objects.select_for_update()
+            .filter(pk__in=emprestimo_ids)
+            .values_list('pk', 'equipamento_id', 'quantidade', 'status')
+        ):
+            if status != 'EMPRESTADO':
+                resultados[pk] = JA_DEVOLVIDO
+                continue
+            resultados[pk] = DEVOLVIDO
+            movimentos.append(MovimentoEstoque(
+                equipamento_id=equipamento_id,
+                tipo=MovimentoEstoque.DEVOLUCAO,
+                quantidade=quantidade,
+                emprestimo_pk=pk,
+            ))
+            devolucao_por_equipamento[equipamento_id] += quantidade
+
+        if movimentos:
+            devolvidos = [movimento.emprestimo_pk for movimento in movimentos]
+            Emprestimo.objects.filter(pk__in=devolvidos).update(
+                status='DEVOLVIDO',
+                data_devolucao_real=timezone.now(),
+            )
+            for equipamento_id, quantidade in devolucao_por_equipamento.items():
+                Equipamento.objects.filter(pk=equipamento_id).update(quantidade=F('quantidade') + quantidade)
+            MovimentoEstoque.objects.bulk_create(movimentos)
+            EstoqueVersao.incrementar()
+            IndicadoresDashboard.ajustar(emprestimos_ativos=-len(movimentos))
+            resolver_atrasos(devolvidos)
+    return resultados
+
+
+def editar_emprestimo(emprestimo_id, colaborador_id, equipamento_id, quantidade):
+    """
+    Altera colaborador, equipamento e quantidade de um empréstimo mantendo
+    o estoque coerente, em uma transação.
+
+    Se o empréstimo está ativo, só a diferença é aplicada: as unidades antigas
+    voltam ao equipamento antigo e as novas saem do novo, com UPDATEs
+    condicionais (F()) na ordem dos pks, e cada variação vai para o livro de
+    movimentações. O snapshot estoque_disponivel é regravado com o estoque
+    restante do equipamento. Levanta EstoqueIndisponivel se não couber.
+    Em empréstimos devolvidos, só o colaborador muda. As consolidações
+    diárias já fechadas dos dias do empréstimo são refeitas.
+    """
+    with transaction.atomic():
+        status, equipamento_anterior, quantidade_anterior, data_emprestimo, data_devolucao = (
+            Emprestimo.objects.select_for_update()
+            .values_list('status', 'equipamento_id', 'quantidade', 'data_emprestimo', 'data_devolucao_real')
+            .get(pk=emprestimo_id)
+        )
+        campos = {'nome_id': colaborador_id}
+
+        if status == 'EMPRESTADO':
+            variacoes = defaultdict(int)
+            variacoes[equipamento_anterior] += quantidade_anterior
+            variacoes[equipamento_id] -= quantidade
+
+            movimentos = []
+            for pk, variacao in sorted(variacoes.items()):
+                if variacao < 0:
+                    if not Equipamento.objects.filter(pk=pk, quantidade__gte=-variacao).update(
+                        quantidade=F('quantidade') + variacao,
+                    ):
+                        estoque = Equipamento.objects.values_list('quantidade', flat=True).get(pk=pk)
+                        raise EstoqueIndisponivel(pk, -variacao, estoque)
+                elif variacao > 0:
+                    Equipamento.objects.filter(pk=pk).update(quantidade=F('quantidade') + variacao)
+                else:
+                    continue
+                movimentos.append(MovimentoEstoque(
+                    equipamento_id=pk,
+                    tipo=MovimentoEstoque.DEVOLUCAO if variacao > 0 else MovimentoEstoque.EMPRESTIMO,
+                    quantidade=variacao,
+                    emprestimo_pk=emprestimo_id,
+                ))
+
+            if movimentos:
+                MovimentoEstoque.objects.bulk_create(movimentos)
+                EstoqueVersao.incrementar()
+                campos.update(
+                    equipamento_id=equipamento_id,
+                    quantidade=quantidade,
+                    estoque_disponivel=Equipamento.objects.values_list('quantidade', flat=True).get(pk=equipamento_id),
+                )
+
+        Emprestimo.objects.filter(pk=emprestimo_id).update(**campos)
+        reconsolidar(data_emprestimo, data_devolucao)
+
+
+def excluir_emprestimo(emprestimo_id):
+    """
+    Exclui o empréstimo; se ele ainda estava ativo, repõe o estoque
+    na mesma transação. Os indicadores do dashboard e as consolidações
+    diárias já fechadas são ajustados juntos.
+    """
+    with transaction.atomic():
+        # Fecha o empréstimo com o mesmo UPDATE condicional da devolução: só
+        # repõe o estoque quem trocou o status, então uma devolução
+        # simultânea não repõe as mesmas unidades duas vezes
+        ativo = Emprestimo.objects.filter(pk=emprestimo_id, status='EMPRESTADO').update(status='DEVOLVIDO')
+        emprestimo = (
+            Emprestimo.objects
+            .filter(pk=emprestimo_id)
+            .values('equipamento_id', 'quantidade', 'data_emprestimo', 'data_devolucao_real')
+            .first()
+        )
+        if emprestimo is None:
+            return
+        resolver_atrasos([emprestimo_id])
+        Emprestimo.objects.filter(pk=emprestimo_id).delete()
+        EmprestimosPorDia.ajustar(timezone.localdate(emprestimo['data_emprestimo']), -1)
+        reconsolidar(emprestimo['data_emprestimo'], emprestimo['data_devolucao_real'])
+        if ativo:
+            repor_estoque(
+                emprestimo['equipamento_id'], emprestimo['quantidade'], MovimentoEstoque.EXCLUSAO, emprestimo_id,
+            )
+            IndicadoresDashboard.ajustar(emprestimos_ativos=-1)
+
+
+def detectar_atrasados(agora=None, completo=False, chunk_size=2000):
+    """
+    Atualiza a tabela de atrasados (EmprestimoAtrasado) de forma incremental.
+
+    Lê só os empréstimos ativos com prazo entre a marca d'água da última
+    execução e `agora` (índice parcial de data_prazo), insere-os em lotes e
+    remove da tabela os que já foram devolvidos (custo proporcional ao
+    número de atrasados, não ao tamanho de Emprestimo). `completo=True` ignora a
+    marca d'água (ex.: depois de importar empréstimos com prazo no passado).
+    Retorna (novos, resolvidos).
+    """
+    agora = agora or timezone.now()
+
+    with transaction.atomic():
+        varredura, _ = VarreduraAtrasos.objects.get_or_create(pk=1)
+        vencidos = Emprestimo.objects.filter(
+            status='EMPRESTADO', data_prazo__lte=agora, atraso__isnull=True,
+        )
+        if varredura.ultimo_prazo and not completo:
+            vencidos = vencidos.filter(data_prazo__gt=varredura.ultimo_prazo)
+
+        novos = 0
+        lote = []
+        for pk, data_prazo in vencidos.values_list('pk', 'data_prazo').iterator(chunk_size=chunk_size):
+            lote.append(EmprestimoAtrasado(emprestimo_id=pk, data_prazo=data_prazo))
+            if len(lote) >= chunk_size:
+                novos += len(EmprestimoAtrasado.objects.bulk_create(lote, ignore_conflicts=True))
+                lote = []
+        if lote:
+            novos += len(EmprestimoAtrasado.objects.bulk_create(lote, ignore_conflicts=True))
+
+        resolvidos, _ = EmprestimoAtrasado.objects.exclude(emprestimo__status='EMPRESTADO').delete()
+
+        varredura.ultimo_prazo = agora
+        varredura.executado_em = timezone.now()
+        varredura.save(update_fields=['ultimo_prazo', 'executado_em'])
+        IndicadoresDashboard.definir(emprestimos_atrasados=EmprestimoAtrasado.objects.count())
+    return novos, resolvidos
+
+
+def arquivar_devolvidos(idade_dias=None, agora=None, chunk_size=2000):
+    """
+    Move para EmprestimoArquivado os empréstimos devolvidos há mais de
+    `idade_dias` dias (padrão: settings.ARQUIVO_IDADE_DIAS), dos mais
+    antigos para os mais novos. Cada lote de `chunk_size` é uma transação
+    curta que copia as linhas (bulk_create, mesmo pk) e as apaga de
+    Emprestimo: uma interrupção não deixa empréstimo nas duas tabelas nem
+    em nenhuma, e o banco não fica travado durante o arquivamento inteiro.
+    Retorna o número de empréstimos arquivados.
+    """
+    if idade_dias is None:
+        idade_dias = getattr(settings, 'ARQUIVO_IDADE_DIAS', ARQUIVO_IDADE_PADRAO)
+    limite = (agora or timezone.now()) - timedelta(days=idade_dias)
+    antigos = (
+        Emprestimo.objects
+        .filter(status='DEVOLVIDO', data_devolucao_real__lt=limite)
+        .order_by('data_devolucao_real', 'pk')
+    )
+
+    arquivados = 0
+    while True:
+        with transaction.atomic():
+            lote = list(antigos.values_list(*CAMPOS_ARQUIVO)[:chunk_size])
+            if not lote:
+                break
+            EmprestimoArquivado.objects.bulk_create(
+                [EmprestimoArquivado(**dict(zip(CAMPOS_ARQUIVO, linha))) for linha in lote]
+            )
+            Emprestimo.objects.filter(pk__in=[linha[0] for linha in lote]).delete()
+        arquivados += len(lote)
+    return arquivados
@@ -1,17 +1,72 @@
-from datetime import timedelta
+import heapq
 
-def calculate_deadline(start_date):
+from django.utils import timezone
+
+# Prazo de devolução: motor único de dias úteis (fins de semana e feriados)
+from core.utils import calculate_deadline, calculate_deadlines  # noqa: F401
+
+
+# Colunas usadas pelas listagens de empréstimos (lista, histórico e CSV).
+# Os nomes de colaborador e equipamento vêm pelo JOIN, sem consultas extras.
+EMPRESTIMO_ROW_FIELDS = (
+    'pk',
+    'nome__nome',
+    'equipamento__nome',
+    'quantidade',
+    'data_emprestimo',
+    'data_prazo',
+    'data_devolucao_real',
+    'estoque_disponivel',
+    'status',
+)
+
+
+def format_datetime(value, empty=''):
+    """
+    Converte para o fuso local e formata como dd/mm/aaaa HH:MM.
+    """
+    if value is None:
+        return empty
+    return timezone.localtime(value).strftime('%d/%m/%Y %H:%M')
+
+
+def emprestimo_rows(queryset, fields=EMPRESTIMO_ROW_FIELDS, chunk_size=None):
+    """
+    Gera as linhas de uma listagem de empréstimos como dicionários.
+
+    Busca apenas as colunas pedidas em uma única consulta (com JOIN em
+    colaborador e equipamento), independente do número de linhas.
+    Quando 'status' está entre os campos, adiciona 'status_display'.
+    Com `chunk_size`, lê o resultado em lotes (.iterator) sem carregar
+    tudo em memória.
+    """
+    status_labels = dict(queryset.model.STATUS_CHOICES)
+    rows = queryset.values(*fields)
+    if chunk_size:
+        rows = rows.iterator(chunk_size=chunk_size)
+
+    for row in rows:
+        if 'status' in row:
+            row['status_display'] = status_labels.get(row['status'], row['status'])
+        yield row
+
+
+def emprestimo_rows_ordenadas(querysets, ordering, fields=EMPRESTIMO_ROW_FIELDS, chunk_size=None):
     """
-    Calcula a data de devolução a partir da data de início.
-    Prazo: 3 dias úteis (pula sábados e domingos).
+    Linhas de vários querysets (ex.: Emprestimo e EmprestimoArquivado) como
+    uma única sequência ordenada por `ordering` e pk. Cada queryset é lido
+    já ordenado pelo banco (em lotes, com `chunk_size`) e as sequências são
+    intercaladas sem carregar nenhuma em memória.
     """
-    days_added = 0
-    current_date = start_date
-    
-    while days_added < 3:
-        current_date += timedelta(days=1)
-        # 5 = Saturday, 6 = Sunday
-        if current_date.weekday() < 5:
-            days_added += 1
-    
-    return current_date
+    descending = ordering.startswith('-')
+    field_name = ordering.lstrip('-')
+    prefix = '-' if descending else ''
+    if 'pk' not in fields:
+        fields = ('pk', *fields)
+    if field_name not in fields:
+        fields = (*fields, field_name)
+    streams = [
+        emprestimo_rows(qs.order_by(ordering, f'{prefix}pk'), fields, chunk_size)
+        for qs in querysets
+    ]
+    return heapq.merge(*streams, key=lambda row: (row[field_name], row['pk']), reverse=descending)
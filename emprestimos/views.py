@@ -1,36 +1,48 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.utils import timezone
-from .models import Emprestimo
-from equipamentos.models import Equipamento
-from .forms import EmprestimoForm
-from .utils import calculate_deadline
-import json
+from django.views.decorators.http import require_POST
+from .models import Emprestimo, EmprestimoAtrasado
+from .forms import EmprestimoForm, EmprestimoLoteForm
+from .services import (
+    DEVOLVIDO,
+    EstoqueIndisponivel,
+    LoteInvalido,
+    devolver_emprestimo,
+    devolver_emprestimos_em_lote,
+    editar_emprestimo,
+    excluir_emprestimo,
+    registrar_emprestimo,
+    registrar_emprestimos_em_lote,
+)
+from .utils import emprestimo_rows, format_datetime
+from core.pagination import paginate_keyset
+from core.routers import leitura_em_replica
 
 @login_required
+@leitura_em_replica
 def app_requests(request):
     """
     READ (List): Mostra todos os empréstimos ATIVOS (não devolvidos).
     """
-    emprestimos = Emprestimo.objects.filter(status='EMPRESTADO').order_by('-data_emprestimo')
+    fields = ('pk', 'nome__nome', 'equipamento__nome', 'quantidade', 'data_emprestimo', 'data_prazo', 'status')
+    page = paginate_keyset(
+        request, Emprestimo.objects.filter(status='EMPRESTADO'), '-data_emprestimo',
+        lambda qs: emprestimo_rows(qs, fields),
+    )
     
     object_data = []
-    for emp in emprestimos:
-        # Converter para timezone local antes de formatar
-        data_emprestimo_local = timezone.localtime(emp.data_emprestimo)
-        data_prazo_local = timezone.localtime(emp.data_prazo)
-        
+    for emp in page:
         object_data.append({
-            'pk': emp.pk,
-            'status': emp.status,
+            'pk': emp['pk'],
+            'status': emp['status'],
             'fields': [
-                emp.nome.nome, 
-                emp.equipamento.nome, 
-                emp.quantidade,
-                data_emprestimo_local.strftime('%d/%m/%Y %H:%M'),
-                data_prazo_local.strftime('%d/%m/%Y %H:%M'),
-                emp.get_status_display(), # Status
+                emp['nome__nome'], 
+                emp['equipamento__nome'], 
+                emp['quantidade'],
+                format_datetime(emp['data_emprestimo']),
+                format_datetime(emp['data_prazo']),
+                emp['status_display'], # Status
             ]
         })
 
@@ -38,13 +50,55 @@ def app_requests(request):
         'page_title': 'Empréstimos',
         'headers': ['Colaborador', 'Equipamento', 'Quantidade', 'Data Empréstimo', 'Prazo Devolução', 'Status'],
         'object_data': object_data,
+        'page': page,
         'add_url_name': 'emprestimos:app_requests_create',
+        'batch_url_name': 'emprestimos:app_requests_batch',
         'edit_url_name': 'emprestimos:app_requests_edit',   
         'delete_url_name': 'emprestimos:app_requests_delete',
         'return_url_name': 'emprestimos:app_requests_return',
+        'return_batch_url_name': 'emprestimos:app_requests_return_batch',
+        'overdue_url_name': 'emprestimos:app_requests_overdue',
     }
     return render(request, 'app_ui_requests.html', context)
 
+@login_required
+@leitura_em_replica
+def app_requests_overdue(request):
+    """
+    READ (List): Empréstimos atrasados, lidos da tabela mantida pelo comando
+    detectar_atrasados (não varre a tabela de empréstimos).
+    """
+    fields = (
+        'pk', 'data_prazo', 'emprestimo__nome__nome', 'emprestimo__equipamento__nome',
+        'emprestimo__quantidade', 'emprestimo__data_emprestimo',
+    )
+    page = paginate_keyset(
+        request, EmprestimoAtrasado.objects.all(), 'data_prazo',
+        lambda qs: qs.values(*fields),
+    )
+
+    object_data = []
+    for atraso in page:
+        object_data.append({
+            'pk': atraso['pk'],
+            'fields': [
+                atraso['emprestimo__nome__nome'],
+                atraso['emprestimo__equipamento__nome'],
+                atraso['emprestimo__quantidade'],
+                format_datetime(atraso['emprestimo__data_emprestimo']),
+                format_datetime(atraso['data_prazo']),
+            ]
+        })
+
+    context = {
+        'page_title': 'Empréstimos Atrasados',
+        'headers': ['Colaborador', 'Equipamento', 'Quantidade', 'Data Empréstimo', 'Prazo Devolução'],
+        'object_data': object_data,
+        'page': page,
+        'return_url_name': 'emprestimos:app_requests_return',
+    }
+    return render(request, 'app_ui_overdue.html', context)
+
 @login_required
 def app_requests_create(request):
     if request.method == 'POST':
@@ -52,34 +106,55 @@ def app_requests_create(request):
         if form.is_valid():
             emprestimo = form.save(commit=False)
             
-            # Calcular data de prazo
-            emprestimo.data_prazo = calculate_deadline(timezone.now())
-            
-            # Salvar empréstimo
-            emprestimo.save()
-            
-            # Atualizar estoque do equipamento
-            equipamento = emprestimo.equipamento
-            equipamento.quantidade -= emprestimo.quantidade
-            equipamento.save()
-            
-            messages.success(request, f'Empréstimo para "{emprestimo.nome.nome}" cadastrado com sucesso!')
-            return redirect('emprestimos:app_requests')
+            try:
+                # Salvar empréstimo, calcular prazo e baixar estoque (transação única)
+                registrar_emprestimo(emprestimo)
+            except EstoqueIndisponivel as e:
+                form.add_error(None, str(e))
+                messages.error(request, 'Falha no cadastro. Verifique os erros abaixo.')
+            else:
+                messages.success(request, f'Empréstimo para "{emprestimo.nome.nome}" cadastrado com sucesso!')
+                return redirect('emprestimos:app_requests')
         else:
             messages.error(request, 'Falha no cadastro. Verifique os erros abaixo.')
     else:
         form = EmprestimoForm()
     
-    # Preparar dados para o JS (Estoque dinâmico)
-    equipamentos_data = {eq.id: eq.quantidade for eq in Equipamento.objects.all()}
-    
+    # O estoque dinâmico é buscado pelo JS em equipamentos:app_items_stock
     context = {
         'form': form,
         'page_title': 'Cadastrar Novo Empréstimo',
-        'equipamentos_json': json.dumps(equipamentos_data),
     }
     return render(request, 'app_ui_requests_create.html', context)
 
+@login_required
+def app_requests_batch(request):
+    """
+    CREATE (lote): Empresta o mesmo kit a vários colaboradores em uma transação.
+    """
+    if request.method == 'POST':
+        form = EmprestimoLoteForm(request.POST)
+        if form.is_valid():
+            try:
+                emprestimos = registrar_emprestimos_em_lote(form.linhas())
+            except LoteInvalido as e:
+                for erro in e.erros:
+                    form.add_error(None, erro)
+                messages.error(request, 'Falha no cadastro do lote. Nenhum empréstimo foi registrado.')
+            else:
+                messages.success(request, f'{len(emprestimos)} empréstimos cadastrados com sucesso!')
+                return redirect('emprestimos:app_requests')
+        else:
+            messages.error(request, 'Falha no cadastro. Verifique os erros abaixo.')
+    else:
+        form = EmprestimoLoteForm()
+
+    context = {
+        'form': form,
+        'page_title': 'Empréstimo em Lote',
+    }
+    return render(request, 'app_ui_form_base.html', context)
+
 @login_required
 def app_requests_edit(request, pk):
     """
@@ -90,9 +165,16 @@ def app_requests_edit(request, pk):
     if request.method == 'POST':
         form = EmprestimoForm(request.POST, instance=emprestimo)
         if form.is_valid():
-            form.save()
-            messages.success(request, f'Empréstimo atualizado com sucesso!')
-            return redirect('emprestimos:app_requests')
+            cd = form.cleaned_data
+            try:
+                # Aplicar só a diferença no estoque dos equipamentos (transação única)
+                editar_emprestimo(emprestimo.pk, cd['nome'].pk, cd['equipamento'].pk, cd['quantidade'])
+            except EstoqueIndisponivel as e:
+                form.add_error(None, str(e))
+                messages.error(request, 'Falha ao atualizar. Verifique os erros abaixo.')
+            else:
+                messages.success(request, f'Empréstimo atualizado com sucesso!')
+                return redirect('emprestimos:app_requests')
         else:
             messages.error(request, 'Falha ao atualizar. Verifique os erros abaixo.')
     else:
@@ -113,12 +195,7 @@ def app_requests_delete(request, pk):
 
     if request.method == 'POST':
         # Se o empréstimo ainda está ativo (não foi devolvido), restaurar o estoque
-        if emprestimo.status == 'EMPRESTADO':
-            equipamento = emprestimo.equipamento
-            equipamento.quantidade += emprestimo.quantidade
-            equipamento.save()
-        
-        emprestimo.delete()
+        excluir_emprestimo(emprestimo.pk)
         messages.success(request, 'Empréstimo excluído com sucesso!')
         return redirect('emprestimos:app_requests')
 
@@ -135,17 +212,8 @@ def app_requests_return(request, pk):
     emprestimo = get_object_or_404(Emprestimo, pk=pk)
     
     if request.method == 'POST':
-        if emprestimo.status == 'EMPRESTADO':
-            # Atualizar status e data
-            emprestimo.status = 'DEVOLVIDO'
-            emprestimo.data_devolucao_real = timezone.now()
-            emprestimo.save()
-            
-            # Devolver ao estoque
-            equipamento = emprestimo.equipamento
-            equipamento.quantidade += emprestimo.quantidade
-            equipamento.save()
-            
+        # Atualizar status e data e devolver ao estoque (transação única)
+        if devolver_emprestimo(emprestimo.pk):
             messages.success(request, f'Empréstimo devolvido com sucesso! Estoque atualizado.')
         else:
             messages.warning(request, 'Este empréstimo já foi devolvido.')
@@ -158,3 +226,24 @@ def app_requests_return(request, pk):
         'page_title': 'Confirmar Devolução'
     }
     return render(request, 'app_ui_return_confirm.html', context)
+
+@login_required
+@require_POST
+def app_requests_return_batch(request):
+    """
+    ACTION (lote): Devolve os empréstimos marcados na lista de ativos.
+    """
+    pks = [int(pk) for pk in request.POST.getlist('pks') if pk.isdigit()]
+    if not pks:
+        messages.warning(request, 'Selecione ao menos um empréstimo para devolver.')
+        return redirect('emprestimos:app_requests')
+
+    resultados = devolver_emprestimos_em_lote(pks)
+    devolvidos = sum(1 for resultado in resultados.values() if resultado == DEVOLVIDO)
+    ignorados = len(resultados) - devolvidos
+
+    if devolvidos:
+        messages.success(request, f'{devolvidos} empréstimo(s) devolvido(s) com sucesso! Estoque atualizado.')
+    if ignorados:
+        messages.warning(request, f'{ignorados} empréstimo(s) já devolvido(s) ou não encontrado(s).')
+    return redirect('emprestimos:app_requests')
@@ -16,6 +16,15 @@ class EquipamentoForm(forms.ModelForm):
             'quantidade': 'Quantidade em Estoque',
         }
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if self.instance.pk:
+            # Estoque mostrado ao abrir a edição: o salvamento aplica só a
+            # diferença sobre ele, sem desfazer empréstimos feitos depois
+            self.fields['quantidade_exibida'] = forms.IntegerField(
+                widget=forms.HiddenInput, initial=self.instance.quantidade,
+            )
+
     def clean_quantidade(self):
         quantidade = self.cleaned_data.get('quantidade')
         if quantidade is None or quantidade < 1:
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from equipamentos.services import criar_checkpoints
+
+
+class Command(BaseCommand):
+    help = (
+        "Grava pontos de controle (SaldoEstoque) do livro de movimentações, "
+        "para que o estoque em qualquer data seja lido de um saldo mais uma cauda curta."
+    )
+
+    def handle(self, *args, **options):
+        criados = criar_checkpoints()
+        self.stdout.write(self.style.SUCCESS(f"{criados} ponto(s) de controle criado(s)."))
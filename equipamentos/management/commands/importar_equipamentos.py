@@ -0,0 +1,44 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.importacao import IMPORTACAO_CHUNK_SIZE, ArquivoInvalido
+from equipamentos.services import importar_equipamentos
+
+
+class Command(BaseCommand):
+    help = (
+        "Importa uma entrega de equipamentos de um CSV (colunas nome, marca, quantidade): "
+        "soma ao estoque dos existentes (mesmo nome + marca) e cria os novos."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('arquivo', help="Caminho do arquivo CSV.")
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=IMPORTACAO_CHUNK_SIZE,
+            help=f"Linhas por bloco de gravação (padrão: {IMPORTACAO_CHUNK_SIZE}).",
+        )
+
+    def handle(self, *args, **options):
+        if options['chunk_size'] < 1:
+            raise CommandError("--chunk-size deve ser maior que zero.")
+
+        inicio = time.perf_counter()
+        try:
+            with open(options['arquivo'], 'rb') as arquivo:
+                resultado = importar_equipamentos(arquivo, chunk_size=options['chunk_size'])
+        except (OSError, ArquivoInvalido) as e:
+            raise CommandError(str(e))
+        duracao = time.perf_counter() - inicio
+
+        if resultado.erros:
+            for linha, mensagem in resultado.erros:
+                self.stdout.write(f"Linha {linha}: {mensagem}")
+            raise CommandError(f"{len(resultado.erros)} linha(s) com erro; nenhum equipamento foi alterado.")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{resultado.criados} equipamento(s) novo(s), {resultado.atualizados} com estoque atualizado "
+            f"({resultado.importados} linha(s), {duracao:.1f} s)."
+        ))
@@ -0,0 +1,56 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from equipamentos.services import reconciliar_estoque
+
+
+class Command(BaseCommand):
+    help = (
+        "Confere Equipamento.quantidade contra o estoque esperado (AJUSTEs do livro "
+        "menos os empréstimos ativos) e lista as divergências (use --corrigir para "
+        "gravar o esperado)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--corrigir',
+            action='store_true',
+            help="Grava o estoque esperado nos equipamentos divergentes.",
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=1000,
+            help="Equipamentos lidos por consulta (padrão: 1000).",
+        )
+
+    def handle(self, *args, **options):
+        if options['chunk_size'] < 1:
+            raise CommandError("--chunk-size deve ser maior que zero.")
+
+        inicio = time.perf_counter()
+        divergencias = 0
+        nao_corrigiveis = 0
+        for pk, nome, quantidade, esperado in reconciliar_estoque(
+            chunk_size=options['chunk_size'], corrigir=options['corrigir'],
+        ):
+            divergencias += 1
+            linha = f"{pk} {nome}: estoque {quantidade}, esperado {esperado} ({esperado - quantidade:+d})"
+            if esperado < 0:
+                nao_corrigiveis += 1
+                linha += " - não corrigível: há mais unidades emprestadas do que no livro"
+            self.stdout.write(linha)
+        duracao = time.perf_counter() - inicio
+
+        if not divergencias:
+            self.stdout.write(self.style.SUCCESS(f"Estoque consistente ({duracao:.1f} s)."))
+        elif options['corrigir']:
+            self.stdout.write(self.style.WARNING(
+                f"{divergencias - nao_corrigiveis} divergência(s) corrigida(s), "
+                f"{nao_corrigiveis} não corrigível(is) ({duracao:.1f} s)."
+            ))
+        else:
+            self.stdout.write(self.style.WARNING(
+                f"{divergencias} divergência(s) encontrada(s) ({duracao:.1f} s). Use --corrigir para ajustar."
+            ))
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.6 on 2026-10-18 09:20
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('equipamentos', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='equipamento',
+            name='quantidade',
+            field=models.PositiveIntegerField(default=1, validators=[django.core.validators.MinValueValidator(1, message='A quantidade deve ser maior que 0.')]),
+        ),
+        migrations.AddIndex(
+            model_name='equipamento',
+            index=models.Index(fields=['nome'], name='equipamento_nome_idx'),
+        ),
+    ]
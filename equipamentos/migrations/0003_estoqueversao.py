@@ -0,0 +1,22 @@
+# Generated by Django 5.2.6 on 2026-10-18 09:23
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('equipamentos', '0002_indices_listagens'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EstoqueVersao',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('versao', models.PositiveBigIntegerField(default=0)),
+                ('atualizado_em', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+    ]
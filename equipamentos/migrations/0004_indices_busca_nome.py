@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-18 09:24
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('equipamentos', '0003_estoqueversao'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='equipamento',
+            index=models.Index(django.db.models.functions.text.Lower('nome'), name='equipamento_nome_lower_idx'),
+        ),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 5.2.6 on 2026-10-18 09:42
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def saldo_inicial(apps, schema_editor):
+    """
+    Estoque atual de cada equipamento vira o ponto de controle inicial
+    (anterior a qualquer movimentação do livro).
+    """
+    Equipamento = apps.get_model('equipamentos', 'Equipamento')
+    SaldoEstoque = apps.get_model('equipamentos', 'SaldoEstoque')
+    SaldoEstoque.objects.bulk_create(
+        SaldoEstoque(equipamento_id=pk, quantidade=quantidade, movimento_id=0)
+        for pk, quantidade in Equipamento.objects.values_list('pk', 'quantidade')
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('equipamentos', '0004_indices_busca_nome'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MovimentoEstoque',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(choices=[('EMPRESTIMO', 'Empréstimo'), ('DEVOLUCAO', 'Devolução'), ('AJUSTE', 'Ajuste'), ('EXCLUSAO', 'Exclusão de empréstimo')], max_length=20)),
+                ('quantidade', models.IntegerField(help_text='Variação do estoque (negativa na retirada)')),
+                ('emprestimo_pk', models.BigIntegerField(blank=True, null=True)),
+                ('criado_em', models.DateTimeField(default=django.utils.timezone.now)),
+                ('equipamento', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='movimentos', to='equipamentos.equipamento')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='SaldoEstoque',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantidade', models.IntegerField()),
+                ('movimento_id', models.BigIntegerField(default=0)),
+                ('criado_em', models.DateTimeField(default=django.utils.timezone.now)),
+                ('equipamento', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='saldos', to='equipamentos.equipamento')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['equipamento', 'criado_em'], name='saldo_equipamento_data_idx')],
+            },
+        ),
+        migrations.RunPython(saldo_inicial, migrations.RunPython.noop),
+    ]
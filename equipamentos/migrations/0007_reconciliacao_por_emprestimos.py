@@ -0,0 +1,67 @@
+# Generated by Django 5.2.6 on 2026-10-18 10:54
+
+from django.db import migrations, models
+from django.db.models import Max, Sum
+
+
+def abertura_do_livro(apps, schema_editor):
+    """
+    A reconciliação passa a esperar estoque = AJUSTEs do livro - unidades
+    em empréstimos ativos. Equipamentos anteriores ao livro (ponto de
+    controle inicial, sem AJUSTE) recebem um AJUSTE de abertura com o que
+    falta (estoque + emprestado - AJUSTEs já lançados), seguido de um novo
+    ponto de controle com o estoque atual, para o AJUSTE não somar de novo
+    no saldo.
+    """
+    Equipamento = apps.get_model('equipamentos', 'Equipamento')
+    MovimentoEstoque = apps.get_model('equipamentos', 'MovimentoEstoque')
+    SaldoEstoque = apps.get_model('equipamentos', 'SaldoEstoque')
+    Emprestimo = apps.get_model('emprestimos', 'Emprestimo')
+
+    ajustes = dict(
+        MovimentoEstoque.objects.filter(tipo='AJUSTE').values('equipamento_id')
+        .annotate(total=Sum('quantidade')).values_list('equipamento_id', 'total').order_by()
+    )
+    emprestadas = dict(
+        Emprestimo.objects.filter(status='EMPRESTADO').values('equipamento_id')
+        .annotate(total=Sum('quantidade')).values_list('equipamento_id', 'total').order_by()
+    )
+    estoques = dict(Equipamento.objects.values_list('pk', 'quantidade'))
+    aberturas = {
+        pk: quantidade + emprestadas.get(pk, 0) - ajustes.get(pk, 0)
+        for pk, quantidade in estoques.items()
+    }
+    aberturas = {pk: abertura for pk, abertura in aberturas.items() if abertura}
+    if not aberturas:
+        return
+
+    MovimentoEstoque.objects.bulk_create(
+        MovimentoEstoque(equipamento_id=pk, tipo='AJUSTE', quantidade=abertura)
+        for pk, abertura in aberturas.items()
+    )
+    ultimo = MovimentoEstoque.objects.aggregate(ultimo=Max('pk'))['ultimo']
+    SaldoEstoque.objects.bulk_create(
+        SaldoEstoque(equipamento_id=pk, quantidade=estoques[pk], movimento_id=ultimo)
+        for pk in aberturas
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('emprestimos', '0005_emprestimos_arquivados'),
+        ('equipamentos', '0005_livro_estoque'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='movimentoestoque',
+            name='tipo',
+            field=models.CharField(choices=[('EMPRESTIMO', 'Empréstimo'), ('DEVOLUCAO', 'Devolução'), ('AJUSTE', 'Ajuste'), ('EXCLUSAO', 'Exclusão de empréstimo'), ('RECONCILIACAO', 'Correção da reconciliação')], max_length=20),
+        ),
+        migrations.AddIndex(
+            model_name='movimentoestoque',
+            index=models.Index(fields=['equipamento', 'tipo'], name='movimento_equip_tipo_idx'),
+        ),
+        migrations.RunPython(abertura_do_livro, migrations.RunPython.noop),
+    ]
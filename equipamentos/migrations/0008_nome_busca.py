@@ -0,0 +1,38 @@
+# Generated by Django 5.2.6 on 2026-10-18 11:24
+
+from django.db import migrations, models
+
+from core.search import normalizar_busca
+
+
+def preencher_nome_busca(apps, schema_editor):
+    """Preenche a coluna de busca dos registros já existentes."""
+    Equipamento = apps.get_model('equipamentos', 'Equipamento')
+    objetos = list(Equipamento.objects.only('pk', 'nome'))
+    for obj in objetos:
+        obj.nome_busca = normalizar_busca(obj.nome)
+    Equipamento.objects.bulk_update(objetos, ['nome_busca'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('equipamentos', '0007_reconciliacao_por_emprestimos'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='equipamento',
+            name='equipamento_nome_lower_idx',
+        ),
+        migrations.AddField(
+            model_name='equipamento',
+            name='nome_busca',
+            field=models.CharField(db_collation='NOCASE', default='', editable=False, max_length=255),
+        ),
+        migrations.RunPython(preencher_nome_busca, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='equipamento',
+            index=models.Index(fields=['nome_busca'], name='equipamento_nome_busca_idx'),
+        ),
+    ]
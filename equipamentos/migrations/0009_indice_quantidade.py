@@ -0,0 +1,17 @@
+# Generated by Django 5.2.6 on 2026-10-18 11:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('equipamentos', '0008_nome_busca'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='equipamento',
+            index=models.Index(fields=['quantidade'], name='equipamento_quantidade_idx'),
+        ),
+    ]
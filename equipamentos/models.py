@@ -1,5 +1,8 @@
 from django.db import models
+from django.db.models import F
+from django.utils import timezone
 from django.core.validators import MinValueValidator
+from core.search import NomeBuscaQuerySet, normalizar_busca
 
 class Equipamento(models.Model):
     nome = models.CharField(max_length=255)
@@ -8,6 +11,110 @@ class Equipamento(models.Model):
         default=1,
         validators=[MinValueValidator(1, message='A quantidade deve ser maior que 0.')]
     )
+    # Nome sem acentos e em casefold, para a busca por prefixo (preenchido no save)
+    # NOCASE: o LIKE do SQLite só usa o índice em colunas com essa collation
+    nome_busca = models.CharField(max_length=255, editable=False, default='', db_collation='NOCASE')
+
+    objects = NomeBuscaQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Ordenação e paginação das listagens por nome
+            models.Index(fields=['nome'], name='equipamento_nome_idx'),
+            # Busca por prefixo do autocomplete (core.search.prefix_search)
+            models.Index(fields=['nome_busca'], name='equipamento_nome_busca_idx'),
+            # Itens abaixo do estoque mínimo (dashboard e listagem de estoque baixo)
+            models.Index(fields=['quantidade'], name='equipamento_quantidade_idx'),
+        ]
+
+    def save(self, *args, update_fields=None, **kwargs):
+        self.nome_busca = normalizar_busca(self.nome)
+        if update_fields is not None and 'nome' in update_fields:
+            update_fields = {*update_fields, 'nome_busca'}
+        super().save(*args, update_fields=update_fields, **kwargs)
 
     def __str__(self):
         return f"{self.nome} ({self.marca})"
+
+
+class EstoqueVersao(models.Model):
+    """
+    Contador global de alterações de estoque (linha única).
+
+    Toda mudança em Equipamento.quantidade incrementa a versão; ela é usada
+    como ETag/Last-Modified do endpoint de estoque, que responde 304 quando
+    nada mudou.
+    """
+    versao = models.PositiveBigIntegerField(default=0)
+    atualizado_em = models.DateTimeField(default=timezone.now)
+
+    @classmethod
+    def incrementar(cls):
+        """
+        Incrementa a versão com um UPDATE atômico (cria a linha na primeira vez).
+        """
+        agora = timezone.now()
+        if not cls.objects.filter(pk=1).update(versao=F('versao') + 1, atualizado_em=agora):
+            cls.objects.get_or_create(pk=1, defaults={'versao': 1, 'atualizado_em': agora})
+
+    @classmethod
+    def atual(cls):
+        """
+        Retorna (versao, atualizado_em); (0, None) se o estoque nunca mudou.
+        """
+        return cls.objects.filter(pk=1).values_list('versao', 'atualizado_em').first() or (0, None)
+
+
+class MovimentoEstoque(models.Model):
+    """
+    Livro de movimentações de estoque (somente inserção).
+
+    Cada mudança em Equipamento.quantidade grava aqui, na mesma transação,
+    a variação assinada (negativa na retirada). O estoque em qualquer
+    momento é o último SaldoEstoque mais as movimentações seguintes.
+    """
+    EMPRESTIMO = 'EMPRESTIMO'
+    DEVOLUCAO = 'DEVOLUCAO'
+    AJUSTE = 'AJUSTE'
+    EXCLUSAO = 'EXCLUSAO'
+    RECONCILIACAO = 'RECONCILIACAO'
+    TIPO_CHOICES = [
+        (EMPRESTIMO, 'Empréstimo'),
+        (DEVOLUCAO, 'Devolução'),
+        (AJUSTE, 'Ajuste'),
+        (EXCLUSAO, 'Exclusão de empréstimo'),
+        (RECONCILIACAO, 'Correção da reconciliação'),
+    ]
+
+    equipamento = models.ForeignKey(Equipamento, on_delete=models.CASCADE, related_name='movimentos')
+    tipo = models.CharField(max_length=20, choices=TIPO_CHOICES)
+    quantidade = models.IntegerField(help_text="Variação do estoque (negativa na retirada)")
+    # Empréstimo de origem; sem FK para o registro continuar íntegro se o empréstimo for excluído
+    emprestimo_pk = models.BigIntegerField(null=True, blank=True)
+    criado_em = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            # Soma dos AJUSTEs por equipamento na reconciliação de estoque
+            models.Index(fields=['equipamento', 'tipo'], name='movimento_equip_tipo_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_tipo_display()}: {self.equipamento_id} ({self.quantidade:+d})"
+
+
+class SaldoEstoque(models.Model):
+    """
+    Ponto de controle do livro de movimentações: estoque do equipamento
+    considerando todas as movimentações até `movimento_id` (inclusive).
+    Criado periodicamente pelo comando checkpoint_estoque.
+    """
+    equipamento = models.ForeignKey(Equipamento, on_delete=models.CASCADE, related_name='saldos')
+    quantidade = models.IntegerField()
+    movimento_id = models.BigIntegerField(default=0)
+    criado_em = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['equipamento', 'criado_em'], name='saldo_equipamento_data_idx'),
+        ]
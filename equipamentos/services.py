@@ -0,0 +1,290 @@
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Max, OuterRef, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from core.importacao import IMPORTACAO_CHUNK_SIZE, ResultadoImportacao, em_blocos, ler_csv
+from emprestimos.models import Emprestimo
+from emprestimos.services import EstoqueIndisponivel
+from .models import Equipamento, EstoqueVersao, MovimentoEstoque, SaldoEstoque
+
+
+def cadastrar_equipamento(equipamento):
+    """
+    Salva um equipamento novo e lança o estoque inicial no livro de
+    movimentações (AJUSTE), na mesma transação.
+    """
+    with transaction.atomic():
+        equipamento.save()
+        MovimentoEstoque.objects.create(
+            equipamento=equipamento, tipo=MovimentoEstoque.AJUSTE, quantidade=equipamento.quantidade,
+        )
+        EstoqueVersao.incrementar()
+    return equipamento
+
+
+def ajustar_estoque(equipamento_id, nova_quantidade, quantidade_exibida):
+    """
+    Aplica a edição do estoque feita na tela: só a diferença entre
+    `nova_quantidade` e `quantidade_exibida` (o estoque mostrado quando a
+    tela abriu), com um UPDATE atômico (F()) registrado no livro (AJUSTE).
+    Empréstimos e devoluções feitos nesse meio tempo são preservados.
+    Levanta EstoqueIndisponivel se a redução deixaria o estoque negativo.
+    Retorna a diferença aplicada.
+    """
+    diferenca = nova_quantidade - quantidade_exibida
+    if not diferenca:
+        return 0
+
+    with transaction.atomic():
+        atualizados = (
+            Equipamento.objects.filter(pk=equipamento_id, quantidade__gte=-diferenca)
+            .update(quantidade=F('quantidade') + diferenca)
+        )
+        if not atualizados:
+            atual = Equipamento.objects.values_list('quantidade', flat=True).get(pk=equipamento_id)
+            raise EstoqueIndisponivel(equipamento_id, -diferenca, atual)
+        MovimentoEstoque.objects.create(
+            equipamento_id=equipamento_id, tipo=MovimentoEstoque.AJUSTE, quantidade=diferenca,
+        )
+        EstoqueVersao.incrementar()
+    return diferenca
+
+
+def estoque_em(equipamento_id, momento=None):
+    """
+    Estoque do equipamento em `momento` (agora, se None), calculado pelo
+    livro: último ponto de controle até o momento + movimentações seguintes.
+    """
+    saldos = SaldoEstoque.objects.filter(equipamento_id=equipamento_id)
+    movimentos = MovimentoEstoque.objects.filter(equipamento_id=equipamento_id)
+    if momento is not None:
+        saldos = saldos.filter(criado_em__lte=momento)
+        movimentos = movimentos.filter(criado_em__lte=momento)
+
+    quantidade, movimento_id = (
+        saldos.order_by('-criado_em').values_list('quantidade', 'movimento_id').first() or (0, 0)
+    )
+    cauda = movimentos.filter(pk__gt=movimento_id).aggregate(total=Sum('quantidade'))['total']
+    return quantidade + (cauda or 0)
+
+
+def _ultimo_saldo(referencia):
+    """Último SaldoEstoque do equipamento apontado por `referencia` (OuterRef)."""
+    return SaldoEstoque.objects.filter(equipamento=OuterRef(referencia)).order_by('-criado_em')
+
+
+def criar_checkpoints():
+    """
+    Cria um SaldoEstoque para cada equipamento com movimentações desde o
+    último ponto de controle, somando só essa cauda ao saldo anterior.
+    Retorna quantos pontos de controle foram criados.
+    """
+    ultimo_saldo = _ultimo_saldo('equipamento')
+
+    with transaction.atomic():
+        limite = MovimentoEstoque.objects.aggregate(ultimo=Max('pk'))['ultimo']
+        if limite is None:
+            return 0
+
+        caudas = (
+            MovimentoEstoque.objects
+            .filter(pk__lte=limite)
+            .filter(pk__gt=Coalesce(Subquery(ultimo_saldo.values('movimento_id')[:1]), 0))
+            .values('equipamento_id')
+            .annotate(total=Sum('quantidade'))
+            .order_by()
+        )
+        caudas = {linha['equipamento_id']: linha['total'] for linha in caudas}
+        if not caudas:
+            return 0
+
+        saldos = dict(
+            Equipamento.objects.filter(pk__in=caudas)
+            .annotate(saldo=Subquery(_ultimo_saldo('pk').values('quantidade')[:1]))
+            .values_list('pk', 'saldo')
+        )
+        agora = timezone.now()
+        SaldoEstoque.objects.bulk_create([
+            SaldoEstoque(
+                equipamento_id=equipamento_id,
+                quantidade=(saldos.get(equipamento_id) or 0) + total,
+                movimento_id=limite,
+                criado_em=agora,
+            )
+            for equipamento_id, total in caudas.items()
+        ])
+    return len(caudas)
+
+
+def com_estoque_esperado(queryset):
+    """
+    Anota `esperado` em cada equipamento: as unidades lançadas no livro
+    como AJUSTE (cadastro, ajustes e importações, ou seja, o total que o
+    almoxarifado possui) menos as unidades dos empréstimos ativos.
+    Confere o estoque contra os empréstimos, não contra o próprio livro:
+    uma quantidade de empréstimo alterada sem mexer no estoque aparece
+    como divergência. As duas somas são subconsultas agrupadas, resolvidas
+    pelos índices (equipamento, tipo) e de empréstimos ativos.
+    """
+    ajustes = (
+        MovimentoEstoque.objects
+        .filter(equipamento=OuterRef('pk'), tipo=MovimentoEstoque.AJUSTE)
+        .order_by()
+        .values('equipamento')
+        .annotate(total=Sum('quantidade'))
+        .values('total')
+    )
+    emprestadas = (
+        Emprestimo.objects
+        .filter(equipamento=OuterRef('pk'), status='EMPRESTADO')
+        .order_by()
+        .values('equipamento')
+        .annotate(total=Sum('quantidade'))
+        .values('total')
+    )
+    return queryset.annotate(esperado=Coalesce(Subquery(ajustes), 0) - Coalesce(Subquery(emprestadas), 0))
+
+
+def reconciliar_estoque(chunk_size=1000, corrigir=False):
+    """
+    Compara Equipamento.quantidade com o estoque esperado pelos empréstimos
+    ativos (com_estoque_esperado), percorrendo o catálogo em blocos de
+    `chunk_size` (uma consulta agrupada por bloco, paginada por pk).
+
+    Gera (pk, nome, quantidade, esperado) para cada divergência. Com
+    `corrigir=True`, grava o esperado com um UPDATE condicional (só se a
+    quantidade ainda for a lida), sem perder baixas concorrentes, e lança
+    a diferença no livro (RECONCILIACAO) para o saldo continuar fechando.
+    Um esperado negativo (mais unidades emprestadas do que o livro
+    registra) não é corrigível: a divergência é gerada, mas não gravada,
+    e precisa ser investigada à mão.
+    """
+    ultimo_pk = 0
+    while True:
+        bloco = list(
+            com_estoque_esperado(Equipamento.objects.filter(pk__gt=ultimo_pk))
+            .order_by('pk')
+            .values_list('pk', 'nome', 'quantidade', 'esperado')[:chunk_size]
+        )
+        if not bloco:
+            return
+        ultimo_pk = bloco[-1][0]
+
+        divergentes = [linha for linha in bloco if linha[2] != linha[3]]
+        if corrigir and divergentes:
+            with transaction.atomic():
+                correcoes = []
+                for pk, _, quantidade, esperado in divergentes:
+                    if esperado < 0:
+                        continue
+                    if Equipamento.objects.filter(pk=pk, quantidade=quantidade).update(quantidade=esperado):
+                        correcoes.append(MovimentoEstoque(
+                            equipamento_id=pk, tipo=MovimentoEstoque.RECONCILIACAO, quantidade=esperado - quantidade,
+                        ))
+                MovimentoEstoque.objects.bulk_create(correcoes)
+                EstoqueVersao.incrementar()
+        yield from divergentes
+
+
+COLUNAS_IMPORTACAO = ['nome', 'marca', 'quantidade']
+
+
+def _quantidade(valor):
+    """Quantidade da linha do CSV como inteiro maior que 0, ou None se inválida."""
+    try:
+        quantidade = int(valor)
+    except ValueError:
+        # str.isdigit() aceitaria '²', que int() não converte
+        return None
+    return quantidade if quantidade >= 1 else None
+
+
+def _validar_linha(linha):
+    """Erros de uma linha do CSV de equipamentos (sem consultar o banco)."""
+    erros = []
+    for campo in ('nome', 'marca'):
+        if not linha[campo]:
+            erros.append(f"{campo} é obrigatório")
+        elif len(linha[campo]) > Equipamento._meta.get_field(campo).max_length:
+            erros.append(f"{campo} muito longo")
+    if _quantidade(linha['quantidade']) is None:
+        erros.append(f'quantidade deve ser um inteiro maior que 0: "{linha["quantidade"]}"')
+    return erros
+
+
+def _aplicar_bloco(recebidos, resultado):
+    """
+    Aplica um bloco já validado: {(nome, marca): quantidade recebida}.
+    Itens existentes recebem a quantidade com um único UPDATE (F() + CASE);
+    os novos entram com bulk_create. Tudo vai para o livro (AJUSTE).
+    """
+    existentes = {}
+    for pk, nome, marca in (
+        Equipamento.objects.filter(nome__in={nome for nome, _ in recebidos})
+        .order_by('-pk')
+        .values_list('pk', 'nome', 'marca')
+    ):
+        existentes[nome, marca] = pk  # ordem decrescente: fica o menor pk
+
+    acrescimos = {existentes[chave]: quantidade for chave, quantidade in recebidos.items() if chave in existentes}
+    if acrescimos:
+        Equipamento.objects.filter(pk__in=acrescimos).update(quantidade=F('quantidade') + Case(
+            *[When(pk=pk, then=Value(quantidade)) for pk, quantidade in acrescimos.items()],
+            output_field=IntegerField(),
+        ))
+
+    novos = Equipamento.objects.bulk_create([
+        Equipamento(nome=nome, marca=marca, quantidade=quantidade)
+        for (nome, marca), quantidade in recebidos.items() if (nome, marca) not in existentes
+    ])
+
+    MovimentoEstoque.objects.bulk_create(
+        [
+            MovimentoEstoque(equipamento_id=pk, tipo=MovimentoEstoque.AJUSTE, quantidade=quantidade)
+            for pk, quantidade in acrescimos.items()
+        ] + [
+            MovimentoEstoque(equipamento_id=item.pk, tipo=MovimentoEstoque.AJUSTE, quantidade=item.quantidade)
+            for item in novos
+        ]
+    )
+    resultado.atualizados += len(acrescimos)
+    resultado.criados += len(novos)
+
+
+def importar_equipamentos(arquivo, chunk_size=IMPORTACAO_CHUNK_SIZE):
+    """
+    Importa uma entrega de fornecedor de um CSV (colunas nome, marca e
+    quantidade recebida): soma a quantidade aos equipamentos com o mesmo
+    nome + marca e cria os que ainda não existem.
+
+    O arquivo é lido em streaming e aplicado em blocos de `chunk_size`
+    linhas (memória limitada ao bloco), tudo em uma transação: se qualquer
+    linha tiver erro, nada é gravado e o resultado traz os erros por linha.
+    Levanta core.importacao.ArquivoInvalido se o cabeçalho não servir.
+    """
+    resultado = ResultadoImportacao()
+
+    with transaction.atomic():
+        for bloco in em_blocos(ler_csv(arquivo, COLUNAS_IMPORTACAO), chunk_size):
+            recebidos = defaultdict(int)
+            for numero, linha in bloco:
+                erros = _validar_linha(linha)
+                if erros:
+                    resultado.erro(numero, '; '.join(erros))
+                    continue
+                recebidos[linha['nome'], linha['marca']] += _quantidade(linha['quantidade'])
+                resultado.importados += 1
+
+            # Depois do primeiro erro, o restante do arquivo só é validado
+            if recebidos and not resultado.erros:
+                _aplicar_bloco(recebidos, resultado)
+
+        if resultado.erros:
+            transaction.set_rollback(True)
+            resultado.importados = resultado.criados = resultado.atualizados = 0
+        elif resultado.importados:
+            EstoqueVersao.incrementar()
+    return resultado
@@ -5,7 +5,11 @@ app_name = 'equipamentos'
 
 urlpatterns = [
     path('', views.app_items, name='app_items'),
+    path('low-stock/', views.app_items_low_stock, name='app_items_low_stock'),
     path('create/', views.app_items_create, name='app_items_create'),
+    path('import/', views.app_items_import, name='app_items_import'),
     path('edit/<int:pk>/', views.app_items_edit, name='app_items_edit'),
     path('delete/<int:pk>/', views.app_items_delete, name='app_items_delete'),
+    path('search/', views.app_items_search, name='app_items_search'),
+    path('stock/', views.app_items_stock, name='app_items_stock'),
 ]
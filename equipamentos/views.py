@@ -1,28 +1,61 @@
+from django.conf import settings
+from django.http import JsonResponse
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from .models import Equipamento
+from django.db import transaction
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition, require_GET
+from .models import Equipamento, EstoqueVersao
 from .forms import EquipamentoForm
+from .services import COLUNAS_IMPORTACAO, ajustar_estoque, cadastrar_equipamento, importar_equipamentos
+from core.forms import ImportacaoCSVForm
+from core.importacao import ArquivoInvalido
+from core.pagination import paginate_keyset
+from core.routers import leitura_em_replica
+from core.search import autocomplete_response
+from emprestimos.services import EstoqueIndisponivel
 
 @login_required
+@leitura_em_replica
 def app_items(request):
     """
     READ (List): Mostra todos os equipamentos.
     """
-    equipamentos = Equipamento.objects.all().order_by('nome')
+    return _listagem_equipamentos(request, Equipamento.objects.all(), 'nome', 'Equipamentos')
+
+@login_required
+@leitura_em_replica
+def app_items_low_stock(request):
+    """
+    READ (List): Equipamentos abaixo do estoque mínimo, do menor estoque
+    para o maior (listagem completa do indicador do dashboard).
+    """
+    return _listagem_equipamentos(
+        request, Equipamento.objects.filter(quantidade__lt=settings.ESTOQUE_MINIMO),
+        'quantidade', 'Equipamentos abaixo do estoque mínimo',
+    )
+
+def _listagem_equipamentos(request, queryset, ordering, page_title):
+    page = paginate_keyset(
+        request, queryset, ordering,
+        lambda qs: qs.values('pk', 'nome', 'marca', 'quantidade'),
+    )
     
     object_data = []
-    for item in equipamentos:
+    for item in page:
         object_data.append({
-            'pk': item.pk,
-            'fields': [item.nome, item.marca, item.quantidade]
+            'pk': item['pk'],
+            'fields': [item['nome'], item['marca'], item['quantidade']]
         })
 
     context = {
-        'page_title': 'Equipamentos',
+        'page_title': page_title,
         'headers': ['Nome', 'Marca', 'Quantidade'],
         'object_data': object_data,
+        'page': page,
         'add_url_name': 'equipamentos:app_items_create',
+        'import_url_name': 'equipamentos:app_items_import',
         'edit_url_name': 'equipamentos:app_items_edit',   
         'delete_url_name': 'equipamentos:app_items_delete',
     }
@@ -33,7 +66,8 @@ def app_items_create(request):
     if request.method == 'POST':
         form = EquipamentoForm(request.POST)
         if form.is_valid():
-            item_salvo = form.save()
+            # Salvar e lançar o estoque inicial no livro de movimentações
+            item_salvo = cadastrar_equipamento(form.save(commit=False))
             messages.success(request,  f'Equipamento "{item_salvo.nome}" cadastrado com sucesso!')
             return redirect('equipamentos:app_items')
         else:
@@ -47,6 +81,44 @@ def app_items_create(request):
     }
     return render(request, 'app_ui_form_base.html', context)
 
+@login_required
+def app_items_import(request):
+    """
+    CREATE/UPDATE (lote): Importa uma entrega de equipamentos de um CSV.
+    O arquivo inteiro é validado antes de gravar; com erros, nada muda.
+    """
+    resultado = None
+    if request.method == 'POST':
+        form = ImportacaoCSVForm(request.POST, request.FILES)
+        if form.is_valid():
+            try:
+                resultado = importar_equipamentos(form.cleaned_data['arquivo'])
+            except ArquivoInvalido as e:
+                form.add_error('arquivo', str(e))
+                messages.error(request, 'Falha na importação. Verifique os erros abaixo.')
+            else:
+                if resultado.erros:
+                    messages.error(request, 'Nenhum equipamento foi alterado. Corrija as linhas abaixo e envie o arquivo novamente.')
+                else:
+                    messages.success(
+                        request,
+                        f'Importação concluída: {resultado.criados} equipamento(s) novo(s), '
+                        f'{resultado.atualizados} com estoque atualizado.',
+                    )
+        else:
+            messages.error(request, 'Falha na importação. Verifique os erros abaixo.')
+    else:
+        form = ImportacaoCSVForm()
+
+    context = {
+        'form': form,
+        'resultado': resultado,
+        'page_title': 'Importar Entrega de Equipamentos',
+        'colunas': COLUNAS_IMPORTACAO,
+        'list_url_name': 'equipamentos:app_items',
+    }
+    return render(request, 'app_ui_import.html', context)
+
 @login_required
 def app_items_edit(request, pk):
     """
@@ -57,8 +129,19 @@ def app_items_edit(request, pk):
     if request.method == 'POST':
         form = EquipamentoForm(request.POST, instance=item)
         if form.is_valid():
-            form.save()
-            return redirect('equipamentos:app_items')
+            item = form.save(commit=False)
+            # O estoque muda pela diferença sobre o valor exibido (UPDATE atômico + livro)
+            try:
+                with transaction.atomic():
+                    item.save(update_fields=['nome', 'marca'])
+                    ajustar_estoque(item.pk, item.quantidade, form.cleaned_data['quantidade_exibida'])
+            except EstoqueIndisponivel as erro:
+                form.add_error('quantidade', (
+                    f'O estoque mudou desde que a página foi aberta (atual: {erro.estoque_atual}) '
+                    f'e não comporta a redução de {erro.quantidade}.'
+                ))
+            else:
+                return redirect('equipamentos:app_items')
     else:
         form = EquipamentoForm(instance=item)
 
@@ -77,6 +160,7 @@ def app_items_delete(request, pk):
 
     if request.method == 'POST':
         item.delete()
+        EstoqueVersao.incrementar()
         messages.success(request, 'Equipamento excluído com sucesso!')
         return redirect('equipamentos:app_items')
 
@@ -84,3 +168,41 @@ def app_items_delete(request, pk):
         'item': item,
     }
     return render(request, 'app_ui_delete_confirm_base.html', context)
+
+
+def _versao_estoque(request):
+    """
+    Lê a versão do estoque uma vez por requisição (usada no ETag e no Last-Modified).
+    """
+    if not hasattr(request, '_versao_estoque'):
+        request._versao_estoque = EstoqueVersao.atual()
+    return request._versao_estoque
+
+
+def _estoque_etag(request):
+    return f'estoque-{_versao_estoque(request)[0]}'
+
+
+def _estoque_last_modified(request):
+    return _versao_estoque(request)[1]
+
+
+@login_required
+@require_GET
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=_estoque_etag, last_modified_func=_estoque_last_modified)
+def app_items_stock(request):
+    """
+    JSON: Estoque atual de cada equipamento ({id: quantidade}).
+    Responde 304 quando o cliente já tem a versão atual (If-None-Match).
+    """
+    estoque = dict(Equipamento.objects.values_list('pk', 'quantidade'))
+    return JsonResponse(estoque)
+
+
+@login_required
+def app_items_search(request):
+    """
+    JSON: Autocomplete de equipamentos por prefixo do nome (?q=...).
+    """
+    return autocomplete_response(request, Equipamento.objects.all(), 'nome_busca', lambda obj: str(obj))
@@ -1,32 +1,37 @@
 from django.shortcuts import render
 from django.contrib.auth.decorators import login_required
-from django.utils import timezone
-from emprestimos.models import Emprestimo
+from emprestimos.models import Emprestimo, EmprestimoArquivado
+from emprestimos.utils import emprestimo_rows, format_datetime
+from core.pagination import paginate_keyset
+from core.routers import leitura_em_replica
 
 @login_required
+@leitura_em_replica
 def app_history(request):
     """
-    Mostra o histórico de todos os empréstimos devolvidos.
+    Mostra o histórico de todos os empréstimos devolvidos: os recentes, em
+    Emprestimo, e os arquivados, lidos como uma única listagem.
     """
-    emprestimos_devolvidos = Emprestimo.objects.filter(status='DEVOLVIDO').order_by('-data_devolucao_real')
+    fields = ('pk', 'nome__nome', 'equipamento__nome', 'quantidade', 'data_emprestimo', 'data_prazo', 'data_devolucao_real', 'status')
+    page = paginate_keyset(
+        request,
+        [Emprestimo.objects.filter(status='DEVOLVIDO'), EmprestimoArquivado.objects.como_emprestimos()],
+        '-data_devolucao_real',
+        lambda qs: emprestimo_rows(qs, fields),
+    )
     
     object_data = []
-    for emp in emprestimos_devolvidos:
-        # Converter para timezone local antes de formatar
-        data_emprestimo_local = timezone.localtime(emp.data_emprestimo)
-        data_prazo_local = timezone.localtime(emp.data_prazo)
-        data_devolucao_local = timezone.localtime(emp.data_devolucao_real) if emp.data_devolucao_real else None
-        
+    for emp in page:
         object_data.append({
-            'pk': emp.pk,
+            'pk': emp['pk'],
             'fields': [
-                emp.nome.nome,
-                emp.equipamento.nome,
-                emp.quantidade,
-                data_emprestimo_local.strftime('%d/%m/%Y %H:%M'),
-                data_prazo_local.strftime('%d/%m/%Y %H:%M'),
-                data_devolucao_local.strftime('%d/%m/%Y %H:%M') if data_devolucao_local else '-',
-                emp.get_status_display(),
+                emp['nome__nome'],
+                emp['equipamento__nome'],
+                emp['quantidade'],
+                format_datetime(emp['data_emprestimo']),
+                format_datetime(emp['data_prazo']),
+                format_datetime(emp['data_devolucao_real'], empty='-'),
+                emp['status_display'],
             ]
         })
     
@@ -34,5 +39,6 @@ def app_history(request):
         'page_title': 'Histórico de Devoluções',
         'headers': ['Colaborador', 'Equipamento', 'Quantidade', 'Data Empréstimo', 'Prazo Devolução', 'Data Devolução', 'Status'],
         'object_data': object_data,
+        'page': page,
     }
     return render(request, 'app_ui_history.html', context)
@@ -0,0 +1,122 @@
+from datetime import datetime, time, timedelta
+
+from django import forms
+from django.utils import timezone
+
+from emprestimos.models import Emprestimo
+
+
+class MovimentacoesFiltroForm(forms.Form):
+    """
+    Filtros da exportação de movimentações (parâmetros GET).
+    Todos os campos são opcionais; sem filtros, exporta tudo.
+    """
+    CAMPO_DATA_CHOICES = [
+        ('data_emprestimo', 'Data do Empréstimo'),
+        ('data_devolucao_real', 'Data de Devolução Real'),
+    ]
+
+    data_inicio = forms.DateField(
+        required=False,
+        label='De',
+        widget=forms.DateInput(attrs={'class': 'form-input', 'type': 'date'}),
+    )
+    data_fim = forms.DateField(
+        required=False,
+        label='Até',
+        widget=forms.DateInput(attrs={'class': 'form-input', 'type': 'date'}),
+    )
+    campo_data = forms.ChoiceField(
+        required=False,
+        choices=CAMPO_DATA_CHOICES,
+        label='Filtrar por',
+        widget=forms.Select(attrs={'class': 'form-input'}),
+    )
+    status = forms.ChoiceField(
+        required=False,
+        choices=[('', 'Todos')] + Emprestimo.STATUS_CHOICES,
+        label='Status',
+        widget=forms.Select(attrs={'class': 'form-input'}),
+    )
+    colaborador = forms.IntegerField(
+        required=False,
+        min_value=1,
+        label='Colaborador (ID)',
+        widget=forms.NumberInput(attrs={'class': 'form-input'}),
+    )
+    equipamento = forms.IntegerField(
+        required=False,
+        min_value=1,
+        label='Equipamento (ID)',
+        widget=forms.NumberInput(attrs={'class': 'form-input'}),
+    )
+
+    def clean(self):
+        cleaned_data = super().clean()
+        data_inicio = cleaned_data.get('data_inicio')
+        data_fim = cleaned_data.get('data_fim')
+
+        if data_inicio and data_fim and data_inicio > data_fim:
+            raise forms.ValidationError("A data inicial deve ser anterior ou igual à data final.")
+
+        return cleaned_data
+
+    def filtrar(self, queryset):
+        """
+        Aplica os filtros no queryset (form já validado).
+
+        O período vira um intervalo [início do dia inicial, início do dia
+        seguinte ao final) sobre a própria coluna, para que o banco use o
+        índice em vez de aplicar uma função de data em cada linha.
+        """
+        cd = self.cleaned_data
+        campo = cd.get('campo_data') or 'data_emprestimo'
+
+        if cd.get('data_inicio'):
+            queryset = queryset.filter(**{f'{campo}__gte': inicio_do_dia(cd['data_inicio'])})
+        if cd.get('data_fim'):
+            queryset = queryset.filter(**{f'{campo}__lt': inicio_do_dia(cd['data_fim'] + timedelta(days=1))})
+        if cd.get('status'):
+            queryset = queryset.filter(status=cd['status'])
+        if cd.get('colaborador'):
+            queryset = queryset.filter(nome_id=cd['colaborador'])
+        if cd.get('equipamento'):
+            queryset = queryset.filter(equipamento_id=cd['equipamento'])
+
+        return queryset
+
+
+class PeriodoForm(forms.Form):
+    """
+    Período dos relatórios de consumo (parâmetros GET). Sem datas, mostra
+    os últimos DIAS_PADRAO dias.
+    """
+    DIAS_PADRAO = 30
+
+    data_inicio = forms.DateField(
+        required=False,
+        label='De',
+        widget=forms.DateInput(attrs={'class': 'form-input', 'type': 'date'}),
+    )
+    data_fim = forms.DateField(
+        required=False,
+        label='Até',
+        widget=forms.DateInput(attrs={'class': 'form-input', 'type': 'date'}),
+    )
+
+    def clean(self):
+        cleaned_data = super().clean()
+        data_fim = cleaned_data.get('data_fim') or timezone.localdate()
+        data_inicio = cleaned_data.get('data_inicio') or data_fim - timedelta(days=self.DIAS_PADRAO - 1)
+
+        if data_inicio > data_fim:
+            raise forms.ValidationError("A data inicial deve ser anterior ou igual à data final.")
+
+        cleaned_data['data_inicio'] = data_inicio
+        cleaned_data['data_fim'] = data_fim
+        return cleaned_data
+
+
+def inicio_do_dia(data):
+    """Meia-noite (fuso local) da data, como datetime com timezone."""
+    return timezone.make_aware(datetime.combine(data, time.min))
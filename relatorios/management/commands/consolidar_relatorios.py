@@ -0,0 +1,36 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from relatorios.services import consolidar_relatorios
+
+
+class Command(BaseCommand):
+    help = (
+        "Atualiza as consolidações diárias por equipamento e por colaborador "
+        "a partir dos empréstimos, só para os dias ainda não fechados."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--desde',
+            help="Reprocessa a partir desta data (AAAA-MM-DD), ignorando a marca d'água.",
+        )
+
+    def handle(self, *args, **options):
+        desde = None
+        if options['desde']:
+            try:
+                desde = date.fromisoformat(options['desde'])
+            except ValueError:
+                raise CommandError("Data inválida em --desde; use o formato AAAA-MM-DD.")
+
+        periodo = consolidar_relatorios(desde=desde)
+        if periodo is None:
+            self.stdout.write("Nenhum empréstimo para consolidar.")
+            return
+
+        inicio, fim = periodo
+        self.stdout.write(self.style.SUCCESS(
+            f"Consolidado de {inicio:%d/%m/%Y} a {fim:%d/%m/%Y}."
+        ))
@@ -0,0 +1,56 @@
+# Generated by Django 5.2.6 on 2026-10-18 09:39
+
+import datetime
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('colaboradores', '0003_indices_busca_nome'),
+        ('equipamentos', '0004_indices_busca_nome'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ConsolidacaoDiaria',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ultimo_dia', models.DateField(blank=True, null=True)),
+                ('executado_em', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='MovimentoColaboradorDiario',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dia', models.DateField()),
+                ('unidades_emprestadas', models.PositiveIntegerField(default=0)),
+                ('emprestimos', models.PositiveIntegerField(default=0)),
+                ('devolucoes', models.PositiveIntegerField(default=0)),
+                ('duracao_total', models.DurationField(default=datetime.timedelta(0))),
+                ('colaborador', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='movimentos_diarios', to='colaboradores.colaborador')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('dia', 'colaborador'), name='mov_colaborador_dia_unico')],
+            },
+        ),
+        migrations.CreateModel(
+            name='MovimentoEquipamentoDiario',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dia', models.DateField()),
+                ('unidades_emprestadas', models.PositiveIntegerField(default=0)),
+                ('emprestimos', models.PositiveIntegerField(default=0)),
+                ('devolucoes', models.PositiveIntegerField(default=0)),
+                ('duracao_total', models.DurationField(default=datetime.timedelta(0))),
+                ('equipamento', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='movimentos_diarios', to='equipamentos.equipamento')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('dia', 'equipamento'), name='mov_equipamento_dia_unico')],
+            },
+        ),
+    ]
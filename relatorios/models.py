@@ -1,3 +1,50 @@
+from datetime import timedelta
+
 from django.db import models
 
-# Create your models here.
+from colaboradores.models import Colaborador
+from equipamentos.models import Equipamento
+
+
+class MovimentoDiario(models.Model):
+    """
+    Totais de um dia (data local), consolidados pelo comando
+    consolidar_relatorios a partir de Emprestimo. Empréstimos contam no dia
+    em que começaram; devoluções e duração, no dia da devolução.
+    """
+    dia = models.DateField()
+    unidades_emprestadas = models.PositiveIntegerField(default=0)
+    emprestimos = models.PositiveIntegerField(default=0)
+    devolucoes = models.PositiveIntegerField(default=0)
+    # Soma das durações dos empréstimos devolvidos no dia (média = total / devolucoes)
+    duracao_total = models.DurationField(default=timedelta(0))
+
+    class Meta:
+        abstract = True
+
+
+class MovimentoEquipamentoDiario(MovimentoDiario):
+    equipamento = models.ForeignKey(Equipamento, on_delete=models.CASCADE, related_name='movimentos_diarios')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['dia', 'equipamento'], name='mov_equipamento_dia_unico'),
+        ]
+
+
+class MovimentoColaboradorDiario(MovimentoDiario):
+    colaborador = models.ForeignKey(Colaborador, on_delete=models.CASCADE, related_name='movimentos_diarios')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['dia', 'colaborador'], name='mov_colaborador_dia_unico'),
+        ]
+
+
+class ConsolidacaoDiaria(models.Model):
+    """
+    Marca d'água da consolidação (linha única): último dia já fechado.
+    A próxima execução reprocessa só os dias seguintes a ele.
+    """
+    ultimo_dia = models.DateField(null=True, blank=True)
+    executado_em = models.DateTimeField(null=True, blank=True)
@@ -0,0 +1,139 @@
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Count, F, Min, Sum
+from django.utils import timezone
+
+from emprestimos.models import Emprestimo, EmprestimoArquivado
+from .forms import inicio_do_dia
+from .models import ConsolidacaoDiaria, MovimentoColaboradorDiario, MovimentoEquipamentoDiario
+
+# (modelo de consolidação, campo do modelo, campo correspondente em Emprestimo)
+CONSOLIDACOES = [
+    (MovimentoEquipamentoDiario, 'equipamento_id', 'equipamento_id'),
+    (MovimentoColaboradorDiario, 'colaborador_id', 'nome_id'),
+]
+# Tabelas com empréstimos: a principal e o arquivo de devolvidos antigos
+MODELOS_EMPRESTIMO = (Emprestimo, EmprestimoArquivado)
+
+
+def _por_dia(campo_data, inicio, fim, chave, **agregados):
+    """
+    Agrega os empréstimos (principal e arquivo) com `campo_data` no período
+    [inicio, fim] (dias) por (dia local, chave), gerando dicionários com
+    'dia', `chave` e os agregados (somáveis, como Count e Sum). Uma consulta
+    por dia e tabela, com filtro de intervalo sobre a própria coluna (índice
+    de data): agrupar por TruncDate com fuso chamaria uma função Python por
+    linha no SQLite.
+    """
+    dia = inicio
+    while dia <= fim:
+        proximo = dia + timedelta(days=1)
+        totais = {}
+        for modelo in MODELOS_EMPRESTIMO:
+            linhas = (
+                modelo.objects
+                .filter(**{
+                    f'{campo_data}__gte': inicio_do_dia(dia),
+                    f'{campo_data}__lt': inicio_do_dia(proximo),
+                })
+                .values(chave)
+                .annotate(**agregados)
+                .order_by()
+            )
+            for linha in linhas:
+                soma = totais.get(linha[chave])
+                if soma is None:
+                    totais[linha[chave]] = linha
+                else:
+                    for nome in agregados:
+                        soma[nome] += linha[nome]
+        for linha in totais.values():
+            linha['dia'] = dia
+            yield linha
+        dia = proximo
+
+
+def consolidar_dias(inicio, fim):
+    """
+    Recalcula as consolidações diárias de `inicio` a `fim` (inclusive):
+    apaga as linhas do período e grava os novos totais com bulk_create.
+    """
+    with transaction.atomic():
+        for modelo, campo, chave in CONSOLIDACOES:
+            linhas = defaultdict(dict)
+            for linha in _por_dia(
+                'data_emprestimo', inicio, fim, chave,
+                emprestimos=Count('pk'), unidades_emprestadas=Sum('quantidade'),
+            ):
+                linhas[linha['dia'], linha[chave]].update(
+                    emprestimos=linha['emprestimos'],
+                    unidades_emprestadas=linha['unidades_emprestadas'],
+                )
+            for linha in _por_dia(
+                'data_devolucao_real', inicio, fim, chave,
+                devolucoes=Count('pk'),
+                duracao_total=Sum(F('data_devolucao_real') - F('data_emprestimo')),
+            ):
+                linhas[linha['dia'], linha[chave]].update(
+                    devolucoes=linha['devolucoes'],
+                    duracao_total=linha['duracao_total'],
+                )
+
+            modelo.objects.filter(dia__gte=inicio, dia__lte=fim).delete()
+            modelo.objects.bulk_create(
+                [modelo(dia=dia, **{campo: pk}, **totais) for (dia, pk), totais in linhas.items()],
+                batch_size=1000,
+            )
+
+
+def reconsolidar(*momentos):
+    """
+    Refaz as consolidações dos dias (locais) de `momentos` que a
+    consolidação incremental já fechou (até a marca d'água), depois que um
+    empréstimo desses dias foi alterado ou excluído; os dias seguintes
+    entram na próxima execução de consolidar_relatorios. Deve rodar na
+    transação da alteração.
+    """
+    ultimo_dia = ConsolidacaoDiaria.objects.filter(pk=1).values_list('ultimo_dia', flat=True).first()
+    if ultimo_dia is None:
+        return
+    for dia in sorted({timezone.localdate(momento) for momento in momentos if momento is not None}):
+        if dia <= ultimo_dia:
+            consolidar_dias(dia, dia)
+
+
+def consolidar_relatorios(desde=None, hoje=None):
+    """
+    Consolida de forma incremental: do dia seguinte à marca d'água (ou de
+    `desde`) até hoje. Hoje ainda está aberto, então a marca d'água fica em
+    ontem e hoje é reprocessado na próxima execução. Retorna (inicio, fim),
+    ou None se não houver empréstimos.
+    """
+    hoje = hoje or timezone.localdate()
+
+    with transaction.atomic():
+        consolidacao, _ = ConsolidacaoDiaria.objects.select_for_update().get_or_create(pk=1)
+        inicio = desde
+        if inicio is None and consolidacao.ultimo_dia:
+            inicio = consolidacao.ultimo_dia + timedelta(days=1)
+        if inicio is None:
+            primeiros = [
+                data for data in (
+                    modelo.objects.aggregate(primeiro=Min('data_emprestimo'))['primeiro']
+                    for modelo in MODELOS_EMPRESTIMO
+                )
+                if data is not None
+            ]
+            if not primeiros:
+                return None
+            inicio = timezone.localdate(min(primeiros))
+        inicio = min(inicio, hoje)
+
+        consolidar_dias(inicio, hoje)
+
+        consolidacao.ultimo_dia = hoje - timedelta(days=1)
+        consolidacao.executado_em = timezone.now()
+        consolidacao.save(update_fields=['ultimo_dia', 'executado_em'])
+    return inicio, hoje
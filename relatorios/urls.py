@@ -6,5 +6,7 @@ app_name = 'relatorios'
 urlpatterns = [
     path('', views.app_reports, name='app_reports'),
     path('configs/', views.app_configs, name='app_configs'),
+    path('equipamentos/', views.app_reports_equipamentos, name='app_reports_equipamentos'),
+    path('colaboradores/', views.app_reports_colaboradores, name='app_reports_colaboradores'),
     path('download/movimentacoes-csv/', views.download_movimentacoes_csv, name='download_movimentacoes_csv'),
 ]
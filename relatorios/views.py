@@ -1,60 +1,194 @@
 import csv
 
-from django.http import HttpResponse
-from django.shortcuts import render
+from django.db.models import Sum
+from django.http import StreamingHttpResponse
+from django.shortcuts import render, redirect
 from django.contrib.auth.decorators import login_required
-from django.utils import timezone
+from django.contrib import messages
 
-from emprestimos.models import Emprestimo
+from core.routers import leitura_em_replica
+from emprestimos.models import Emprestimo, EmprestimoArquivado
+from emprestimos.utils import emprestimo_rows_ordenadas, format_datetime
+from .forms import MovimentacoesFiltroForm, PeriodoForm
+from .models import MovimentoColaboradorDiario, MovimentoEquipamentoDiario
 
 @login_required
 def app_reports(request):
-    return render(request, 'app_ui_reports.html')
+    context = {
+        'filtro_form': MovimentacoesFiltroForm(),
+    }
+    return render(request, 'app_ui_reports.html', context)
 
 @login_required
 def app_configs(request):
     return render(request, 'app_ui_configs.html')
 
 
+# Linhas lidas do banco por vez na exportação em streaming.
+CSV_CHUNK_SIZE = 2000
+
+CSV_HEADERS = [
+    'ID',
+    'Colaborador',
+    'Equipamento',
+    'Quantidade',
+    'Data Empréstimo',
+    'Data Prazo',
+    'Data Devolução Real',
+    'Estoque Disponível',
+    'Status',
+]
+
+
+class Echo:
+    """
+    Pseudo-buffer para o csv.writer: devolve a linha formatada em vez de
+    guardá-la, para que cada linha seja enviada assim que for gerada.
+    """
+
+    def write(self, value):
+        return value
+
+
+def movimentacoes_csv_lines(movimentacoes, chunk_size=CSV_CHUNK_SIZE):
+    """
+    Gera o CSV linha a linha, lendo o banco em lotes de `chunk_size`.
+    `movimentacoes` é uma lista de querysets (empréstimos e arquivo),
+    exportados juntos do empréstimo mais recente para o mais antigo.
+    O BOM e o cabeçalho saem antes da primeira consulta.
+    """
+    writer = csv.writer(Echo())
+    yield '\ufeff' + writer.writerow(CSV_HEADERS)
+
+    for movimentacao in emprestimo_rows_ordenadas(movimentacoes, '-data_emprestimo', chunk_size=chunk_size):
+        yield writer.writerow([
+            movimentacao['pk'],
+            movimentacao['nome__nome'],
+            movimentacao['equipamento__nome'],
+            movimentacao['quantidade'],
+            format_datetime(movimentacao['data_emprestimo']),
+            format_datetime(movimentacao['data_prazo']),
+            format_datetime(movimentacao['data_devolucao_real']),
+            movimentacao['estoque_disponivel'],
+            movimentacao['status_display'],
+        ])
+
+
 @login_required
+@leitura_em_replica
 def download_movimentacoes_csv(request):
-    response = HttpResponse(content_type='text/csv; charset=utf-8')
-    response['Content-Disposition'] = 'attachment; filename="movimentacoes_emprestimos.csv"'
-    response.write('\ufeff')
-
-    writer = csv.writer(response)
-    writer.writerow([
-        'ID',
-        'Colaborador',
-        'Equipamento',
-        'Quantidade',
-        'Data Empréstimo',
-        'Data Prazo',
-        'Data Devolução Real',
-        'Estoque Disponível',
-        'Status',
-    ])
-
-    movimentacoes = Emprestimo.objects.select_related('nome', 'equipamento').order_by('-data_emprestimo')
-
-    for movimentacao in movimentacoes:
-        data_emprestimo = timezone.localtime(movimentacao.data_emprestimo).strftime('%d/%m/%Y %H:%M')
-        data_prazo = timezone.localtime(movimentacao.data_prazo).strftime('%d/%m/%Y %H:%M')
-        data_devolucao_real = ''
-
-        if movimentacao.data_devolucao_real:
-            data_devolucao_real = timezone.localtime(movimentacao.data_devolucao_real).strftime('%d/%m/%Y %H:%M')
-
-        writer.writerow([
-            movimentacao.pk,
-            movimentacao.nome.nome,
-            movimentacao.equipamento.nome,
-            movimentacao.quantidade,
-            data_emprestimo,
-            data_prazo,
-            data_devolucao_real,
-            movimentacao.estoque_disponivel,
-            movimentacao.get_status_display(),
-        ])
+    """
+    Exporta as movimentações em CSV, incluindo os empréstimos arquivados.
+    Aceita os filtros de MovimentacoesFiltroForm como parâmetros GET
+    (aplicados no banco, nas duas tabelas).
+    """
+    form = MovimentacoesFiltroForm(request.GET)
+    if not form.is_valid():
+        for erros in form.errors.values():
+            for erro in erros:
+                messages.error(request, erro)
+        return redirect('relatorios:app_reports')
+
+    movimentacoes = [
+        form.filtrar(Emprestimo.objects.all()),
+        form.filtrar(EmprestimoArquivado.objects.como_emprestimos()),
+    ]
 
+    response = StreamingHttpResponse(
+        movimentacoes_csv_lines(movimentacoes),
+        content_type='text/csv; charset=utf-8',
+    )
+    response['Content-Disposition'] = 'attachment; filename="movimentacoes_emprestimos.csv"'
     return response
+
+
+def format_duracao(duracao):
+    """Duração como '2d 5h' ou '5h 12min'; '-' se não houver."""
+    if duracao is None:
+        return '-'
+    horas, resto = divmod(int(duracao.total_seconds()), 3600)
+    dias, horas = divmod(horas, 24)
+    if dias:
+        return f'{dias}d {horas}h'
+    return f'{horas}h {resto // 60}min'
+
+
+def _relatorio_consumo(request, modelo, campo, campos_rotulo, rotulo, page_title, header_nome):
+    """
+    Relatório de consumo por período, lido das consolidações diárias
+    (comando consolidar_relatorios), sem agregar a tabela de empréstimos.
+    Agrupa pela FK `campo` (itens com o mesmo nome não se somam); `rotulo`
+    monta o texto da linha a partir de `campos_rotulo`.
+    """
+    form = PeriodoForm(request.GET)
+    if not form.is_valid():
+        for erros in form.errors.values():
+            for erro in erros:
+                messages.error(request, erro)
+        return redirect('relatorios:app_reports')
+
+    movimentos = modelo.objects.filter(
+        dia__gte=form.cleaned_data['data_inicio'],
+        dia__lte=form.cleaned_data['data_fim'],
+    )
+    totais = {
+        'unidades': Sum('unidades_emprestadas'),
+        'emprestimos': Sum('emprestimos'),
+        'devolucoes': Sum('devolucoes'),
+    }
+
+    object_data = []
+    for linha in (
+        movimentos.values(campo, *campos_rotulo)
+        .annotate(duracao=Sum('duracao_total'), **totais)
+        .order_by('-unidades', *campos_rotulo, campo)
+    ):
+        object_data.append({
+            'fields': [
+                rotulo(linha),
+                linha['unidades'],
+                linha['emprestimos'],
+                linha['devolucoes'],
+                format_duracao(linha['duracao'] / linha['devolucoes'] if linha['devolucoes'] else None),
+            ]
+        })
+
+    por_dia = list(movimentos.values('dia').annotate(**totais).order_by('dia'))
+    maior_total = max((dia['unidades'] for dia in por_dia), default=0) or 1
+    for dia in por_dia:
+        dia['percentual'] = round(dia['unidades'] * 100 / maior_total)
+
+    context = {
+        'page_title': page_title,
+        'form': form,
+        'headers': [header_nome, 'Unidades Emprestadas', 'Empréstimos', 'Devoluções', 'Duração Média'],
+        'object_data': object_data,
+        'por_dia': por_dia,
+    }
+    return render(request, 'app_ui_reports_consumo.html', context)
+
+
+@login_required
+@leitura_em_replica
+def app_reports_equipamentos(request):
+    """
+    Utilização de equipamentos no período (consolidações diárias).
+    """
+    return _relatorio_consumo(
+        request, MovimentoEquipamentoDiario, 'equipamento', ('equipamento__nome', 'equipamento__marca'),
+        lambda linha: f"{linha['equipamento__nome']} ({linha['equipamento__marca']})",
+        'Utilização de Equipamentos', 'Equipamento',
+    )
+
+
+@login_required
+@leitura_em_replica
+def app_reports_colaboradores(request):
+    """
+    Consumo por colaborador no período (consolidações diárias).
+    """
+    return _relatorio_consumo(
+        request, MovimentoColaboradorDiario, 'colaborador', ('colaborador__nome',),
+        lambda linha: linha['colaborador__nome'],
+        'Consumo por Colaborador', 'Colaborador',
+    )
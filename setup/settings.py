@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -47,8 +48,12 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # Primeiro da lista: mede o tempo de todos os outros middlewares e da view
+    "core.middleware.InstrumentacaoMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
+    # Leituras no banco principal logo após uma escrita do usuário (réplica de leitura)
+    "core.middleware.PrimarioAposEscritaMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
@@ -83,9 +88,55 @@ DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.sqlite3",
         "NAME": BASE_DIR / "db.sqlite3",
+        # Banco de testes em arquivo (e não em memória) para que os testes de
+        # concorrência usem conexões independentes, como em produção.
+        "TEST": {
+            "NAME": BASE_DIR / "test_db.sqlite3",
+        },
     }
 }
 
+# Perfil de produção do SQLite (opt-in: variável de ambiente SQLITE_PERFIL=producao).
+# WAL deixa leituras seguirem durante escritas; IMMEDIATE pega o lock de
+# escrita no BEGIN, então a espera do busy_timeout vale para toda a
+# transação (sem "database is locked" ao promover uma leitura a escrita).
+SQLITE_PERFIL_PRODUCAO = {
+    "OPTIONS": {
+        "init_command": (
+            "PRAGMA journal_mode=WAL;"
+            "PRAGMA synchronous=NORMAL;"
+            "PRAGMA cache_size=-65536;"  # 64 MiB
+            "PRAGMA mmap_size=268435456;"  # 256 MiB
+            "PRAGMA temp_store=MEMORY;"
+        ),
+        "transaction_mode": "IMMEDIATE",
+        "timeout": 5,  # busy_timeout, em segundos
+    },
+    # Reaproveita a conexão entre requisições (com checagem antes do reuso)
+    "CONN_MAX_AGE": 600,
+    "CONN_HEALTH_CHECKS": True,
+}
+
+if os.environ.get("SQLITE_PERFIL") == "producao":
+    DATABASES["default"].update(SQLITE_PERFIL_PRODUCAO)
+
+# Réplica de leitura (opcional): relatórios, histórico e listagens leem do
+# alias BANCO_LEITURA; escritas e leituras logo após escrever ficam no
+# principal. Configure com SQLITE_REPLICA=<arquivo> (cópia do banco mantida
+# por replicação, ou pelo comando atualizar_replica em ambiente local).
+BANCO_LEITURA = "leitura"
+# Segundos em que o usuário continua lendo do principal depois de escrever
+REPLICA_JANELA_PRIMARIO = 5
+
+if os.environ.get("SQLITE_REPLICA"):
+    DATABASES[BANCO_LEITURA] = {
+        **DATABASES["default"],
+        "NAME": os.environ["SQLITE_REPLICA"],
+        "TEST": {"MIRROR": "default"},
+    }
+
+DATABASE_ROUTERS = ["core.routers.ReplicaLeituraRouter"]
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -128,4 +179,25 @@ STATIC_URL = "static/"
 
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
+# Listagens (paginação por cursor)
+LIST_PAGE_SIZE = 50
+
+# Feriados da planta (além dos nacionais) usados no prazo de devolução,
+# no formato 'AAAA-MM-DD'
+FERIADOS_EXTRAS = []
+
+# Estoque abaixo deste valor aparece no dashboard como "abaixo do mínimo"
+ESTOQUE_MINIMO = 5
+
+# Empréstimos devolvidos há mais destes dias vão para o arquivo
+# (comando arquivar_emprestimos)
+ARQUIVO_IDADE_DIAS = 180
+
+# Instrumentação por requisição (Server-Timing + métricas em /app/performance/).
+# O Server-Timing mostra consultas e tempo de banco a qualquer cliente, então
+# fica só no DEBUG; fora dele, PERFORMANCE_INSTRUMENTACAO=1 no ambiente liga.
+PERFORMANCE_INSTRUMENTACAO = DEBUG or os.environ.get("PERFORMANCE_INSTRUMENTACAO") == "1"
+# Medições guardadas por rota (janela móvel, por processo)
+PERFORMANCE_AMOSTRAS = 1000
+
 CSRF_TRUSTED_ORIGINS = ['https://localhost:8000']